@@ -2,10 +2,21 @@ import streamlit as st
 import time
 import re
 import os
+import inspect
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from supabase import create_client, Client
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Callable, Optional
 from datetime import datetime
-from groq import Groq
+from groq_client_pool import get_groq_client, get_groq_client_pool, iter_chat_completion
+from llm_streaming import StreamRenderer
+from keyword_matcher import KeywordMatcher, first_keyword
+
+try:
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+except ImportError:
+    add_script_run_ctx = None
+    get_script_run_ctx = None
 
 from local_redacao_rag import setup_redacao_ui, analyze_redacao_pdf
 from local_portuguese_rag import local_portuguese_rag, LocalPortugueseRAG
@@ -480,8 +491,11 @@ class GroqTeacher:
         self.name = subject_info["teacher"]
         self.subject = None  # Will be set when used
     
-    def get_response(self, user_message: str, api_key: str) -> str:
-        """Gera resposta usando DeepSeek R1 Distill via Groq"""
+    def get_response(self, user_message: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Gera resposta usando DeepSeek R1 Distill via Groq.
+        Com `on_token`, a resposta é transmitida em streaming e o texto parcial é repassado a cada atualização.
+        """
         
         # Validação robusta da API key
         if not api_key or not isinstance(api_key, str) or not api_key.strip():
@@ -500,8 +514,8 @@ Para ativar {self.name}, você precisa:
         clean_api_key = api_key.strip()
         
         try:
-            # Cria uma nova instância do cliente a cada chamada para evitar cache corrompido
-            client = Groq(api_key=clean_api_key)
+            # Reutiliza o cliente do pool (recriado apenas quando a API key muda)
+            client = get_groq_client(clean_api_key)
             
             # Prompt estruturado e profissional para cada professor
             system_prompt = f"""# IDENTIDADE DO PROFESSOR
@@ -588,7 +602,7 @@ SEMPRE termine sua resposta com uma dessas frases específicas:
 - Evite informações excessivamente avançadas
 - Use linguagem simples mas precisa"""
             
-            response = client.chat.completions.create(
+            request = dict(
                 model="llama-3.3-70b-versatile",
                 messages=[
                     {"role": "system", "content": system_prompt},
@@ -598,6 +612,14 @@ SEMPRE termine sua resposta com uma dessas frases específicas:
                 max_tokens=1500
             )
             
+            if on_token is not None:
+                renderer = StreamRenderer(on_token)
+                for token in iter_chat_completion(clean_api_key, **request):
+                    renderer.feed(token)
+                return renderer.raw_text
+            
+            response = client.chat.completions.create(**request)
+            
             return response.choices[0].message.content
             
         except Exception as e:
@@ -612,8 +634,106 @@ Detalhes: {error_msg}
 💡 Verifique sua API Key e conexão com a internet.
 """
 
-def get_teacher_response(subject: str, user_message: str, api_key: str) -> str:
-    """Retorna resposta do professor específico com melhor tratamento de erro e analogias integradas automaticamente"""
+def _call_professor_response(response_fn: Callable, user_message: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """Chama a função de resposta do professor, repassando `on_token` quando ela suporta streaming"""
+    if on_token is not None:
+        try:
+            if "on_token" in inspect.signature(response_fn).parameters:
+                return response_fn(user_message, api_key, on_token=on_token)
+        except (TypeError, ValueError):
+            pass
+    return response_fn(user_message, api_key)
+
+# Pool limitado para gerar a resposta do professor e a analogia em paralelo
+# (duas tarefas por mensagem)
+RESPONSE_POOL_WORKERS = 8
+TEACHER_TIMEOUT_SECONDS = 120
+ANALOGIA_TIMEOUT_SECONDS = 20
+
+@st.cache_resource
+def get_response_executor() -> ThreadPoolExecutor:
+    """Pool único do processo: o app.py roda de novo a cada rerun e em cada sessão, o cache_resource não"""
+    return ThreadPoolExecutor(max_workers=RESPONSE_POOL_WORKERS, thread_name_prefix="atena-resposta")
+
+def _submit_with_context(fn: Callable, *args, **kwargs):
+    """Envia uma tarefa ao pool mantendo o contexto do Streamlit (st.* funciona na thread)"""
+    ctx = get_script_run_ctx() if get_script_run_ctx else None
+    
+    def _run():
+        if ctx is not None and add_script_run_ctx:
+            add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+    
+    return get_response_executor().submit(_run)
+
+def _get_base_response(subject: str, user_message: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """Obtém a resposta do professor da matéria (RAG local ou Groq genérico)"""
+    base_response = ""
+    
+    # Professor Carlos especializado (RAG Local)
+    if subject == "Matemática" and "carlos" in _imported_modules:
+        base_response = _call_professor_response(_imported_modules["carlos"]["response"], user_message, api_key, on_token)
+    
+    # Professora Luciana especializada (RAG Local de Química)
+    elif subject == "Química" and "luciana" in _imported_modules:
+        base_response = _call_professor_response(_imported_modules["luciana"]["response"], user_message, api_key, on_token)
+    
+    # Professor Roberto especializado (RAG Local de Biologia)
+    elif subject == "Biologia" and "roberto" in _imported_modules:
+        base_response = _call_professor_response(_imported_modules["roberto"]["response"], user_message, api_key, on_token)
+    
+    # Professor Eduardo especializado (RAG Local de História)
+    elif subject == "História" and "eduardo" in _imported_modules:
+        base_response = _call_professor_response(_imported_modules["eduardo"]["response"], user_message, api_key, on_token)
+    
+    # Professora Marina especializada (RAG Local de Geografia)
+    elif subject == "Geografia" and "marina" in _imported_modules:
+        base_response = _call_professor_response(_imported_modules["marina"]["response"], user_message, api_key, on_token)
+    
+    # Professora Letícia (RAG Local de Português)
+    elif subject == "Língua Portuguesa" and "leticia" in _imported_modules:
+        base_response = _call_professor_response(_imported_modules["leticia"]["response"], user_message, api_key, on_token)
+    
+    # Professor Fernando especializado (RAG Local de Física)
+    elif subject == "Física" and "fernando" in _imported_modules:
+        base_response = _call_professor_response(_imported_modules["fernando"]["response"], user_message, api_key, on_token)
+    
+    # Outros professores (Groq genérico)
+    else:
+        teacher = GroqTeacher(SUBJECTS[subject])
+        teacher.subject = subject
+        base_response = teacher.get_response(user_message, api_key, on_token=on_token)
+    
+    return base_response
+
+def _get_analogia_section(user_message: str, subject: str, api_key: str) -> str:
+    """Gera o trecho de analogia da série para a pergunta (vazio se não houver analogia relevante)"""
+    try:
+        lazy_import_analogias()
+        if "analogias" in _imported_modules and ANALOGIAS_AVAILABLE:
+            # Extrair conceito principal da pergunta de forma mais inteligente
+            conceito = extract_conceito_principal_melhorado(user_message, subject)
+            
+            if conceito and len(conceito) > 2:  # Só gera analogia se o conceito for significativo
+                # Gerar analogia contextualizada
+                analogia = _imported_modules["analogias"]["get_analogia"](conceito, subject, api_key)
+                
+                # Adicionar analogia à resposta se não for erro e se for relevante
+                if not analogia.startswith("❌") and len(analogia) > 50:
+                    # Integrar analogia de forma mais natural
+                    return f"\n\n🎬 **Analogia da Série para {conceito}:**\n{analogia}"
+    except Exception as analogia_error:
+        # Se falhar ao gerar analogia, continua com a resposta normal (silenciosamente)
+        print(f"Erro ao gerar analogia: {analogia_error}")
+    
+    return ""
+
+def get_teacher_response(subject: str, user_message: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Retorna resposta do professor específico com melhor tratamento de erro e analogias integradas automaticamente.
+    A resposta e a analogia são geradas em paralelo; se a analogia atrasar, a resposta segue sem ela.
+    Se `on_token` for informado, recebe o texto parcial da resposta enquanto ela é gerada.
+    """
     
     # Validação inicial da API key
     if not api_key or not isinstance(api_key, str) or not api_key.strip():
@@ -624,61 +744,35 @@ Por favor, configure sua API Key corretamente nas configurações do Streamlit C
 """
     
     try:
-        # Obter resposta base do professor
-        base_response = ""
-        
-        # Professor Carlos especializado (RAG Local)
-        if subject == "Matemática" and "carlos" in _imported_modules:
-            base_response = _imported_modules["carlos"]["response"](user_message, api_key)
-        
-        # Professora Luciana especializada (RAG Local de Química)
-        elif subject == "Química" and "luciana" in _imported_modules:
-            base_response = _imported_modules["luciana"]["response"](user_message, api_key)
-        
-        # Professor Roberto especializado (RAG Local de Biologia)
-        elif subject == "Biologia" and "roberto" in _imported_modules:
-            base_response = _imported_modules["roberto"]["response"](user_message, api_key)
+        # Depois do timeout, atualizações atrasadas do streaming são ignoradas
+        timed_out = threading.Event()
+        stream_callback = None
+        if on_token is not None:
+            def stream_callback(text: str):
+                if not timed_out.is_set():
+                    on_token(text)
         
-        # Professor Eduardo especializado (RAG Local de História)
-        elif subject == "História" and "eduardo" in _imported_modules:
-            base_response = _imported_modules["eduardo"]["response"](user_message, api_key)
+        analogia_future = _submit_with_context(_get_analogia_section, user_message, subject, api_key)
+        teacher_future = _submit_with_context(_get_base_response, subject, user_message, api_key, stream_callback)
+        started_at = time.time()
         
-        # Professora Marina especializada (RAG Local de Geografia)
-        elif subject == "Geografia" and "marina" in _imported_modules:
-            base_response = _imported_modules["marina"]["response"](user_message, api_key)
-        
-        # Professora Letícia (RAG Local de Português)
-        elif subject == "Língua Portuguesa" and "leticia" in _imported_modules:
-            base_response = _imported_modules["leticia"]["response"](user_message, api_key)
-        
-        # Professor Fernando especializado (RAG Local de Física)
-        elif subject == "Física" and "fernando" in _imported_modules:
-            base_response = _imported_modules["fernando"]["response"](user_message, api_key)
-        
-        # Outros professores (Groq genérico)
-        else:
-            teacher = GroqTeacher(SUBJECTS[subject])
-            teacher.subject = subject
-            base_response = teacher.get_response(user_message, api_key)
+        try:
+            base_response = teacher_future.result(timeout=TEACHER_TIMEOUT_SECONDS)
+        except FutureTimeoutError:
+            timed_out.set()
+            analogia_future.cancel()
+            return f"""
+⏱️ **O professor demorou demais para responder**
+
+A resposta não ficou pronta em {TEACHER_TIMEOUT_SECONDS} segundos. Tente novamente em instantes ou faça uma pergunta mais curta.
+"""
         
-        # Integrar analogia automaticamente se o sistema estiver disponível
+        # A analogia teve o mesmo tempo da resposta para rodar; espera só o que falta do prazo
+        remaining = max(0.0, ANALOGIA_TIMEOUT_SECONDS - (time.time() - started_at))
         try:
-            lazy_import_analogias()
-            if "analogias" in _imported_modules and ANALOGIAS_AVAILABLE:
-                # Extrair conceito principal da pergunta de forma mais inteligente
-                conceito = extract_conceito_principal_melhorado(user_message, subject)
-                
-                if conceito and len(conceito) > 2:  # Só gera analogia se o conceito for significativo
-                    # Gerar analogia contextualizada
-                    analogia = _imported_modules["analogias"]["get_analogia"](conceito, subject, api_key)
-                    
-                    # Adicionar analogia à resposta se não for erro e se for relevante
-                    if not analogia.startswith("❌") and len(analogia) > 50:
-                        # Integrar analogia de forma mais natural
-                        base_response += f"\n\n🎬 **Analogia da Série para {conceito}:**\n{analogia}"
-        except Exception as analogia_error:
-            # Se falhar ao gerar analogia, continua com a resposta normal (silenciosamente)
-            print(f"Erro ao gerar analogia: {analogia_error}")
+            base_response += analogia_future.result(timeout=remaining)
+        except FutureTimeoutError:
+            print(f"⏱️ Analogia não ficou pronta em {ANALOGIA_TIMEOUT_SECONDS}s; resposta enviada sem ela")
         
         return base_response
             
@@ -709,62 +803,62 @@ Pode reformular sua pergunta? Vou fazer o meu melhor para responder sobre o tóp
 """
         return error_response
 
+# Palavras-chave mais específicas e contextualizadas por matéria (para as analogias)
+KEYWORDS_POR_MATERIA = {
+    "Matemática": [
+        "equação", "função", "geometria", "trigonometria", "álgebra", "cálculo",
+        "probabilidade", "estatística", "progressão", "logaritmo", "matriz",
+        "polinômio", "derivada", "integral", "limite", "conjunto", "vetor"
+    ],
+    "Física": [
+        "força", "movimento", "velocidade", "aceleração", "energia", "calor",
+        "eletricidade", "luz", "onda", "som", "relatividade", "gravidade",
+        "magnetismo", "pressão", "temperatura", "potência", "trabalho"
+    ],
+    "Química": [
+        "átomo", "molécula", "reação", "combustão", "ácido", "base", "energia",
+        "velocidade", "equilíbrio", "ligação", "termoquímica", "eletroquímica",
+        "solução", "concentração", "pH", "catalisador", "radioatividade"
+    ],
+    "Biologia": [
+        "célula", "gene", "evolução", "ecossistema", "respiração", "fotossíntese",
+        "sistema", "organela", "DNA", "mutação", "população", "metabolismo",
+        "enzima", "hormônio", "imunidade", "reprodução", "genética"
+    ],
+    "Geografia": [
+        "relevo", "clima", "rio", "população", "território", "globalização",
+        "erosão", "temperatura", "bacia", "migração", "urbanização", "industrialização",
+        "agricultura", "meio ambiente", "desenvolvimento", "região"
+    ],
+    "História": [
+        "revolução", "guerra", "independência", "república", "colonial",
+        "imperialismo", "feudalismo", "renascimento", "ditadura", "democracia",
+        "capitalismo", "socialismo", "nacionalismo", "liberalismo", "absolutismo"
+    ],
+    "Língua Portuguesa": [
+        "verbo", "substantivo", "sintaxe", "literatura", "redação", "texto",
+        "gramática", "interpretação", "figura", "concordância", "regência",
+        "pontuação", "acentuação", "morfologia", "semântica", "estilística"
+    ],
+    "Redação": [
+        "introdução", "desenvolvimento", "conclusão", "argumentação", "tese",
+        "coesão", "coerência", "proposta", "intervenção", "dissertação",
+        "narração", "descrição", "tipologia", "gênero", "estrutura"
+    ]
+}
+
+# Compiladas uma vez; a busca por mensagem é uma passada só
+KEYWORDS_POR_MATERIA_MATCHER = KeywordMatcher(KEYWORDS_POR_MATERIA)
+
 def extract_conceito_principal_melhorado(user_message: str, subject: str) -> str:
     """
     Extrai o conceito principal da pergunta do usuário de forma mais inteligente para gerar analogias.
     """
-    # Palavras-chave mais específicas e contextualizadas por matéria
-    keywords_por_materia = {
-        "Matemática": [
-            "equação", "função", "geometria", "trigonometria", "álgebra", "cálculo",
-            "probabilidade", "estatística", "progressão", "logaritmo", "matriz",
-            "polinômio", "derivada", "integral", "limite", "conjunto", "vetor"
-        ],
-        "Física": [
-            "força", "movimento", "velocidade", "aceleração", "energia", "calor",
-            "eletricidade", "luz", "onda", "som", "relatividade", "gravidade",
-            "magnetismo", "pressão", "temperatura", "potência", "trabalho"
-        ],
-        "Química": [
-            "átomo", "molécula", "reação", "combustão", "ácido", "base", "energia",
-            "velocidade", "equilíbrio", "ligação", "termoquímica", "eletroquímica",
-            "solução", "concentração", "pH", "catalisador", "radioatividade"
-        ],
-        "Biologia": [
-            "célula", "gene", "evolução", "ecossistema", "respiração", "fotossíntese",
-            "sistema", "organela", "DNA", "mutação", "população", "metabolismo",
-            "enzima", "hormônio", "imunidade", "reprodução", "genética"
-        ],
-        "Geografia": [
-            "relevo", "clima", "rio", "população", "território", "globalização",
-            "erosão", "temperatura", "bacia", "migração", "urbanização", "industrialização",
-            "agricultura", "meio ambiente", "desenvolvimento", "região"
-        ],
-        "História": [
-            "revolução", "guerra", "independência", "república", "colonial",
-            "imperialismo", "feudalismo", "renascimento", "ditadura", "democracia",
-            "capitalismo", "socialismo", "nacionalismo", "liberalismo", "absolutismo"
-        ],
-        "Língua Portuguesa": [
-            "verbo", "substantivo", "sintaxe", "literatura", "redação", "texto",
-            "gramática", "interpretação", "figura", "concordância", "regência",
-            "pontuação", "acentuação", "morfologia", "semântica", "estilística"
-        ],
-        "Redação": [
-            "introdução", "desenvolvimento", "conclusão", "argumentação", "tese",
-            "coesão", "coerência", "proposta", "intervenção", "dissertação",
-            "narração", "descrição", "tipologia", "gênero", "estrutura"
-        ]
-    }
-    
-    # Converter para minúsculas para comparação
-    message_lower = user_message.lower()
-    keywords = keywords_por_materia.get(subject, [])
-    
-    # Procurar por palavras-chave específicas na mensagem
-    for keyword in keywords:
-        if keyword in message_lower:
-            return keyword.title()
+    # Procurar (numa única passada) a primeira palavra-chave da matéria presente na mensagem
+    keywords = KEYWORDS_POR_MATERIA.get(subject, [])
+    keyword = first_keyword(KEYWORDS_POR_MATERIA_MATCHER.count(user_message.lower()), keywords) if keywords else None
+    if keyword:
+        return keyword.title()
     
     # Se não encontrar palavra-chave específica, tentar extrair conceito mais inteligente
     # Remover palavras comuns e focar em substantivos importantes
@@ -1292,36 +1386,34 @@ def main():
             with st.chat_message("assistant", avatar=subject_info.get("avatar", "🤖")):
                 message_placeholder = st.empty()
                 
+                # Atualiza o placeholder conforme os tokens chegam
+                def render_partial(text: str):
+                    if current_subject in ["Matemática", "Física", "Química"]:
+                        with message_placeholder.container():
+                            render_math_content(text)
+                    else:
+                        message_placeholder.markdown(text)
+                
                 # Obtém a resposta do professor adequado
                 try:
-                    full_response = get_teacher_response(current_subject, prompt, api_key)
+                    full_response = get_teacher_response(current_subject, prompt, api_key, on_token=render_partial)
                     
                     # Verifica se há erro de API key e tenta resolver
                     if handle_api_error(full_response):
+                        # Descarta o cliente pooled da key invalidada
+                        get_groq_client_pool().invalidate(api_key)
                         # Tenta novamente com uma nova API key
                         new_api_key = get_api_key()
                         if new_api_key and new_api_key != api_key:
                             st.info("🔄 Tentando novamente com API key atualizada...")
-                            full_response = get_teacher_response(current_subject, prompt, new_api_key)
+                            full_response = get_teacher_response(current_subject, prompt, new_api_key, on_token=render_partial)
                 except Exception as e:
                     from encoding_utils import safe_api_error
                     full_response = safe_api_error(e)
                     handle_api_error(full_response)  # Tenta resolver automaticamente
                 
-                # Simula efeito de digitação e renderiza com fórmulas matemáticas
-                if current_subject in ["Matemática", "Física", "Química"]:
-                    # Para matérias com fórmulas, usa renderização especial
-                    with message_placeholder.container():
-                        render_math_content(full_response + "▌")
-                    time.sleep(0.01)
-                    message_placeholder.empty()
-                    with message_placeholder.container():
-                        render_math_content(full_response)
-                else:
-                    # Para outras matérias, usa markdown padrão
-                    message_placeholder.markdown(full_response + "▌")
-                    time.sleep(0.01)
-                    message_placeholder.markdown(full_response)
+                # Renderização final (sem cursor), já com fontes e analogias
+                render_partial(full_response)
 
                 # Salva a resposta da IA no banco de dados
                 if conversation_id:
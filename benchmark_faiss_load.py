@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark do carregamento dos índices FAISS: leitura completa (eager) x mmap.
+Cada modo roda em um subprocesso novo, para medir a memória sem interferência:
+    RssAnon  memória privada do processo (não é compartilhada entre workers)
+    RssFile  páginas do arquivo mapeado (compartilhadas pelo cache do sistema)
+
+Uso:
+    python benchmark_faiss_load.py                      # todos os faiss_index_*/*.faiss
+    python benchmark_faiss_load.py faiss_index_math/index.faiss --queries 50
+"""
+
+import argparse
+import glob
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+MODES = ["eager", "mmap"]
+
+
+def _memory_mb() -> Dict[str, float]:
+    """Lê RssAnon/RssFile do /proc (Linux) em MB."""
+    values = {"RssAnon": 0.0, "RssFile": 0.0}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                key = line.split(":")[0]
+                if key in values:
+                    values[key] = int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return values
+
+
+def run_worker(mode: str, paths: List[str], queries: int) -> Dict:
+    """Executado no subprocesso: carrega os índices e mede memória e latência."""
+    from vectorstore_loader import read_faiss_index
+
+    before = _memory_mb()
+    start = time.perf_counter()
+    indexes = [read_faiss_index(path, mode) for path in paths]
+    load_seconds = time.perf_counter() - start
+    after_load = _memory_mb()
+
+    rng = np.random.default_rng(0)
+    first_query = []
+    other_queries = []
+    for index in indexes:
+        vectors = rng.standard_normal((queries, index.d)).astype(np.float32)
+        for i, vector in enumerate(vectors):
+            t = time.perf_counter()
+            index.search(vector[None, :], 4)
+            (first_query if i == 0 else other_queries).append(time.perf_counter() - t)
+    after_queries = _memory_mb()
+
+    return {
+        "mode": mode,
+        "load_ms": load_seconds * 1000,
+        "first_query_ms": sum(first_query) * 1000,
+        "query_ms": float(np.mean(other_queries)) * 1000 if other_queries else 0.0,
+        "anon_load_mb": after_load["RssAnon"] - before["RssAnon"],
+        "anon_query_mb": after_queries["RssAnon"] - before["RssAnon"],
+        "file_query_mb": after_queries["RssFile"] - before["RssFile"],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara o carregamento eager x mmap dos índices FAISS.")
+    parser.add_argument("paths", nargs="*", help="arquivos .faiss (padrão: faiss_index_*/*.faiss)")
+    parser.add_argument("--queries", type=int, default=20, help="buscas por índice")
+    parser.add_argument("--worker", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob("faiss_index_*/*.faiss"))
+    if not paths:
+        print("❌ Nenhum índice .faiss encontrado")
+        sys.exit(1)
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, paths, args.queries)))
+        return
+
+    print(f"📊 {len(paths)} índices: {', '.join(paths)}")
+    print(f"{'modo':<6} {'load ms':>9} {'1ª busca ms':>12} {'busca ms':>9} "
+          f"{'privada MB':>11} {'priv. após buscas':>18} {'compartilhada MB':>17}")
+    for mode in MODES:
+        output = subprocess.run(
+            [sys.executable, __file__, *paths, "--queries", str(args.queries), "--worker", mode],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:<6} {result['load_ms']:>9.1f} {result['first_query_ms']:>12.2f} {result['query_ms']:>9.3f} "
+              f"{result['anon_load_mb']:>11.1f} {result['anon_query_mb']:>18.1f} {result['file_query_mb']:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Relatório recall@k x latência dos índices aproximados (IVF-Flat, IVF-PQ, HNSW)
+contra o índice exato de cada matéria, para escolher o ponto de operação.
+
+As consultas são questões sorteadas de questions_primeiro_dia.json e
+questions_segundo_enem.json. Se questions_embeddings.npz (gerado por
+questions_embeddings.py, mesmo modelo) existir, os vetores vêm dele; senão
+as questões sorteadas são vetorizadas com o modelo de embeddings.
+
+Uso:
+    python benchmark_faiss_recall.py                                  # todos os faiss_index_*/*.faiss
+    python benchmark_faiss_recall.py faiss_index_math/index.faiss --k 5 --nprobes 1,4,16 --json recall_math.json
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from faiss_index_builder import apply_search_params, build_faiss_index, default_nlist, index_vectors
+from questions_embeddings import (
+    QUESTIONS_EMBEDDINGS_FILE,
+    QUESTIONS_EMBEDDINGS_MODEL,
+    QUESTIONS_FILES,
+    QuestionsEmbeddingIndex,
+    question_text,
+)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def load_query_vectors(n_queries: int, seed: int = 42) -> np.ndarray:
+    """Sorteia questões do ENEM e retorna os vetores das consultas."""
+    questions: Dict[str, Dict] = {}
+    for path in QUESTIONS_FILES:
+        with open(path, "r", encoding="utf-8") as f:
+            questions.update(json.load(f))
+    sample = random.Random(seed).sample(sorted(questions), min(n_queries, len(questions)))
+
+    if os.path.exists(QUESTIONS_EMBEDDINGS_FILE):
+        index = QuestionsEmbeddingIndex(QUESTIONS_EMBEDDINGS_FILE)
+        positions = {qid: i for i, qid in enumerate(index.ids)}
+        rows = [positions[qid] for qid in sample if qid in positions]
+        if rows:
+            print(f"📚 {len(rows)} consultas lidas de '{QUESTIONS_EMBEDDINGS_FILE}'")
+            return index.matrix[rows]
+
+    from embeddings_registry import acquire_embeddings
+
+    embeddings = acquire_embeddings(
+        model_name=QUESTIONS_EMBEDDINGS_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+    print(f"📚 Vetorizando {len(sample)} consultas...")
+    return np.asarray(embeddings.embed_documents([question_text(questions[qid]) for qid in sample]), dtype=np.float32)
+
+
+def _measure(index, queries: np.ndarray, exact_ids: np.ndarray, k: int) -> Dict[str, float]:
+    """Busca uma consulta por vez (como nos professores) e mede recall e latência."""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, exact_ids):
+        start = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(ids[0].tolist()) & set(expected.tolist()))
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "recall": hits / (len(queries) * k),
+        "latency_ms": float(latencies_ms.mean()),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+    }
+
+
+def _size_mb(index) -> float:
+    import faiss
+
+    return faiss.serialize_index(index).nbytes / (1024 * 1024)
+
+
+def evaluate_index(path: str, queries: np.ndarray, args: argparse.Namespace) -> List[Dict]:
+    """Constrói as variantes aproximadas do índice e compara com o exato."""
+    import faiss
+
+    vectors = index_vectors(faiss.read_index(path))
+    n_vectors = len(vectors)
+    nlist = args.nlist or default_nlist(n_vectors)
+
+    exact = build_faiss_index(vectors, "flat")
+    _, exact_ids = exact.search(queries, args.k)
+
+    rows = []
+
+    def record(label: str, params: str, index):
+        result = _measure(index, queries, exact_ids, args.k)
+        result.update({"index": path, "type": label, "params": params, "size_mb": _size_mb(index)})
+        rows.append(result)
+
+    record("flat", "exato", exact)
+
+    ivf_flat = build_faiss_index(vectors, "ivf_flat", nlist=nlist)
+    for nprobe in args.nprobes:
+        record("ivf_flat", f"nlist={nlist} nprobe={nprobe}", apply_search_params(ivf_flat, nprobe=nprobe))
+
+    for pq_m in args.pq_ms:
+        if vectors.shape[1] % pq_m:
+            continue
+        ivf_pq = build_faiss_index(vectors, "ivf_pq", nlist=nlist, pq_m=pq_m)
+        for nprobe in args.nprobes:
+            record("ivf_pq", f"nlist={nlist} m={pq_m} nprobe={nprobe}", apply_search_params(ivf_pq, nprobe=nprobe))
+
+    for hnsw_m in args.hnsw_ms:
+        hnsw = build_faiss_index(vectors, "hnsw", hnsw_m=hnsw_m)
+        for ef_search in args.ef_searches:
+            record("hnsw", f"M={hnsw_m} efSearch={ef_search}", apply_search_params(hnsw, ef_search=ef_search))
+
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k x latência dos índices FAISS aproximados.")
+    parser.add_argument("paths", nargs="*", help="arquivos .faiss (padrão: faiss_index_*/*.faiss)")
+    parser.add_argument("--k", type=int, default=5, help="mesmo k dos retrievers dos professores")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobes", type=_int_list, default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--pq-ms", type=_int_list, default=[32, 64])
+    parser.add_argument("--hnsw-ms", type=_int_list, default=[16, 32])
+    parser.add_argument("--ef-searches", type=_int_list, default=[16, 32, 64, 128])
+    parser.add_argument("--json", help="salva as linhas do relatório neste arquivo")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob("faiss_index_*/*.faiss"))
+    queries = np.ascontiguousarray(load_query_vectors(args.queries), dtype=np.float32)
+
+    all_rows = []
+    for path in paths:
+        rows = evaluate_index(path, queries, args)
+        all_rows.extend(rows)
+        print(f"\n📊 {path} ({len(queries)} consultas, recall@{args.k})")
+        print(f"{'tipo':<9} {'parâmetros':<32} {'recall':>7} {'ms/busca':>9} {'p95 ms':>8} {'MB':>7}")
+        for row in rows:
+            print(f"{row['type']:<9} {row['params']:<32} {row['recall']:>7.3f} "
+                  f"{row['latency_ms']:>9.3f} {row['p95_ms']:>8.3f} {row['size_mb']:>7.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(all_rows, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Relatório salvo em '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
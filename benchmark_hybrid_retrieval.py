@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Avaliação offline da busca híbrida: recall@k da busca densa (FAISS), do BM25
+auxiliar e das fusões RRF e ponderada em cada índice de matéria.
+
+As consultas são questões sorteadas de questions_primeiro_dia.json e
+questions_segundo_enem.json da disciplina do índice: o conteúdo da questão
+ou, quando ele não existe (segundo dia), o tema completo. Não há rótulos de
+relevância, então um trecho conta como relevante quando contém todos os
+termos do assunto principal do tema da questão (o trecho antes de "–", "/",
+"(" ou ":", ex.: "Isomeria óptica – quiralidade" -> "isomeria optica");
+questões sem nenhum trecho relevante no índice ficam de fora. Como o
+critério é a presença de termos, ele mede justamente o que a busca densa
+perde (termos exatos) e favorece o BM25 nas consultas feitas pelo tema;
+compare os modos entre si, não como números absolutos.
+
+Uso:
+    python benchmark_hybrid_retrieval.py                       # todos os faiss_index_* com questões
+    python benchmark_hybrid_retrieval.py faiss_index_chemistry --k 5 --queries 100 --json hibrida.json
+    python benchmark_hybrid_retrieval.py --sem-densa           # só BM25 (sem o modelo de embeddings)
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import time
+from typing import Dict, List, Set, Tuple
+
+from hybrid_retriever import BM25Sidecar, HybridRetriever, doc_key, tokenize
+from questions_embeddings import QUESTIONS_EMBEDDINGS_MODEL, QUESTIONS_FILES
+from vectorstore_loader import load_faiss_vectorstore
+
+# Pasta do índice -> disciplinas das questões usadas como consulta
+INDEX_DISCIPLINAS = {
+    "faiss_index_math": ["Matemática", "Matemática e suas Tecnologias"],
+    "faiss_index_physics": ["Física"],
+    "faiss_index_chemistry": ["Química"],
+    "faiss_index_biology": ["Biologia"],
+    "faiss_index_geography": ["Geografia"],
+    "faiss_index_history": ["História"],
+    "faiss_index_portuguese": ["Português", "Literatura"],
+}
+
+MAX_QUERY_CHARS = 1000
+
+# Separadores entre o assunto principal do tema e o detalhamento
+_TEMA_SEPARATORS = re.compile(r"[–—/(:]| - ")
+
+
+def load_questions() -> Dict[str, Dict]:
+    questions: Dict[str, Dict] = {}
+    for path in QUESTIONS_FILES:
+        with open(path, "r", encoding="utf-8") as f:
+            questions.update(json.load(f))
+    return questions
+
+
+def relevant_keys(tema: str, sidecar: BM25Sidecar) -> Set[Tuple[str, str]]:
+    """Trechos que contêm todos os termos do assunto principal do tema."""
+    terms = set(tokenize(_TEMA_SEPARATORS.split(tema)[0]))
+    if not terms:
+        return set()
+    return {
+        doc_key(doc) for doc in sidecar.iter_documents()
+        if terms <= set(tokenize(doc.page_content))
+    }
+
+
+def evaluate_folder(folder: str, questions: Dict[str, Dict], embeddings, args: argparse.Namespace) -> List[Dict]:
+    faiss_files = sorted(glob.glob(os.path.join(folder, "*.faiss")))
+    if not faiss_files:
+        return []
+    index_name = os.path.splitext(os.path.basename(faiss_files[0]))[0]
+    vectorstore = load_faiss_vectorstore(folder, embeddings, index_name)
+
+    start = time.perf_counter()
+    sidecar = BM25Sidecar(vectorstore)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    disciplinas = INDEX_DISCIPLINAS.get(os.path.basename(folder.rstrip("/")), [])
+    pool = sorted(
+        qid for qid, q in questions.items()
+        if q.get("disciplina") in disciplinas and (q.get("tema") or "").lower() not in ("", "tema geral")
+    )
+    sample = random.Random(args.seed).sample(pool, min(args.queries, len(pool)))
+
+    searches = {"bm25": lambda query, k: [doc for doc, _ in sidecar.search(query, k)]}
+    if embeddings is not None:
+        rrf = HybridRetriever(vectorstore=vectorstore, sidecar=sidecar, k=args.k, fusion="rrf")
+        weighted = HybridRetriever(vectorstore=vectorstore, sidecar=sidecar, k=args.k, fusion="weighted")
+        searches["densa"] = lambda query, k: vectorstore.similarity_search(query, k=k)
+        searches["hibrida_rrf"] = rrf.search
+        searches["hibrida_ponderada"] = weighted.search
+
+    totals = {mode: {"recall": 0.0, "acertos": 0, "segundos": 0.0} for mode in searches}
+    evaluated = 0
+    relevant_cache: Dict[str, Set[Tuple[str, str]]] = {}
+    for qid in sample:
+        question = questions[qid]
+        tema = question["tema"]
+        if tema not in relevant_cache:
+            relevant_cache[tema] = relevant_keys(tema, sidecar)
+        relevant = relevant_cache[tema]
+        if not relevant:
+            continue
+        query = (question.get("conteudo") or tema)[:MAX_QUERY_CHARS]
+        evaluated += 1
+        for mode, search in searches.items():
+            start = time.perf_counter()
+            docs = search(query, args.k)
+            totals[mode]["segundos"] += time.perf_counter() - start
+            found = len({doc_key(doc) for doc in docs} & relevant)
+            totals[mode]["recall"] += found / min(args.k, len(relevant))
+            totals[mode]["acertos"] += int(found > 0)
+
+    rows = []
+    for mode, total in totals.items():
+        rows.append({
+            "indice": folder,
+            "modo": mode,
+            "consultas": evaluated,
+            f"recall@{args.k}": total["recall"] / evaluated if evaluated else 0.0,
+            f"acerto@{args.k}": total["acertos"] / evaluated if evaluated else 0.0,
+            "ms_por_busca": total["segundos"] * 1000 / evaluated if evaluated else 0.0,
+            "trechos": len(sidecar),
+            "ms_montagem_bm25": build_ms,
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k da busca densa, BM25 e híbrida por matéria.")
+    parser.add_argument("folders", nargs="*", help="pastas dos índices (padrão: faiss_index_* conhecidas)")
+    parser.add_argument("--k", type=int, default=5, help="mesmo k dos retrievers dos professores")
+    parser.add_argument("--queries", type=int, default=100, help="questões sorteadas por índice")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sem-densa", action="store_true", help="avalia só o BM25")
+    parser.add_argument("--json", help="salva as linhas do relatório neste arquivo")
+    args = parser.parse_args()
+
+    folders = args.folders or [folder for folder in sorted(INDEX_DISCIPLINAS) if os.path.isdir(folder)]
+    questions = load_questions()
+
+    embeddings = None
+    if not args.sem_densa:
+        try:
+            from embeddings_registry import acquire_embeddings
+
+            embeddings = acquire_embeddings(
+                model_name=QUESTIONS_EMBEDDINGS_MODEL,
+                model_kwargs={'device': 'cpu'},
+                encode_kwargs={'normalize_embeddings': True}
+            )
+        except Exception as e:
+            print(f"⚠️ Modelo de embeddings indisponível ({e}); avaliando só o BM25")
+
+    all_rows = []
+    for folder in folders:
+        rows = evaluate_folder(folder, questions, embeddings, args)
+        if not rows:
+            continue
+        all_rows.extend(rows)
+        print(f"\n📊 {folder} ({rows[0]['consultas']} consultas, {rows[0]['trechos']} trechos, "
+              f"BM25 montado em {rows[0]['ms_montagem_bm25']:.0f} ms)")
+        print(f"{'modo':<18} {f'recall@{args.k}':>9} {f'acerto@{args.k}':>9} {'ms/busca':>9}")
+        for row in rows:
+            print(f"{row['modo']:<18} {row[f'recall@{args.k}']:>9.3f} {row[f'acerto@{args.k}']:>9.3f} "
+                  f"{row['ms_por_busca']:>9.2f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(all_rows, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ Relatório salvo em '{args.json}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Vazão (páginas/s) da extração de texto dos PDFs: serial x ProcessPoolExecutor.
+Confere também que o texto extraído em paralelo é idêntico ao serial.
+
+Por padrão usa as provas em "Segundo dia"; sem elas, os PDFs locais de
+cases_sucesso_redacao/ e exemplos_analogia/ servem de conjunto de teste.
+
+Uso:
+    python benchmark_pdf_extraction.py
+    python benchmark_pdf_extraction.py "Segundo dia" --workers 1,2,4 --pages-per-task 8 --repeat 3
+"""
+
+import argparse
+import os
+import time
+from pathlib import Path
+from typing import List
+
+from pdf_extraction import PAGES_PER_TASK, count_pages, extract_pdf_texts
+
+DEFAULT_FIXTURE_DIRS = ["cases_sucesso_redacao", "exemplos_analogia"]
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def list_fixture_pdfs(folders: List[str]) -> List[str]:
+    if not folders:
+        folders = ["Segundo dia"] if os.path.isdir("Segundo dia") else DEFAULT_FIXTURE_DIRS
+    pdfs = []
+    for folder in folders:
+        pdfs.extend(str(path) for path in sorted(Path(folder).rglob("*.pdf")))
+    return pdfs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Páginas/s da extração de PDFs, serial x paralela.")
+    parser.add_argument("folders", nargs="*", help="pastas com PDFs (padrão: 'Segundo dia' ou os PDFs de exemplo)")
+    parser.add_argument("--workers", type=_int_list, default=[1, os.cpu_count() or 1])
+    parser.add_argument("--pages-per-task", type=int, default=PAGES_PER_TASK)
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por configuração (vale a melhor)")
+    args = parser.parse_args()
+
+    pdfs = list_fixture_pdfs(args.folders)
+    if not pdfs:
+        print("❌ Nenhum PDF encontrado")
+        return
+    total_pages = sum(count_pages(pdf) for pdf in pdfs)
+    print(f"📚 {len(pdfs)} PDFs, {total_pages} páginas ({os.cpu_count()} núcleos)")
+
+    reference = None
+    print(f"{'processos':>9} {'segundos':>9} {'páginas/s':>10} {'idêntico':>9}")
+    for workers in args.workers:
+        best = float("inf")
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            texts = extract_pdf_texts(pdfs, workers=workers, pages_per_task=args.pages_per_task)
+            best = min(best, time.perf_counter() - start)
+        if reference is None:
+            reference = texts
+        same = "sim" if texts == reference else "NÃO"
+        print(f"{workers:>9} {best:>9.2f} {total_pages / best:>10.1f} {same:>9}")
+
+
+if __name__ == "__main__":
+    main()
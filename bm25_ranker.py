@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Ranqueador BM25F para A.T.E.N.A.
+Pontua registros com vários campos de texto (ex.: tema, disciplina, conteudo
+das questões do ENEM), com peso e normalização de tamanho por campo.
+Tudo o que depende só da coleção (idf, tamanhos, frequências normalizadas)
+é pré-calculado em arrays NumPy; uma consulta é um produto esparso
+vetorizado entre os termos da pergunta e as listas de postagem.
+"""
+
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Parâmetros clássicos do BM25
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+
+
+class BM25FIndex:
+    """Índice BM25F com listas de postagem em arrays NumPy."""
+
+    def __init__(
+        self,
+        records: Dict[str, Dict[str, str]],
+        field_weights: Dict[str, float],
+        tokenizer: Callable[[str], List[str]],
+        k1: float = DEFAULT_K1,
+        field_b: Optional[Dict[str, float]] = None,
+    ):
+        self.tokenizer = tokenizer
+        self.k1 = k1
+        self.field_weights = dict(field_weights)
+        self.field_b = {field: (field_b or {}).get(field, DEFAULT_B) for field in field_weights}
+
+        self.ids: List[str] = list(records.keys())
+        n_docs = len(self.ids)
+
+        # 1. Frequências por campo e tamanho de cada campo
+        field_tfs: Dict[str, List[Counter]] = {field: [] for field in field_weights}
+        field_lengths = {field: np.zeros(n_docs, dtype=np.float32) for field in field_weights}
+        for doc_idx, record_id in enumerate(self.ids):
+            record = records[record_id]
+            for field in field_weights:
+                tokens = tokenizer(record.get(field, "") or "")
+                field_tfs[field].append(Counter(tokens))
+                field_lengths[field][doc_idx] = len(tokens)
+
+        # 2. Frequência combinada (BM25F): soma ponderada das tf normalizadas pelo tamanho do campo
+        combined: Dict[str, Dict[int, float]] = {}
+        for field, weight in field_weights.items():
+            lengths = field_lengths[field]
+            avg_length = float(lengths.mean()) if n_docs and lengths.mean() > 0 else 1.0
+            b = self.field_b[field]
+            norms = 1.0 - b + b * (lengths / avg_length)
+            for doc_idx, counts in enumerate(field_tfs[field]):
+                for term, tf in counts.items():
+                    postings = combined.setdefault(term, {})
+                    postings[doc_idx] = postings.get(doc_idx, 0.0) + weight * tf / norms[doc_idx]
+
+        # 3. Listas de postagem com a contribuição final (idf * saturação) já calculada
+        self.postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        for term, postings in combined.items():
+            doc_ids = np.fromiter(postings.keys(), dtype=np.int32, count=len(postings))
+            tf = np.fromiter(postings.values(), dtype=np.float32, count=len(postings))
+            df = len(postings)
+            idf = np.log(1.0 + (n_docs - df + 0.5) / (df + 0.5))
+            contributions = (idf * tf * (k1 + 1.0) / (tf + k1)).astype(np.float32)
+            self.postings[term] = (doc_ids, contributions)
+
+        self.n_docs = n_docs
+
+    def score(self, query: str, boost: Optional[np.ndarray] = None) -> np.ndarray:
+        """Retorna o vetor de pontuação BM25F de todos os registros para a consulta."""
+        scores = np.zeros(self.n_docs, dtype=np.float32)
+        for term, query_tf in Counter(self.tokenizer(query)).items():
+            entry = self.postings.get(term)
+            if entry is None:
+                continue
+            doc_ids, contributions = entry
+            # Cada registro aparece uma vez por termo, então a soma indexada é segura
+            scores[doc_ids] += query_tf * contributions
+        if boost is not None:
+            scores[scores > 0] += boost[scores > 0]
+        return scores
+
+    def top_k(self, query: str, k: int = 5, boost: Optional[np.ndarray] = None) -> List[Tuple[str, float]]:
+        """Retorna os k registros com maior pontuação (apenas pontuações positivas)."""
+        scores = self.score(query, boost)
+        candidates = np.flatnonzero(scores > 0)
+        if candidates.size == 0:
+            return []
+        if candidates.size > k:
+            best = np.argpartition(-scores[candidates], k - 1)[:k]
+            candidates = candidates[best]
+        ordered = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.ids[i], float(scores[i])) for i in ordered]
+
+    def mask_for(self, predicate: Callable[[str], bool]) -> np.ndarray:
+        """Máscara booleana dos registros cujo id satisfaz o predicado."""
+        return np.fromiter((predicate(record_id) for record_id in self.ids), dtype=bool, count=self.n_docs)
+
+
+class _ListTokenizer:
+    """Tokenizador que devolve lista; ao contrário de um lambda, pode ir para o pickle."""
+
+    def __init__(self, tokenizer: Callable[[str], Iterable[str]]):
+        self.tokenizer = tokenizer
+
+    def __call__(self, text: str) -> List[str]:
+        return list(self.tokenizer(text))
+
+
+def build_bm25f_index(
+    records: Dict[str, Dict[str, str]],
+    field_weights: Dict[str, float],
+    tokenizer: Callable[[str], Iterable[str]],
+    **kwargs,
+) -> BM25FIndex:
+    """Atalho para montar um índice BM25F."""
+    return BM25FIndex(records, field_weights, _ListTokenizer(tokenizer), **kwargs)
@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+"""
+Construção dos índices FAISS das matérias a partir das pastas de PDFs.
+
+Pipeline:
+    1. extração dos PDFs em um pool de processos (todas as matérias no mesmo pool)
+    2. divisão em trechos por um gerador (página a página, sem juntar tudo antes)
+    3. embeddings em lotes configuráveis, com progresso e vazão
+    4. gravação do índice (flat, IVF-Flat, IVF-PQ ou HNSW) e de um manifesto
+
+O manifesto guarda o SHA-256 e os ids dos trechos de cada PDF. Num novo build
+de um índice flat só os PDFs novos ou alterados são vetorizados, e os trechos
+de PDFs alterados ou removidos são apagados (use --full para refazer tudo).
+
+Uso:
+    python build_index.py analogia                        # uma matéria cadastrada
+    python build_index.py --all --workers 8               # todas as matérias
+    python build_index.py --pdf-dir minha_pasta/ --output faiss_index_teste
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from faiss_index_builder import add_index_arguments, build_faiss_index, describe_index, index_params_from_args
+from index_manifest import BUILD_MANIFEST_FILE, IndexManifest, ManifestDiff, chunk_id, chunk_ids_for, file_key
+
+# Matéria -> (pasta de PDFs, pasta do índice)
+BUILD_TARGETS: Dict[str, Tuple[str, str]] = {
+    "matematica": ("matemática/", "faiss_index_math"),
+    "fisica": ("física/", "faiss_index_physics"),
+    "quimica": ("quimica/", "faiss_index_chemistry"),
+    "analogia": ("analogia/", "faiss_index_analogia"),
+    "redacao_sucesso": ("cases_sucesso_redacao/", "faiss_index_cases_sucesso_redacao"),
+}
+
+EMBEDDINGS_MODEL = "sentence-transformers/distiluse-base-multilingual-cased-v1"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 150
+EMBED_BATCH_SIZE = 64
+
+
+def list_pdfs(pdf_dir: str) -> List[str]:
+    """PDFs da pasta em ordem estável (a ordem define os ids do índice)."""
+    if not os.path.isdir(pdf_dir):
+        return []
+    return sorted(
+        os.path.join(pdf_dir, name) for name in os.listdir(pdf_dir)
+        if name.lower().endswith(".pdf")
+    )
+
+
+def extract_pdf(pdf_path: str) -> Optional[List]:
+    """
+    Executado nos processos do pool: uma página por Document (mesmos metadados
+    do PyPDFLoader). Retorna None quando a extração falha, para não confundir
+    a falha com um PDF vazio.
+    """
+    from langchain_community.document_loaders import PyPDFLoader
+
+    try:
+        return PyPDFLoader(pdf_path).load()
+    except Exception as e:
+        print(f"❌ Erro ao carregar o arquivo {pdf_path}: {e}")
+        return None
+
+
+def iter_chunks(page_batches: Iterable[List], chunk_size: int = CHUNK_SIZE, chunk_overlap: int = CHUNK_OVERLAP) -> Iterator:
+    """Gera os trechos página a página, à medida que os PDFs chegam do pool."""
+    try:
+        from langchain_text_splitters import RecursiveCharacterTextSplitter
+    except ImportError:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    for pages in page_batches:
+        for page in pages:
+            yield from splitter.split_documents([page])
+
+
+def embed_in_batches(chunks: Iterable, embeddings, batch_size: int = EMBED_BATCH_SIZE) -> Tuple[List, np.ndarray]:
+    """Vetoriza os trechos em lotes, mostrando progresso e vazão."""
+    documents: List = []
+    vectors: List[np.ndarray] = []
+    batch: List = []
+    start_time = time.time()
+
+    def flush():
+        vectors.append(np.asarray(embeddings.embed_documents([doc.page_content for doc in batch]), dtype=np.float32))
+        documents.extend(batch)
+        elapsed = time.time() - start_time
+        print(f"  - {len(documents)} trechos vetorizados ({len(documents) / max(elapsed, 1e-9):.1f} trechos/s)")
+        batch.clear()
+
+    for chunk in chunks:
+        batch.append(chunk)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+
+    matrix = np.vstack(vectors) if vectors else np.zeros((0, 0), dtype=np.float32)
+    return documents, matrix
+
+
+def write_index(
+    documents: List,
+    vectors: np.ndarray,
+    ids: List[str],
+    embeddings,
+    output_dir: str,
+    index_type: str = "flat",
+    index_name: str = "index",
+    **params,
+):
+    """Grava o índice no formato do LangChain (index.faiss + index.pkl)."""
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    index = build_faiss_index(vectors, index_type, **params)
+    vectorstore = FAISS(embeddings, index, InMemoryDocstore(dict(zip(ids, documents))), dict(enumerate(ids)))
+    os.makedirs(output_dir, exist_ok=True)
+    vectorstore.save_local(output_dir, index_name)
+    return index
+
+
+def update_index(
+    documents: List,
+    vectors: np.ndarray,
+    ids: List[str],
+    stale_ids: List[str],
+    embeddings,
+    output_dir: str,
+    index_name: str = "index",
+):
+    """Atualiza um índice flat existente: apaga os trechos antigos e adiciona os novos."""
+    from langchain_community.vectorstores import FAISS
+
+    # Leitura completa (não mapeada): o índice vai ser modificado
+    vectorstore = FAISS.load_local(output_dir, embeddings, index_name, allow_dangerous_deserialization=True)
+    stale_ids = [doc_id for doc_id in stale_ids if doc_id in vectorstore.docstore._dict]
+    if stale_ids:
+        vectorstore.delete(stale_ids)
+    if documents:
+        vectorstore.add_embeddings(
+            zip([doc.page_content for doc in documents], vectors.tolist()),
+            metadatas=[doc.metadata for doc in documents],
+            ids=ids,
+        )
+    vectorstore.save_local(output_dir, index_name)
+    return vectorstore.index
+
+
+def build_settings(options: Dict) -> Dict:
+    """Configurações que, se mudarem, obrigam a reconstruir o índice do zero."""
+    return {
+        "embeddings_model": options.get("model_name", EMBEDDINGS_MODEL),
+        "chunk_size": options.get("chunk_size", CHUNK_SIZE),
+        "chunk_overlap": options.get("chunk_overlap", CHUNK_OVERLAP),
+        "normalize_embeddings": options.get("normalize_embeddings", False),
+        "index_type": options.get("index_type", "flat"),
+        "index_name": options.get("index_name", "index"),
+    }
+
+
+def plan_incremental(output_dir: str, pdf_paths: List[str], pdf_dir: str, options: Dict) -> Optional[ManifestDiff]:
+    """
+    Compara os PDFs com o manifesto do índice. Retorna None quando é preciso
+    reconstruir tudo (sem índice, configurações diferentes ou tipo sem remoção).
+    """
+    settings = build_settings(options)
+    manifest = IndexManifest(os.path.join(output_dir, BUILD_MANIFEST_FILE))
+    index_path = os.path.join(output_dir, f"{settings['index_name']}.faiss")
+    # Só o índice flat renumera as posições ao remover vetores, como o LangChain espera
+    if settings["index_type"] != "flat" or not manifest.exists() or not os.path.exists(index_path):
+        return None
+    if not manifest.compatible(settings):
+        print(f"ℹ️ Configurações mudaram desde o último build de '{output_dir}'; reconstruindo tudo.")
+        return None
+    return manifest.diff({file_key(path, pdf_dir): path for path in pdf_paths})
+
+
+def build_subject_index(
+    name: str,
+    pdf_dir: str,
+    pdf_paths: List[str],
+    page_futures: Dict[str, Future],
+    output_dir: str,
+    embeddings,
+    plan: Optional[ManifestDiff] = None,
+    index_type: str = "flat",
+    index_name: str = "index",
+    batch_size: int = EMBED_BATCH_SIZE,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    model_name: str = EMBEDDINGS_MODEL,
+    normalize_embeddings: bool = False,
+    **params,
+) -> Optional[Dict]:
+    """
+    Monta (ou atualiza, com `plan`) o índice de uma matéria a partir dos PDFs
+    já enviados ao pool.
+    """
+    settings = build_settings({
+        "model_name": model_name, "chunk_size": chunk_size, "chunk_overlap": chunk_overlap,
+        "normalize_embeddings": normalize_embeddings, "index_type": index_type, "index_name": index_name,
+    })
+    manifest = plan.manifest if plan is not None else IndexManifest(os.path.join(output_dir, BUILD_MANIFEST_FILE))
+    keys = {path: file_key(path, pdf_dir) for path in pdf_paths}
+    to_index = [path for path in pdf_paths if path in page_futures]
+
+    if plan is not None:
+        print(f"\n📚 {name}: atualização incremental de '{output_dir}' ({plan.summary()})")
+        if not plan.has_changes:
+            manifest.save()
+            print(f"✅ {name}: índice já está atualizado")
+            return manifest.data
+    else:
+        print(f"\n📚 {name}: {len(pdf_paths)} PDFs -> '{output_dir}'")
+        manifest.data["files"] = {}
+    start_time = time.time()
+
+    pages_per_pdf: Dict[str, int] = {}
+    # PDFs cuja extração falhou: ficam fora do manifesto e são tentados de novo no próximo build
+    failed: Set[str] = set()
+
+    def pages_in_order() -> Iterator[List]:
+        for pdf_path in to_index:
+            try:
+                pages = page_futures[pdf_path].result()
+            except Exception as e:
+                print(f"❌ Erro no processo de extração de {pdf_path}: {e}")
+                pages = None
+            if pages is None:
+                failed.add(pdf_path)
+                continue
+            pages_per_pdf[pdf_path] = len(pages)
+            yield pages
+
+    documents, vectors = embed_in_batches(
+        iter_chunks(pages_in_order(), chunk_size, chunk_overlap), embeddings, batch_size
+    )
+
+    # Ids por arquivo: hash do conteúdo + posição do trecho no arquivo
+    chunks_by_path: Dict[str, int] = {}
+    ids: List[str] = []
+    for doc in documents:
+        source = doc.metadata.get("source", "")
+        position = chunks_by_path.get(source, 0)
+        chunks_by_path[source] = position + 1
+        ids.append(chunk_id(keys[source], manifest.sha256_for(keys[source], source), position))
+
+    if plan is not None:
+        stale_ids = manifest.stale_chunk_ids(plan.changed + plan.removed)
+        index = update_index(documents, vectors, ids, stale_ids, embeddings, output_dir, index_name)
+        for key in plan.removed:
+            manifest.forget(key)
+    elif documents:
+        index = write_index(documents, vectors, ids, embeddings, output_dir, index_type, index_name, **params)
+    else:
+        print(f"❌ {name}: nenhum trecho extraído; índice não gerado.")
+        return None
+
+    for path in to_index:
+        key = keys[path]
+        if path in failed:
+            # Sem registro: o arquivo aparece como novo na próxima comparação
+            manifest.forget(key)
+            continue
+        count = chunks_by_path.get(path, 0)
+        manifest.record(key, path, chunk_ids_for(key, manifest.sha256_for(key, path), count),
+                        pages=pages_per_pdf.get(path, 0))
+
+    elapsed = time.time() - start_time
+    total_chunks = sum(entry["chunks"] for entry in manifest.files.values())
+    manifest.save(
+        settings,
+        subject=name,
+        built_at=datetime.now().isoformat(timespec="seconds"),
+        index=describe_index(index),
+        index_params=params,
+        dimension=int(index.d),
+        total_chunks=total_chunks,
+        build_seconds=round(elapsed, 2),
+    )
+    print(f"✅ {name}: {len(documents)} trechos vetorizados, {total_chunks} no índice, "
+          f"{describe_index(index)}, {elapsed:.1f}s")
+    if failed:
+        print(f"⚠️ {name}: {len(failed)} PDF(s) com falha na extração serão tentados de novo no próximo build")
+    return manifest.data
+
+
+def build_indexes(
+    targets: Dict[str, Tuple[str, str]],
+    embeddings,
+    workers: Optional[int] = None,
+    incremental: bool = True,
+    **options,
+) -> Dict[str, Optional[Dict]]:
+    """
+    Constrói vários índices. Todos os PDFs a extrair vão para o mesmo pool de
+    processos logo no início, então a extração das próximas matérias segue em
+    paralelo enquanto a matéria atual é vetorizada. Com `incremental`, só os
+    PDFs novos ou alterados desde o último build são extraídos.
+    """
+    results: Dict[str, Optional[Dict]] = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        submitted = {}
+        for name, (pdf_dir, output_dir) in targets.items():
+            pdf_paths = list_pdfs(pdf_dir)
+            if not pdf_paths:
+                print(f"⚠️ {name}: nenhum PDF encontrado em '{pdf_dir}'")
+                continue
+            plan = plan_incremental(output_dir, pdf_paths, pdf_dir, options) if incremental else None
+            if plan is None:
+                to_extract = pdf_paths
+            else:
+                changed = set(plan.to_index)
+                to_extract = [path for path in pdf_paths if file_key(path, pdf_dir) in changed]
+            futures = {path: executor.submit(extract_pdf, path) for path in to_extract}
+            submitted[name] = (pdf_dir, pdf_paths, futures, output_dir, plan)
+
+        for name, (pdf_dir, pdf_paths, futures, output_dir, plan) in submitted.items():
+            results[name] = build_subject_index(
+                name, pdf_dir, pdf_paths, futures, output_dir, embeddings, plan=plan, **options
+            )
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Constrói os índices FAISS das matérias a partir dos PDFs.")
+    parser.add_argument("subjects", nargs="*", help=f"matérias cadastradas ({', '.join(BUILD_TARGETS)})")
+    parser.add_argument("--all", action="store_true", help="constrói todas as matérias cadastradas")
+    parser.add_argument("--pdf-dir", help="pasta de PDFs avulsa (use com --output)")
+    parser.add_argument("--output", help="pasta do índice para --pdf-dir")
+    parser.add_argument("--index-name", default="index")
+    parser.add_argument("--full", action="store_true", help="ignora o manifesto e reconstrói do zero")
+    parser.add_argument("--workers", type=int, default=None, help="processos de extração (padrão: núcleos da máquina)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="trechos por lote de embeddings")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--model", default=EMBEDDINGS_MODEL)
+    parser.add_argument("--normalize", action="store_true",
+                        help="normaliza os vetores (os índices atuais foram gerados sem normalização)")
+    add_index_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.pdf_dir:
+        if not args.output:
+            parser.error("--pdf-dir exige --output")
+        targets = {os.path.basename(os.path.normpath(args.pdf_dir)): (args.pdf_dir, args.output)}
+    elif args.all:
+        targets = dict(BUILD_TARGETS)
+    else:
+        unknown = [name for name in args.subjects if name not in BUILD_TARGETS]
+        if unknown or not args.subjects:
+            parser.error(f"informe matérias válidas ({', '.join(BUILD_TARGETS)}), --all ou --pdf-dir")
+        targets = {name: BUILD_TARGETS[name] for name in args.subjects}
+
+    from embeddings_registry import acquire_embeddings
+
+    print("Carregando o modelo de embeddings...")
+    embeddings = acquire_embeddings(
+        model_name=args.model,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': args.normalize}
+    )
+
+    start_time = time.time()
+    results = build_indexes(
+        targets,
+        embeddings,
+        workers=args.workers,
+        incremental=not args.full,
+        index_type=args.index_type,
+        index_name=args.index_name,
+        batch_size=args.batch_size,
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        model_name=args.model,
+        normalize_embeddings=args.normalize,
+        **index_params_from_args(args),
+    )
+    built = sum(1 for manifest in results.values() if manifest)
+    print(f"\n🎉 {built}/{len(targets)} índices construídos em {time.time() - start_time:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Empacotamento do contexto recuperado para A.T.E.N.A.
+Fica entre a busca e o LLM: remove trechos repetidos e a sobreposição de 150
+caracteres que o RecursiveCharacterTextSplitter deixa entre trechos vizinhos,
+ordena pela pontuação da busca e corta tudo num orçamento de tokens por
+modelo. Assim o prompt só leva texto novo e a geração começa mais cedo.
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from langchain.schema import Document
+
+from token_utils import count_tokens, truncate_to_tokens
+
+# Orçamento de tokens do contexto por modelo (RAG_CONTEXT_TOKENS vale para todos)
+DEFAULT_CONTEXT_TOKENS = 1500
+CONTEXT_TOKEN_BUDGETS = {
+    "deepseek-r1-distill-llama-70b": 1500,
+    "llama-3.3-70b-versatile": 2000,
+    "llama-3.1-8b-instant": 1000,
+}
+
+# Sobreposição entre trechos vizinhos (chunk_overlap do build_index.py)
+CHUNK_OVERLAP = 150
+# Sobreposição mínima para considerar que dois trechos se continuam
+MIN_OVERLAP_CHARS = 40
+# Sobra mínima do orçamento para entrar um trecho cortado
+MIN_CHUNK_TOKENS = 60
+
+DOCUMENT_SEPARATOR = "\n\n"
+
+_stats_lock = threading.Lock()
+_stats = {
+    "chamadas": 0,
+    "trechos_brutos": 0,
+    "trechos_empacotados": 0,
+    "duplicados": 0,
+    "sobreposicoes": 0,
+    "tokens_brutos": 0,
+    "tokens_empacotados": 0,
+}
+
+
+@dataclass
+class PackedContext:
+    """Resultado do empacotamento: texto para o prompt e contagens antes/depois."""
+
+    text: str
+    documents: List[Document] = field(default_factory=list)
+    raw_tokens: int = 0
+    packed_tokens: int = 0
+    duplicates: int = 0
+    overlaps: int = 0
+
+
+def get_context_budget(model_name: str = "") -> int:
+    value = os.getenv("RAG_CONTEXT_TOKENS")
+    if value:
+        return int(value)
+    return CONTEXT_TOKEN_BUDGETS.get(model_name, DEFAULT_CONTEXT_TOKENS)
+
+
+def _overlap_length(previous: str, text: str, max_overlap: int = 2 * CHUNK_OVERLAP) -> int:
+    """Tamanho do maior final de `previous` que é começo de `text`."""
+    tail = previous[-max_overlap:]
+    probe = text[:MIN_OVERLAP_CHARS]
+    if len(probe) < MIN_OVERLAP_CHARS:
+        return 0
+    start = tail.find(probe)
+    while start != -1:
+        if text.startswith(tail[start:]):
+            return len(tail) - start
+        start = tail.find(probe, start + 1)
+    return 0
+
+
+def _order_by_score(documents: List[Document]) -> List[Document]:
+    """Maior metadata['score'] primeiro; sem pontuação, mantém a ordem da busca."""
+    if documents and all("score" in (doc.metadata or {}) for doc in documents):
+        return sorted(documents, key=lambda doc: -float(doc.metadata["score"]))
+    return list(documents)
+
+
+def pack_documents(documents: List[Document], max_tokens: Optional[int] = None) -> PackedContext:
+    """Deduplica, ordena e corta os trechos para caber em `max_tokens`."""
+    max_tokens = get_context_budget() if max_tokens is None else max_tokens
+    raw_tokens = sum(count_tokens(doc.page_content) for doc in documents)
+
+    unique: List[Document] = []
+    texts: List[str] = []
+    # Textos íntegros dos trechos escolhidos: a comparação de duplicados não pode
+    # usar `texts`, que já perderam as partes sobrepostas
+    originals: List[str] = []
+    duplicates = overlaps = 0
+    for doc in _order_by_score(documents):
+        text = doc.page_content.strip()
+        if not text or any(text in original for original in originals):
+            duplicates += 1
+            continue
+        original = text
+        source = (doc.metadata or {}).get("source")
+        for kept_doc, kept in zip(unique, texts):
+            if (kept_doc.metadata or {}).get("source") != source:
+                continue
+            # O trecho continua um já escolhido (ou o precede): tira a parte repetida
+            cut = _overlap_length(kept, text)
+            if cut:
+                text = text[cut:].lstrip()
+                overlaps += 1
+            cut = _overlap_length(text, kept)
+            if cut:
+                text = text[:-cut].rstrip()
+                overlaps += 1
+        if text:
+            unique.append(doc)
+            texts.append(text)
+            originals.append(original)
+        else:
+            duplicates += 1
+
+    packed_docs: List[Document] = []
+    packed_texts: List[str] = []
+    remaining = max_tokens
+    separator_tokens = count_tokens(DOCUMENT_SEPARATOR)
+    for doc, text in zip(unique, texts):
+        cost = count_tokens(text) + (separator_tokens if packed_texts else 0)
+        if cost > remaining:
+            if remaining >= MIN_CHUNK_TOKENS:
+                text = truncate_to_tokens(text, remaining - separator_tokens)
+                packed_docs.append(Document(page_content=text, metadata=dict(doc.metadata or {})))
+                packed_texts.append(text)
+            break
+        packed_docs.append(Document(page_content=text, metadata=dict(doc.metadata or {})))
+        packed_texts.append(text)
+        remaining -= cost
+
+    packed_text = DOCUMENT_SEPARATOR.join(packed_texts)
+    result = PackedContext(
+        text=packed_text,
+        documents=packed_docs,
+        raw_tokens=raw_tokens,
+        packed_tokens=count_tokens(packed_text),
+        duplicates=duplicates,
+        overlaps=overlaps,
+    )
+    with _stats_lock:
+        _stats["chamadas"] += 1
+        _stats["trechos_brutos"] += len(documents)
+        _stats["trechos_empacotados"] += len(packed_docs)
+        _stats["duplicados"] += duplicates
+        _stats["sobreposicoes"] += overlaps
+        _stats["tokens_brutos"] += raw_tokens
+        _stats["tokens_empacotados"] += result.packed_tokens
+    return result
+
+
+def get_packing_stats() -> Dict[str, Any]:
+    """Tokens de contexto recuperados x enviados ao LLM desde o início do processo."""
+    with _stats_lock:
+        stats = dict(_stats)
+    raw = stats["tokens_brutos"]
+    stats["economia"] = round(1 - stats["tokens_empacotados"] / raw, 3) if raw else 0.0
+    return stats
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Memória de conversa com orçamento de tokens para A.T.E.N.A.
+Substitui o ConversationBufferMemory dos professores, que crescia sem limite:
+as últimas trocas ficam na íntegra e as mais antigas são resumidas num resumo
+contínuo. O resumo é feito numa thread separada, fora do caminho da resposta;
+enquanto ele não fica pronto, o prompt usa o resumo anterior. Cada matéria tem
+seu orçamento de tokens, e a economia de prompt fica registrada em métricas.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from langchain.memory.chat_memory import BaseChatMemory
+from langchain.schema import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from pydantic import PrivateAttr
+
+from llm_streaming import strip_partial_think
+from token_utils import count_tokens, truncate_to_tokens
+
+# Trocas (pergunta + resposta) mantidas na íntegra
+MEMORY_MAX_TURNS = int(os.getenv("CHAT_MEMORY_MAX_TURNS", "4"))
+
+# Orçamento de tokens do histórico (resumo + trocas recentes) por matéria
+DEFAULT_TOKEN_BUDGET = int(os.getenv("CHAT_MEMORY_TOKEN_BUDGET", "1500"))
+MEMORY_TOKEN_BUDGETS = {
+    "Matemática": 1800,
+    "Física": 1800,
+    "Química": 1600,
+    "Biologia": 1500,
+    "Geografia": 1200,
+    "História": 1200,
+    "Língua Portuguesa": 1200,
+}
+
+# Tamanho máximo do resumo contínuo, em tokens
+SUMMARY_MAX_TOKENS = int(os.getenv("CHAT_MEMORY_SUMMARY_TOKENS", "300"))
+
+SUMMARY_PROMPT = """Resuma a conversa de estudo abaixo entre uma aluna e o professor em português,
+em no máximo {max_palavras} palavras. Mantenha os assuntos estudados, as dúvidas da aluna,
+fórmulas e conclusões importantes. Responda só com o resumo.
+
+RESUMO ATÉ AGORA:
+{resumo}
+
+NOVAS TROCAS:
+{trocas}
+
+NOVO RESUMO:"""
+
+# Uma única thread para os resumos: não disputa a CPU com as respostas
+_summary_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="resumo-memoria")
+
+_metrics_lock = threading.Lock()
+_metrics: Dict[str, Dict[str, int]] = {}
+
+
+def get_token_budget(subject: str) -> int:
+    """Orçamento da matéria; CHAT_MEMORY_TOKEN_BUDGET_<MATÉRIA> tem prioridade."""
+    env_name = "CHAT_MEMORY_TOKEN_BUDGET_" + subject.upper().replace(" ", "_")
+    value = os.getenv(env_name)
+    if value:
+        return int(value)
+    return MEMORY_TOKEN_BUDGETS.get(subject, DEFAULT_TOKEN_BUDGET)
+
+
+def _record(subject: str, **increments: int):
+    with _metrics_lock:
+        metrics = _metrics.setdefault(subject, {
+            "leituras": 0,
+            "tokens_historico_completo": 0,
+            "tokens_enviados": 0,
+            "resumos": 0,
+            "resumos_locais": 0,
+            "trocas_resumidas": 0,
+        })
+        for key, value in increments.items():
+            metrics[key] += value
+
+
+def get_memory_metrics() -> Dict[str, Dict[str, Any]]:
+    """Métricas por matéria: tokens que o histórico completo custaria x tokens enviados."""
+    with _metrics_lock:
+        result = {}
+        for subject, metrics in _metrics.items():
+            full = metrics["tokens_historico_completo"]
+            sent = metrics["tokens_enviados"]
+            result[subject] = {
+                **metrics,
+                "tokens_economizados": full - sent,
+                "economia": round(1 - sent / full, 3) if full else 0.0,
+            }
+        return result
+
+
+def _format_turns(turns: List[Tuple[str, str]]) -> str:
+    return "\n".join(f"Aluna: {question}\nProfessor: {answer}" for question, answer in turns)
+
+
+def format_chat_history(chat_history: Any) -> str:
+    """Resumo + trocas recentes da memória, como texto para o prompt."""
+    if not chat_history:
+        return ""
+    if isinstance(chat_history, str):
+        return chat_history.strip()
+    lines = []
+    for message in chat_history:
+        if isinstance(message, tuple) and len(message) == 2:
+            lines.append(f"Aluna: {message[0]}\nProfessor: {message[1]}")
+            continue
+        kind = getattr(message, "type", "")
+        content = str(getattr(message, "content", "") or "").strip()
+        if not content:
+            continue
+        if kind == "system":
+            lines.append(content)
+        elif kind == "human":
+            lines.append(f"Aluna: {content}")
+        elif kind == "ai":
+            lines.append(f"Professor: {content}")
+    return "\n".join(lines)
+
+
+def _local_summary(summary: str, turns: List[Tuple[str, str]], max_tokens: int) -> str:
+    """Resumo sem IA: as perguntas da aluna, das mais recentes para as mais antigas."""
+    questions = "; ".join(question for question, _ in reversed(turns))
+    text = f"Perguntas anteriores da aluna: {questions}" + (f". {summary}" if summary else "")
+    return truncate_to_tokens(text, max_tokens)
+
+
+class TokenBudgetMemory(BaseChatMemory):
+    """Trocas recentes na íntegra + resumo contínuo das antigas, dentro de um orçamento de tokens."""
+
+    memory_key: str = "chat_history"
+    subject: str = "Geral"
+    llm: Any = None
+    max_turns: int = MEMORY_MAX_TURNS
+    max_token_limit: int = DEFAULT_TOKEN_BUDGET
+    summary_max_tokens: int = SUMMARY_MAX_TOKENS
+    summary: str = ""
+
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _pending: List[Tuple[str, str]] = PrivateAttr(default_factory=list)
+    # Tokens das trocas já tiradas do buffer, no mesmo formato do prompt
+    _folded_tokens: int = PrivateAttr(default=0)
+    _generation: int = PrivateAttr(default=0)
+
+    @classmethod
+    def for_subject(cls, subject: str, llm: Any = None, **kwargs: Any) -> "TokenBudgetMemory":
+        return cls(subject=subject, llm=llm, max_token_limit=get_token_budget(subject), **kwargs)
+
+    @property
+    def memory_variables(self) -> List[str]:
+        return [self.memory_key]
+
+    def _turn_tokens(self, messages: List[BaseMessage]) -> int:
+        return sum(count_tokens(str(message.content)) for message in messages)
+
+    def load_memory_variables(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            messages: List[BaseMessage] = []
+            if self.summary:
+                messages.append(SystemMessage(content=f"Resumo da conversa até aqui: {self.summary}"))
+            messages.extend(self.chat_memory.messages)
+            # Histórico completo = trocas no buffer + trocas resumidas, medidos com o
+            # mesmo formatador do que é enviado (sem trocas resumidas, os dois são iguais)
+            full_tokens = count_tokens(format_chat_history(self.chat_memory.messages)) + self._folded_tokens
+
+        if messages:
+            _record(
+                self.subject,
+                leituras=1,
+                tokens_historico_completo=full_tokens,
+                tokens_enviados=count_tokens(format_chat_history(messages)),
+            )
+
+        if self.return_messages:
+            return {self.memory_key: messages}
+        return {self.memory_key: "\n".join(f"{m.type}: {m.content}" for m in messages)}
+
+    def save_context(self, inputs: Dict[str, Any], outputs: Dict[str, str]) -> None:
+        question, answer = self._get_input_output(inputs, outputs)
+        # O raciocínio interno (<think>) não volta para o prompt
+        answer = strip_partial_think(answer).strip()
+        with self._lock:
+            self.chat_memory.add_messages([HumanMessage(content=question), AIMessage(content=answer)])
+            folded = self._fold_old_turns()
+            generation = self._generation
+        if folded:
+            _summary_executor.submit(self._summarize_pending, generation)
+
+    def _fold_old_turns(self) -> bool:
+        """Tira do buffer as trocas além de max_turns ou do orçamento (mantém sempre a última)."""
+        messages = list(self.chat_memory.messages)
+        budget = self.max_token_limit - count_tokens(self.summary)
+        folded = False
+        while len(messages) > 2 and (
+            len(messages) > 2 * self.max_turns or self._turn_tokens(messages) > budget
+        ):
+            question, answer = messages[0], messages[1]
+            turn = (str(question.content), str(answer.content))
+            self._pending.append(turn)
+            self._folded_tokens += count_tokens(_format_turns([turn]))
+            messages = messages[2:]
+            folded = True
+        if folded:
+            self.chat_memory.clear()
+            self.chat_memory.add_messages(messages)
+        return folded
+
+    def _summarize_pending(self, generation: int):
+        """Roda na thread de resumos: junta as trocas pendentes ao resumo contínuo."""
+        with self._lock:
+            if generation != self._generation or not self._pending:
+                return
+            turns, self._pending = self._pending, []
+            summary = self.summary
+
+        new_summary = ""
+        if self.llm is not None:
+            prompt = SUMMARY_PROMPT.format(
+                max_palavras=int(self.summary_max_tokens * 0.6),
+                resumo=summary or "(vazio)",
+                trocas=_format_turns(turns),
+            )
+            try:
+                text = strip_partial_think(str(self.llm.invoke(prompt))).strip()
+                if not text.startswith("Erro na API"):
+                    new_summary = truncate_to_tokens(text, self.summary_max_tokens)
+            except Exception as e:
+                print(f"⚠️ Erro ao resumir a conversa ({self.subject}): {e}")
+        local = not new_summary
+        if local:
+            new_summary = _local_summary(summary, turns, self.summary_max_tokens)
+
+        with self._lock:
+            # A conversa foi limpa enquanto o resumo era feito
+            if generation != self._generation:
+                return
+            self.summary = new_summary
+        _record(self.subject, resumos=1, resumos_locais=int(local), trocas_resumidas=len(turns))
+
+    def clear(self) -> None:
+        with self._lock:
+            super().clear()
+            self.summary = ""
+            self._pending = []
+            self._folded_tokens = 0
+            self._generation += 1
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Registro compartilhado de modelos de embeddings para A.T.E.N.A.
+Todos os sistemas RAG usam a mesma instância de cada modelo, evitando
+várias cópias do mesmo transformer na memória do processo. Os modelos ficam
+carregados enquanto o processo viver: os professores são singletons que nunca
+são descartados, então não há contagem de referências nem liberação.
+
+Os vetores das consultas (embed_query) ficam num cache LRU único do processo,
+limitado por número de entradas e por bytes: a mesma mensagem da aluna,
+buscada pela cadeia, pelo cache de respostas, pelas analogias e pelo mapa
+mental, passa pelo transformer uma vez só.
+"""
+
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+try:
+    from langchain_huggingface import HuggingFaceEmbeddings
+except ImportError:
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+# Modelo padrão usado pelos índices FAISS dos professores
+DEFAULT_EMBEDDINGS_MODEL = "sentence-transformers/distiluse-base-multilingual-cased-v1"
+
+# Limites do cache de vetores de consulta (0 entradas desliga o cache)
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_EMBEDDING_CACHE_ENTRIES", "2048"))
+QUERY_CACHE_MAX_BYTES = int(float(os.getenv("QUERY_EMBEDDING_CACHE_MB", "16")) * 1024 * 1024)
+
+
+def normalize_query(text: str) -> str:
+    """
+    Forma canônica da consulta: Unicode NFC e espaços simples. Maiúsculas são
+    mantidas, porque o modelo diferencia maiúsculas (cased) e o vetor mudaria.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class QueryEmbeddingCache:
+    """LRU (modelo, consulta normalizada) -> vetor float32, limitado por entradas e bytes."""
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, max_bytes: int = QUERY_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._vectors: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._inflight: Dict[Tuple[str, str], threading.Event] = {}
+        self._bytes = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get_or_compute(self, namespace: str, text: str, compute) -> List[float]:
+        """Vetor em cache ou calculado por `compute(text)`; consultas iguais em paralelo calculam uma vez."""
+        if self.max_entries <= 0:
+            return compute(text)
+        key = (namespace, normalize_query(text))
+        while True:
+            with self._lock:
+                vector = self._vectors.get(key)
+                if vector is not None:
+                    self._vectors.move_to_end(key)
+                    self._hits += 1
+                    return vector.tolist()
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    self._misses += 1
+                    break
+            # Outra thread já está calculando este vetor
+            pending.wait()
+
+        try:
+            result = compute(text)
+            vector = np.asarray(result, dtype=np.float32)
+            with self._lock:
+                self._store(key, vector)
+            # Mesmo valor (float32) de um acerto: a consulta não muda conforme o cache
+            return vector.tolist()
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set()
+
+    def _store(self, key: Tuple[str, str], vector: np.ndarray):
+        if vector.nbytes > self.max_bytes:
+            return
+        old = self._vectors.pop(key, None)
+        if old is not None:
+            self._bytes -= old.nbytes
+        self._vectors[key] = vector
+        self._bytes += vector.nbytes
+        while len(self._vectors) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._vectors.popitem(last=False)
+            self._bytes -= evicted.nbytes
+            self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._vectors.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Acertos, falhas (passagens pelo transformer), taxa de acerto e ocupação."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "acertos": self._hits,
+                "falhas": self._misses,
+                "taxa_acerto": round(self._hits / lookups, 3) if lookups else 0.0,
+                "entradas": len(self._vectors),
+                "limite_entradas": self.max_entries,
+                "bytes": self._bytes,
+                "limite_bytes": self.max_bytes,
+                "despejos": self._evictions,
+            }
+
+
+_query_cache = QueryEmbeddingCache()
+
+
+def get_query_embedding_cache() -> QueryEmbeddingCache:
+    """Cache de vetores de consulta compartilhado por todos os modelos do processo."""
+    return _query_cache
+
+
+class CachedQueryEmbeddings(Embeddings):
+    """
+    Embeddings com embed_query passando pelo cache do processo. embed_documents
+    (indexação) vai direto ao modelo; os demais atributos são os do modelo.
+    """
+
+    def __init__(self, embeddings, namespace: str, cache: Optional[QueryEmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.namespace = namespace
+        self.cache = cache or get_query_embedding_cache()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.cache.get_or_compute(self.namespace, text, self.embeddings.embed_query)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embeddings.embed_documents(texts)
+
+    def __getattr__(self, name: str):
+        # Só chamado para atributos que não existem no wrapper (model_name, client...)
+        if name == "embeddings":
+            raise AttributeError(name)
+        return getattr(self.embeddings, name)
+
+
+class _RegistryEntry:
+    """Entrada do registro: o modelo carregado e quantas vezes ele foi pedido."""
+
+    def __init__(self):
+        self.embeddings = None
+        self.acquisitions = 0
+        self.load_lock = threading.Lock()
+
+
+class EmbeddingsRegistry:
+    """Registro de embeddings do processo, com carregamento lazy."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str, str], _RegistryEntry] = {}
+        self._loads = 0
+
+    @staticmethod
+    def _make_key(model_name: str, model_kwargs: Dict[str, Any], encode_kwargs: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Gera uma chave estável a partir do nome do modelo e das opções."""
+        return (
+            model_name,
+            json.dumps(model_kwargs, sort_keys=True, default=str),
+            json.dumps(encode_kwargs, sort_keys=True, default=str),
+        )
+
+    def acquire(
+        self,
+        model_name: str = DEFAULT_EMBEDDINGS_MODEL,
+        model_kwargs: Optional[Dict[str, Any]] = None,
+        encode_kwargs: Optional[Dict[str, Any]] = None,
+    ):
+        """
+        Retorna a instância compartilhada do modelo, carregando-a na primeira vez.
+        A instância vale até o fim do processo.
+        """
+        model_kwargs = model_kwargs or {}
+        encode_kwargs = encode_kwargs or {}
+        key = self._make_key(model_name, model_kwargs, encode_kwargs)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = _RegistryEntry()
+                self._entries[key] = entry
+            entry.acquisitions += 1
+
+        # O carregamento acontece fora do lock global para não bloquear
+        # outros modelos; o lock da entrada garante um único carregamento.
+        # Se falhar, a entrada fica sem modelo e a próxima chamada tenta de novo.
+        with entry.load_lock:
+            if entry.embeddings is None:
+                print(f"📦 Carregando modelo de embeddings compartilhado: {model_name}")
+                entry.embeddings = CachedQueryEmbeddings(
+                    HuggingFaceEmbeddings(
+                        model_name=model_name,
+                        model_kwargs=model_kwargs,
+                        encode_kwargs=encode_kwargs
+                    ),
+                    namespace="\x1f".join(key),
+                )
+                with self._lock:
+                    self._loads += 1
+
+        return entry.embeddings
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do registro (modelos carregados e quantas vezes foram pedidos)."""
+        with self._lock:
+            return {
+                "modelos_carregados": sum(1 for e in self._entries.values() if e.embeddings is not None),
+                "carregamentos_totais": self._loads,
+                "aquisicoes": {
+                    key[0]: entry.acquisitions for key, entry in self._entries.items()
+                },
+                "cache_consultas": get_query_embedding_cache().get_stats(),
+            }
+
+
+_registry_instance = None
+_registry_lock = threading.Lock()
+
+
+def get_embeddings_registry() -> EmbeddingsRegistry:
+    """Retorna a instância única (singleton) do registro de embeddings."""
+    global _registry_instance
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                _registry_instance = EmbeddingsRegistry()
+    return _registry_instance
+
+
+def acquire_embeddings(
+    model_name: str = DEFAULT_EMBEDDINGS_MODEL,
+    model_kwargs: Optional[Dict[str, Any]] = None,
+    encode_kwargs: Optional[Dict[str, Any]] = None,
+):
+    """Atalho para obter um modelo de embeddings compartilhado."""
+    return get_embeddings_registry().acquire(model_name, model_kwargs, encode_kwargs)
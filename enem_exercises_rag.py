@@ -11,17 +11,75 @@ from typing import List, Dict, Any, Optional
 import streamlit as st
 
 # Document processing
-from pypdf import PdfReader
 from docx import Document as DocxDocument
 
 # LangChain imports
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_community.vectorstores import Chroma
-try:
-    from langchain_huggingface import HuggingFaceEmbeddings
-except ImportError:
-    from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
+# Registro compartilhado de embeddings (um modelo por processo)
+from embeddings_registry import acquire_embeddings
+# Manifesto de conteúdo para reindexação incremental
+from index_manifest import BUILD_MANIFEST_FILE, IndexManifest, chunk_ids_for, file_key
+from pdf_extraction import extract_page_range, extract_pdf_texts, join_page_texts
+# Classificação por palavras-chave em uma passada
+from keyword_matcher import KeywordMatcher, first_label, label_scores
+
+# Configurações do índice de exercícios: se mudarem, o índice é refeito do zero
+ENEM_INDEX_SETTINGS = {
+    "embeddings_model": "sentence-transformers/all-MiniLM-L6-v2",
+    "chunk_size": 1000,
+    "chunk_overlap": 150,
+}
+
+# Palavras-chave por área (pontuação = palavras distintas encontradas)
+SUBJECT_AREA_KEYWORDS = {
+    "Matemática": [
+        'função', 'equação', 'gráfico', 'geometria', 'trigonometria',
+        'logaritmo', 'progressão', 'probabilidade', 'estatística',
+        'derivada', 'integral', 'matriz', 'determinante', 'sistema',
+        'polinômio', 'raiz', 'vértice', 'parábola', 'circunferência'
+    ],
+    "Ciências da Natureza": [
+        'física', 'química', 'biologia', 'célula', 'átomo', 'molécula',
+        'força', 'energia', 'velocidade', 'aceleração', 'movimento',
+        'reação', 'elemento', 'organismo', 'genética', 'evolução',
+        'ecologia', 'termodinâmica', 'eletricidade', 'magnetismo'
+    ],
+}
+
+# Tópicos específicos (vale o primeiro tópico, nesta ordem, com alguma palavra no texto)
+TOPIC_KEYWORDS = {
+    # Matemática
+    "Geometria Plana": ['área', 'perímetro', 'polígono', 'círculo', 'triângulo', 'quadrado'],
+    "Geometria Espacial": ['volume', 'cubo', 'esfera', 'cilindro', 'cone', 'pirâmide'],
+    "Funções": ['função', 'gráfico', 'domínio', 'imagem', 'f(x)', 'g(x)'],
+    "Análise Combinatória": ['combinatória', 'permutação', 'arranjo', 'combinação'],
+    "Probabilidade": ['probabilidade', 'chance', 'sorteio', 'aleatório'],
+    "Estatística": ['média', 'mediana', 'moda', 'desvio padrão'],
+    "Trigonometria": ['seno', 'cosseno', 'tangente', 'trigonométrica'],
+    "Álgebra": ['equação', 'expressão', 'polinômio', 'inequação'],
+    # Física
+    "Mecânica": ['força', 'movimento', 'energia', 'trabalho', 'potência', 'newton', 'cinética', 'potencial'],
+    "Termodinâmica": ['temperatura', 'calor', 'termodinâmica', 'gás', 'pressão'],
+    "Óptica": ['luz', 'lente', 'espelho', 'refração', 'reflexão', 'óptica'],
+    "Ondulatória": ['onda', 'frequência', 'amplitude', 'som', 'doppler'],
+    "Eletricidade": ['corrente', 'tensão', 'resistência', 'circuito', 'elétrons', 'eletricidade', 'eletrostática'],
+    # Química
+    "Química Orgânica": ['carbono', 'hidrocarboneto', 'álcool', 'função orgânica'],
+    "Estequiometria": ['mol', 'massa molar', 'estequiometria', 'cálculo estequiométrico'],
+    "Soluções": ['solução', 'concentração', 'molaridade', 'solubilidade'],
+    "Termoquímica": ['entalpia', 'reação exotérmica', 'reação endotérmica'],
+    "Eletroquímica": ['pilha', 'eletrólise', 'oxidação', 'redução'],
+    # Biologia
+    "Citologia": ['célula', 'membrana', 'citoplasma', 'núcleo', 'mitocôndria'],
+    "Genética": ['gene', 'dna', 'hereditariedade', 'genética', 'mendel'],
+    "Ecologia": ['ecossistema', 'bioma', 'cadeia alimentar', 'população'],
+    "Fisiologia Humana": ['sistema digestório', 'sistema respiratório', 'sistema circulatório']
+}
+
+# Compilado uma vez: área e tópico saem de uma única passada sobre o texto
+ENEM_KEYWORD_MATCHER = KeywordMatcher(SUBJECT_AREA_KEYWORDS, TOPIC_KEYWORDS)
 
 class ENEMExercisesRAG:
     """Sistema RAG para exercícios do ENEM"""
@@ -40,8 +98,8 @@ class ENEMExercisesRAG:
     def _setup_embeddings(self):
         """Configura embeddings HuggingFace"""
         try:
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name="sentence-transformers/all-MiniLM-L6-v2",
+            self.embeddings = acquire_embeddings(
+                model_name=ENEM_INDEX_SETTINGS["embeddings_model"],
                 model_kwargs={'device': 'cpu'},
                 encode_kwargs={'normalize_embeddings': True}
             )
@@ -51,8 +109,24 @@ class ENEMExercisesRAG:
             else:
                 print(f"Erro ao configurar embeddings: {str(e)}")
     
-    def process_enem_documents(self) -> bool:
-        """Processa todos os documentos do ENEM"""
+    def _list_exam_pdfs(self) -> Dict[str, Path]:
+        """PDFs de prova (não gabarito) de todos os anos, mais recentes primeiro"""
+        year_folders = [f for f in self.enem_folder_path.iterdir() if f.is_dir()]
+        year_folders.sort(key=lambda x: x.name, reverse=True)  # Mais recentes primeiro
+
+        pdf_files = {}
+        for year_folder in year_folders:
+            for pdf_file in sorted(year_folder.glob("*.pdf")):
+                if "gabarito" not in pdf_file.name.lower() and "gb" not in pdf_file.name.lower():
+                    pdf_files[file_key(str(pdf_file), str(self.enem_folder_path))] = pdf_file
+        return pdf_files
+
+    def process_enem_documents(self, full_rebuild: bool = False) -> bool:
+        """
+        Processa os documentos do ENEM de forma incremental: só os PDFs novos ou
+        alterados desde a última indexação são extraídos e vetorizados, e os
+        trechos de PDFs alterados ou removidos são apagados do vectorstore.
+        """
         if not self.enem_folder_path.exists():
             st.error(f"Pasta do ENEM não encontrada: {self.enem_folder_path}")
             return False
@@ -60,41 +134,76 @@ class ENEMExercisesRAG:
         try:
             print("🎯 Processando exercícios do ENEM...")
             
-            # Busca todos os anos
-            year_folders = [f for f in self.enem_folder_path.iterdir() if f.is_dir()]
-            year_folders.sort(key=lambda x: x.name, reverse=True)  # Mais recentes primeiro
+            manifest = IndexManifest(os.path.join(self.persist_directory, BUILD_MANIFEST_FILE))
+            if full_rebuild or not manifest.compatible(ENEM_INDEX_SETTINGS):
+                # Sem manifesto compatível não há como saber o que já está indexado
+                self._reset_vectorstore()
+                manifest.data["files"] = {}
+            
+            pdf_files = self._list_exam_pdfs()
+            diff = manifest.diff({key: str(path) for key, path in pdf_files.items()})
+            print(f"📊 Arquivos: {diff.summary()}")
+            
+            self.vectorstore = Chroma(
+                persist_directory=self.persist_directory,
+                embedding_function=self.embeddings
+            )
+            
+            stale_ids = manifest.stale_chunk_ids(diff.changed + diff.removed)
+            if stale_ids:
+                self.vectorstore.delete(ids=stale_ids)
+                print(f"🗑️ {len(stale_ids)} trechos antigos removidos")
+            for key in diff.removed:
+                manifest.forget(key)
+            
+            text_splitter = RecursiveCharacterTextSplitter(
+                chunk_size=ENEM_INDEX_SETTINGS["chunk_size"],
+                chunk_overlap=ENEM_INDEX_SETTINGS["chunk_overlap"]
+            )
             
             processed_files = 0
             total_exercises = 0
             
-            for year_folder in year_folders:
-                year = year_folder.name
-                print(f"📅 Processando ano {year}...")
+            # Extração do texto em paralelo (um processo por PDF ou faixa de páginas)
+            texts = extract_pdf_texts([str(pdf_files[key]) for key in diff.to_index])
+            
+            for key in diff.to_index:
+                pdf_file = pdf_files[key]
+                year = pdf_file.parent.name
+                print(f"   📄 Processando: {year}/{pdf_file.name}")
                 
-                # Busca arquivos PDF de prova (não gabarito)
-                pdf_files = [f for f in year_folder.glob("*.pdf") if "gabarito" not in f.name.lower() and "gb" not in f.name.lower()]
+                # None = falha na extração, já reportada: fica fora do manifesto
+                # para ser tentado de novo na próxima indexação
+                full_text = texts[str(pdf_file)]
+                if full_text is None:
+                    manifest.forget(key)
+                    print(f"   ❌ Extração falhou; o arquivo será processado de novo na próxima vez")
+                    continue
+                exercises = self._extract_exercises_from_pdf(pdf_file, year, full_text)
+                splits = text_splitter.split_documents(exercises)
+                ids = chunk_ids_for(key, manifest.sha256_for(key, str(pdf_file)), len(splits))
+                if splits:
+                    self.vectorstore.add_documents(splits, ids=ids)
+                manifest.record(key, str(pdf_file), ids, year=year, exercises=len(exercises))
                 
-                for pdf_file in pdf_files:
-                    print(f"   📄 Processando: {pdf_file.name}")
-                    
-                    # Extrai exercícios do PDF
-                    exercises = self._extract_exercises_from_pdf(pdf_file, year)
-                    
-                    if exercises:
-                        self.documents.extend(exercises)
-                        total_exercises += len(exercises)
-                        processed_files += 1
-                        print(f"   ✅ {len(exercises)} exercícios extraídos")
-                    else:
-                        print(f"   ⚠️ Nenhum exercício encontrado")
+                if exercises:
+                    self.documents.extend(exercises)
+                    total_exercises += len(exercises)
+                    processed_files += 1
+                    print(f"   ✅ {len(exercises)} exercícios extraídos")
+                else:
+                    print(f"   ⚠️ Nenhum exercício encontrado")
+            
+            manifest.save(ENEM_INDEX_SETTINGS)
             
             print(f"\n📊 Processamento concluído:")
             print(f"   📁 {processed_files} arquivos processados")
             print(f"   🎯 {total_exercises} exercícios extraídos")
             
-            if self.documents:
-                # Cria vectorstore
-                self._create_vectorstore()
+            if self.vectorstore._collection.count():
+                self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 5})
+                if diff.has_changes:
+                    st.success("✅ Vectorstore atualizado e salvo com sucesso!")
                 return True
             else:
                 st.warning("Nenhum exercício foi extraído dos documentos")
@@ -104,17 +213,29 @@ class ENEMExercisesRAG:
             st.error(f"Erro ao processar documentos do ENEM: {str(e)}")
             return False
     
-    def _extract_exercises_from_pdf(self, pdf_path: Path, year: str) -> List[Document]:
-        """Extrai exercícios individuais de um PDF do ENEM"""
+    def _reset_vectorstore(self):
+        """Apaga a coleção persistida (reconstrução completa)"""
+        if not os.path.exists(self.persist_directory):
+            return
         try:
-            reader = PdfReader(str(pdf_path))
-            full_text = ""
-            
-            # Extrai todo o texto do PDF
-            for page in reader.pages:
-                text = page.extract_text()
-                if text.strip():
-                    full_text += text + "\n"
+            Chroma(
+                persist_directory=self.persist_directory,
+                embedding_function=self.embeddings
+            ).delete_collection()
+            print(f"🔄 Vectorstore '{self.persist_directory}' será reconstruído do zero")
+        except Exception as e:
+            print(f"⚠️ Não foi possível limpar o vectorstore antigo: {e}")
+        self.vectorstore = None
+        self.retriever = None
+    
+    def _extract_exercises_from_pdf(self, pdf_path: Path, year: str, full_text: Optional[str] = None) -> List[Document]:
+        """
+        Extrai exercícios individuais de um PDF do ENEM. Recebe o texto já
+        extraído por extract_pdf_texts; sem ele, lê o PDF aqui.
+        """
+        try:
+            if full_text is None:
+                full_text = join_page_texts(extract_page_range(str(pdf_path)))
             
             # Identifica exercícios por padrões
             exercises = self._parse_exercises_from_text(full_text, year, pdf_path.name)
@@ -165,8 +286,9 @@ class ENEMExercisesRAG:
             
             # Filtra questões muito curtas ou muito longas
             if 100 < len(question_text) < 3000:
-                # Identifica área (matemática ou ciências)
-                area = self._identify_subject_area(question_text)
+                # Identifica área (matemática ou ciências) e tópico numa passada só
+                hits = ENEM_KEYWORD_MATCHER.count(question_text.lower())
+                area = self._identify_subject_area(question_text, hits)
                 
                 # Cria documento para a questão
                 doc = Document(
@@ -177,7 +299,7 @@ class ENEMExercisesRAG:
                         "source_file": filename,
                         "subject_area": area,
                         "document_type": "exercise",
-                        "topic": self._extract_topic_from_exercise(question_text)
+                        "topic": self._extract_topic_from_exercise(question_text, hits)
                     }
                 )
                 exercises.append(doc)
@@ -198,43 +320,29 @@ class ENEMExercisesRAG:
         
         for i, chunk in enumerate(chunks):
             if len(chunk.strip()) > 100:  # Filtra chunks muito pequenos
+                hits = ENEM_KEYWORD_MATCHER.count(chunk.lower())
                 doc = Document(
                     page_content=chunk,
                     metadata={
                         "year": year,
                         "chunk_number": i + 1,
                         "source_file": filename,
-                        "subject_area": self._identify_subject_area(chunk),
+                        "subject_area": self._identify_subject_area(chunk, hits),
                         "document_type": "exercise_chunk",
-                        "topic": self._extract_topic_from_exercise(chunk)
+                        "topic": self._extract_topic_from_exercise(chunk, hits)
                     }
                 )
                 documents.append(doc)
         
         return documents
     
-    def _identify_subject_area(self, text: str) -> str:
+    def _identify_subject_area(self, text: str, hits: Optional[Dict[str, int]] = None) -> str:
         """Identifica se é matemática ou ciências da natureza"""
-        text_lower = text.lower()
-        
-        # Palavras-chave para matemática
-        math_keywords = [
-            'função', 'equação', 'gráfico', 'geometria', 'trigonometria',
-            'logaritmo', 'progressão', 'probabilidade', 'estatística',
-            'derivada', 'integral', 'matriz', 'determinante', 'sistema',
-            'polinômio', 'raiz', 'vértice', 'parábola', 'circunferência'
-        ]
-        
-        # Palavras-chave para ciências
-        science_keywords = [
-            'física', 'química', 'biologia', 'célula', 'átomo', 'molécula',
-            'força', 'energia', 'velocidade', 'aceleração', 'movimento',
-            'reação', 'elemento', 'organismo', 'genética', 'evolução',
-            'ecologia', 'termodinâmica', 'eletricidade', 'magnetismo'
-        ]
-        
-        math_score = sum(1 for keyword in math_keywords if keyword in text_lower)
-        science_score = sum(1 for keyword in science_keywords if keyword in text_lower)
+        if hits is None:
+            hits = ENEM_KEYWORD_MATCHER.count(text.lower())
+        scores = label_scores(hits, SUBJECT_AREA_KEYWORDS)
+        math_score = scores["Matemática"]
+        science_score = scores["Ciências da Natureza"]
         
         if math_score > science_score:
             return "Matemática"
@@ -243,78 +351,12 @@ class ENEMExercisesRAG:
         else:
             return "Indeterminado"
     
-    def _extract_topic_from_exercise(self, text: str) -> str:
+    def _extract_topic_from_exercise(self, text: str, hits: Optional[Dict[str, int]] = None) -> str:
         """Extrai tópico específico do exercício"""
-        text_lower = text.lower()
-        
-        # Tópicos específicos de matemática
-        math_topics = {
-            "Geometria Plana": ['área', 'perímetro', 'polígono', 'círculo', 'triângulo', 'quadrado'],
-            "Geometria Espacial": ['volume', 'cubo', 'esfera', 'cilindro', 'cone', 'pirâmide'],
-            "Funções": ['função', 'gráfico', 'domínio', 'imagem', 'f(x)', 'g(x)'],
-            "Análise Combinatória": ['combinatória', 'permutação', 'arranjo', 'combinação'],
-            "Probabilidade": ['probabilidade', 'chance', 'sorteio', 'aleatório'],
-            "Estatística": ['média', 'mediana', 'moda', 'desvio padrão'],
-            "Trigonometria": ['seno', 'cosseno', 'tangente', 'trigonométrica'],
-            "Álgebra": ['equação', 'expressão', 'polinômio', 'inequação']
-        }
-        
-        # Tópicos de Ciências da Natureza
-        science_topics = {
-            # Física
-            "Mecânica": ['força', 'movimento', 'energia', 'trabalho', 'potência', 'newton', 'cinética', 'potencial'],
-            "Termodinâmica": ['temperatura', 'calor', 'termodinâmica', 'gás', 'pressão'],
-            "Óptica": ['luz', 'lente', 'espelho', 'refração', 'reflexão', 'óptica'],
-            "Ondulatória": ['onda', 'frequência', 'amplitude', 'som', 'doppler'],
-            "Eletricidade": ['corrente', 'tensão', 'resistência', 'circuito', 'elétrons', 'eletricidade', 'eletrostática'],
-            # Química
-            "Química Orgânica": ['carbono', 'hidrocarboneto', 'álcool', 'função orgânica'],
-            "Estequiometria": ['mol', 'massa molar', 'estequiometria', 'cálculo estequiométrico'],
-            "Soluções": ['solução', 'concentração', 'molaridade', 'solubilidade'],
-            "Termoquímica": ['entalpia', 'reação exotérmica', 'reação endotérmica'],
-            "Eletroquímica": ['pilha', 'eletrólise', 'oxidação', 'redução'],
-            # Biologia
-            "Citologia": ['célula', 'membrana', 'citoplasma', 'núcleo', 'mitocôndria'],
-            "Genética": ['gene', 'dna', 'hereditariedade', 'genética', 'mendel'],
-            "Ecologia": ['ecossistema', 'bioma', 'cadeia alimentar', 'população'],
-            "Fisiologia Humana": ['sistema digestório', 'sistema respiratório', 'sistema circulatório']
-        }
-        
-        all_topics = {**math_topics, **science_topics}
-        
-        for topic, keywords in all_topics.items():
-            if any(keyword in text_lower for keyword in keywords):
-                return topic
-        
-        return "Geral"
+        if hits is None:
+            hits = ENEM_KEYWORD_MATCHER.count(text.lower())
+        return first_label(hits, TOPIC_KEYWORDS) or "Geral"
     
-    def _create_vectorstore(self):
-        """Cria e persiste o vectorstore com os documentos"""
-        if not self.documents:
-            st.warning("Nenhum documento para processar")
-            return
-            
-        try:
-            st.info(f"💾 Criando vectorstore com {len(self.documents)} exercícios...")
-            
-            # Divide os documentos em chunks menores (se necessário)
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=150
-            )
-            splits = text_splitter.split_documents(self.documents)
-            
-            self.vectorstore = Chroma.from_documents(
-                documents=splits,
-                embedding=self.embeddings,
-                persist_directory=self.persist_directory
-            )
-            self.retriever = self.vectorstore.as_retriever(search_kwargs={"k": 5})
-            st.success("✅ Vectorstore criado e salvo com sucesso!")
-            
-        except Exception as e:
-            st.error(f"Erro ao criar vectorstore: {str(e)}")
-
     def load_existing_vectorstore(self) -> bool:
         """Carrega um vectorstore Chroma existente"""
         if self.vectorstore:
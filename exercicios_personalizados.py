@@ -1,8 +1,23 @@
 import streamlit as st
 import json
+import os
 from pathlib import Path
 import re
-from typing import Dict, List, Tuple
+from typing import Dict, List, Set, Tuple
+
+# Ranqueador BM25F (opcional; depende do NumPy)
+try:
+    from bm25_ranker import build_bm25f_index
+    BM25_AVAILABLE = True
+except ImportError:
+    BM25_AVAILABLE = False
+
+# Índice denso das questões (gerado offline por questions_embeddings.py)
+try:
+    from questions_embeddings import QuestionsEmbeddingIndex, QUESTIONS_EMBEDDINGS_FILE
+    SEMANTIC_AVAILABLE = True
+except ImportError:
+    SEMANTIC_AVAILABLE = False
 
 # --- CONFIGURAÇÃO HUGGING FACE ---
 # Substitua com seu usuário e nome do repositório onde os PDFs estão.
@@ -11,6 +26,13 @@ HF_REPO = "enem_tests_editions"
 HF_PDF_BASE_URL = f"https://huggingface.co/datasets/{HF_USER}/{HF_REPO}/resolve/main"
 # ---------------------------------
 
+# Ranqueador usado nas recomendações: "substring" (pontuação 10/5/3/1), "bm25" ou "semantico"
+EXERCICIOS_RANKER = os.getenv("EXERCICIOS_RANKER", "substring")
+
+# Pesos dos campos no BM25F e bônus (em unidades de BM25) para questões da matéria atual
+BM25_FIELD_WEIGHTS = {"tema": 3.0, "disciplina": 2.0, "conteudo": 1.0}
+BM25_SUBJECT_BOOST = 2.0
+
 @st.cache_data
 def load_data():
     """Carrega dados das questões do ENEM."""
@@ -100,6 +122,23 @@ def extract_keywords(text):
     
     return keywords
 
+# Mapeamento de matérias para disciplinas
+SUBJECT_MAPPING = {
+    "Matemática": ["matemática"],
+    "Física": ["física"],
+    "Química": ["química"],
+    "Biologia": ["biologia"],
+    "História": ["história"],
+    "Geografia": ["geografia"],
+    "Língua Portuguesa": ["português", "literatura", "artes"],
+    "Linguagens": ["português", "literatura", "artes", "espanhol"],
+    "Redação": ["redação", "português", "literatura"]
+}
+
+# Pesos de cada campo quando uma palavra-chave aparece nele
+FIELD_WEIGHTS = {"tema": 5, "disciplina": 3, "conteudo": 1}
+SUBJECT_BONUS = 10
+
 def calculate_relevance(question_data, keywords, subject):
     """Calcula a relevância de uma questão baseada nas palavras-chave e matéria."""
     score = 0
@@ -108,22 +147,9 @@ def calculate_relevance(question_data, keywords, subject):
     tema = question_data.get("tema", "").lower()
     conteudo = question_data.get("conteudo", "").lower()
     
-    # Mapeamento de matérias para disciplinas
-    subject_mapping = {
-        "Matemática": ["matemática"],
-        "Física": ["física"],
-        "Química": ["química"],
-        "Biologia": ["biologia"],
-        "História": ["história"],
-        "Geografia": ["geografia"],
-        "Língua Portuguesa": ["português", "literatura", "artes"],
-        "Linguagens": ["português", "literatura", "artes", "espanhol"],
-        "Redação": ["redação", "português", "literatura"]
-    }
-    
         # Bonus por matéria correspondente
-    if subject in subject_mapping:
-        for mapped_subject in subject_mapping[subject]:
+    if subject in SUBJECT_MAPPING:
+        for mapped_subject in SUBJECT_MAPPING[subject]:
             if mapped_subject in disciplina:
                 score += 10
             
@@ -138,8 +164,121 @@ def calculate_relevance(question_data, keywords, subject):
     
     return score
 
-def find_relevant_exercises(user_question, questions_data, current_subject):
-    """Encontra exercícios relevantes baseados na dúvida do usuário."""
+class QuestionIndex:
+    """
+    Índice invertido das questões, montado uma vez no load_question_index.
+    
+    Guarda, para cada campo (tema, disciplina, conteudo), as listas de postagem
+    token -> questões. Como as palavras-chave só têm caracteres de palavra,
+    "keyword in campo" equivale a "keyword é substring de algum token do campo",
+    então a busca só precisa varrer o vocabulário, não o texto das questões.
+    """
+    
+    def __init__(self, questions: Dict[str, Dict]):
+        self.order: List[str] = list(questions.keys())
+        self.position: Dict[str, int] = {qid: i for i, qid in enumerate(self.order)}
+        self.data: Dict[str, Dict] = questions
+        self.postings: Dict[str, Dict[str, Set[str]]] = {field: {} for field in FIELD_WEIGHTS}
+        # Pré-filtro por disciplina: disciplina (minúscula) -> questões
+        self.by_disciplina: Dict[str, List[str]] = {}
+        self._match_cache: Dict[Tuple[str, str], Set[str]] = {}
+        
+        for question_id, question_data in questions.items():
+            for field, postings in self.postings.items():
+                text = question_data.get(field, "").lower()
+                for token in set(re.findall(r'\w+', text)):
+                    postings.setdefault(token, set()).add(question_id)
+            disciplina = question_data.get("disciplina", "").lower()
+            self.by_disciplina.setdefault(disciplina, []).append(question_id)
+    
+    def matching_questions(self, field: str, keyword: str) -> Set[str]:
+        """Questões cujo campo contém a palavra-chave (mesma regra de substring do calculate_relevance)."""
+        cache_key = (field, keyword)
+        cached = self._match_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        matches: Set[str] = set()
+        for token, question_ids in self.postings[field].items():
+            if keyword in token:
+                matches |= question_ids
+        self._match_cache[cache_key] = matches
+        return matches
+    
+    def subject_scores(self, subject: str) -> Dict[str, int]:
+        """Bônus de matéria por questão, calculado uma vez por disciplina."""
+        scores: Dict[str, int] = {}
+        mapped_subjects = SUBJECT_MAPPING.get(subject, [])
+        for disciplina, question_ids in self.by_disciplina.items():
+            bonus = sum(SUBJECT_BONUS for mapped in mapped_subjects if mapped in disciplina)
+            if bonus:
+                for question_id in question_ids:
+                    scores[question_id] = bonus
+        return scores
+    
+    def search(self, keywords: List[str], subject: str, limit: int = 5) -> List[Tuple[str, int, Dict]]:
+        """Mesma pontuação 10/5/3/1 do calculate_relevance, tocando só as questões candidatas."""
+        scores = self.subject_scores(subject)
+        for keyword in keywords:
+            for field, weight in FIELD_WEIGHTS.items():
+                for question_id in self.matching_questions(field, keyword):
+                    scores[question_id] = scores.get(question_id, 0) + weight
+        
+        # Candidatas na ordem original, para manter o desempate da varredura completa
+        candidates = sorted(scores, key=self.position.__getitem__)
+        scored_questions = [
+            (question_id, scores[question_id], self.data[question_id])
+            for question_id in candidates if scores[question_id] > 0
+        ]
+        scored_questions.sort(key=lambda x: (x[1], int(x[0].split('_')[0])), reverse=True)
+        return scored_questions[:limit]
+
+def build_question_index(questions: Dict[str, Dict]) -> QuestionIndex:
+    """Monta o índice invertido das questões."""
+    return QuestionIndex(questions)
+
+class BM25ExerciseRanker:
+    """
+    Ranqueador BM25F das questões: tema, disciplina e conteudo com pesos próprios
+    e normalização pelo tamanho do campo (conteúdos longos não são favorecidos).
+    """
+    
+    def __init__(self, questions: Dict[str, Dict]):
+        self.data = questions
+        self.index = build_bm25f_index(questions, BM25_FIELD_WEIGHTS, extract_keywords)
+        self._boosts = {}
+    
+    def subject_boost(self, subject: str):
+        """Vetor de bônus das questões cuja disciplina corresponde à matéria."""
+        if subject not in self._boosts:
+            mapped_subjects = SUBJECT_MAPPING.get(subject, [])
+            mask = self.index.mask_for(
+                lambda qid: any(m in self.data[qid].get("disciplina", "").lower() for m in mapped_subjects)
+            )
+            self._boosts[subject] = mask * BM25_SUBJECT_BOOST
+        return self._boosts[subject]
+    
+    def search(self, user_question: str, subject: str, limit: int = 5) -> List[Tuple[str, float, Dict]]:
+        scores = self.index.score(user_question, self.subject_boost(subject))
+        scored_questions = [
+            (self.index.ids[i], round(float(scores[i]), 3), self.data[self.index.ids[i]])
+            for i in scores.nonzero()[0]
+        ]
+        scored_questions.sort(key=lambda x: (x[1], int(x[0].split('_')[0])), reverse=True)
+        return scored_questions[:limit]
+
+def build_bm25_ranker(questions: Dict[str, Dict]):
+    """Monta o ranqueador BM25F, ou None se o NumPy não estiver disponível."""
+    if not BM25_AVAILABLE:
+        return None
+    return BM25ExerciseRanker(questions)
+
+def find_relevant_exercises(user_question, questions_data, current_subject, index: QuestionIndex = None,
+                            ranker: str = None, bm25: BM25ExerciseRanker = None):
+    """
+    Encontra exercícios relevantes baseados na dúvida do usuário.
+    `ranker` escolhe entre "substring" (padrão) e "bm25" (requer o ranqueador `bm25`).
+    """
     if not user_question:
         return []
     
@@ -147,6 +286,14 @@ def find_relevant_exercises(user_question, questions_data, current_subject):
     if not keywords:
         return []
     
+    ranker = ranker or EXERCICIOS_RANKER
+    if ranker == "bm25" and bm25 is not None:
+        return bm25.search(user_question, current_subject)
+    
+    # Com o índice invertido, só as questões candidatas são pontuadas
+    if index is not None:
+        return index.search(keywords, current_subject)
+    
     # Calcula relevância para cada questão
     scored_questions = []
     for question_id, question_data in questions_data.items():
@@ -217,10 +364,62 @@ def get_pdf_info(question_key):
     
     return None
 
+@st.cache_resource
+def load_question_index():
+    """Índice invertido das questões: compartilhado via cache_resource, sem desserializar a cada rerun."""
+    return build_question_index(load_data()["questions"])
+
+@st.cache_resource
+def load_bm25_ranker():
+    """Ranqueador BM25F (arrays NumPy): compartilhado via cache_resource, sem copiar a cada rerun."""
+    return build_bm25_ranker(load_data()["questions"])
+
+@st.cache_resource
+def load_semantic_index():
+    """Carrega o índice denso das questões, se o arquivo já tiver sido gerado."""
+    if not SEMANTIC_AVAILABLE or not Path(QUESTIONS_EMBEDDINGS_FILE).exists():
+        return None
+    try:
+        return QuestionsEmbeddingIndex(QUESTIONS_EMBEDDINGS_FILE)
+    except Exception as e:
+        print(f"⚠️ Erro ao carregar o índice denso das questões: {e}")
+        return None
+
 class ExerciciosPersonalizados:
     def __init__(self):
         self.data = load_data()
         self.gabaritos = load_gabaritos()
+        self._query_embeddings = None
+
+    def find_semantic_exercises(self, user_question: str, current_subject: str, k: int = 5):
+        """
+        Recomendação semântica: embute a dúvida e busca as k questões mais próximas
+        no índice denso, filtrando pela matéria atual. Retorna None se o índice
+        não estiver disponível (quem chama volta para as palavras-chave).
+        """
+        index = load_semantic_index()
+        if index is None or not user_question:
+            return None
+        
+        try:
+            if self._query_embeddings is None:
+                from embeddings_registry import acquire_embeddings
+                self._query_embeddings = acquire_embeddings(
+                    model_name=index.model_name,
+                    model_kwargs={'device': 'cpu'},
+                    encode_kwargs={'normalize_embeddings': True}
+                )
+            query_vector = self._query_embeddings.embed_query(user_question)
+        except Exception as e:
+            print(f"⚠️ Erro ao gerar embedding da dúvida: {e}")
+            return None
+        
+        questions = self.data["questions"]
+        return [
+            (question_id, round(score, 3), questions[question_id])
+            for question_id, score in index.search(query_vector, k=k, subject=current_subject)
+            if question_id in questions
+        ]
 
     def setup_ui(self):
         st.markdown("### 📚 Exercícios Personalizados")
@@ -245,7 +444,15 @@ class ExerciciosPersonalizados:
         st.markdown("---")
         
         # Busca exercícios relevantes
-        recommendations = find_relevant_exercises(question_text, self.data["questions"], current_subject)
+        recommendations = None
+        if EXERCICIOS_RANKER == "semantico":
+            recommendations = self.find_semantic_exercises(question_text, current_subject)
+        if recommendations is None:
+            recommendations = find_relevant_exercises(
+                question_text, self.data["questions"], current_subject,
+                index=load_question_index(),
+                bm25=load_bm25_ranker() if EXERCICIOS_RANKER == "bm25" else None
+            )
 
         if not recommendations:
             st.warning("Não encontrei exercícios específicos para sua dúvida. Tente ser mais específico no chat!")
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Construção dos índices FAISS das bases de conhecimento de A.T.E.N.A.
+Além do índice exato (flat), gera índices aproximados para bases grandes:
+    ivf_flat  listas invertidas com vetores completos (nlist, nprobe)
+    ivf_pq    listas invertidas com quantização por produto (nlist, nprobe, pq_m, pq_bits)
+    hnsw      grafo HNSW com vetores completos (hnsw_m, ef_construction, ef_search)
+
+Os parâmetros de busca (nprobe / ef_search) ficam gravados no índice; podem
+ser sobrescritos no carregamento com FAISS_NPROBE e FAISS_EF_SEARCH.
+
+Reconstruir um índice existente em outro tipo (mantém os documentos):
+    python faiss_index_builder.py faiss_index_math faiss_index_math_ivf --index-type ivf_flat --nprobe 8
+"""
+
+import argparse
+import math
+import os
+import shutil
+from typing import List, Optional
+
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Padrões razoáveis para as bases atuais (alguns milhares de trechos)
+DEFAULT_NPROBE = 8
+DEFAULT_PQ_M = 32
+DEFAULT_PQ_BITS = 8
+DEFAULT_HNSW_M = 32
+DEFAULT_EF_CONSTRUCTION = 200
+DEFAULT_EF_SEARCH = 64
+
+# O k-means do FAISS pede ao menos ~39 pontos de treino por centróide
+MIN_POINTS_PER_CENTROID = 39
+
+
+def default_nlist(n_vectors: int) -> int:
+    """nlist ~ 4*sqrt(n), limitado pelo número de pontos de treino disponíveis."""
+    return max(1, min(int(4 * math.sqrt(n_vectors)), n_vectors // MIN_POINTS_PER_CENTROID))
+
+
+def build_faiss_index(
+    vectors: np.ndarray,
+    index_type: str = "flat",
+    nlist: Optional[int] = None,
+    nprobe: int = DEFAULT_NPROBE,
+    pq_m: int = DEFAULT_PQ_M,
+    pq_bits: int = DEFAULT_PQ_BITS,
+    hnsw_m: int = DEFAULT_HNSW_M,
+    ef_construction: int = DEFAULT_EF_CONSTRUCTION,
+    ef_search: int = DEFAULT_EF_SEARCH,
+):
+    """Cria, treina e preenche um índice L2 do tipo pedido (ids = ordem dos vetores)."""
+    import faiss
+
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Tipo de índice desconhecido: {index_type} (use {', '.join(INDEX_TYPES)})")
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    n_vectors, dimension = vectors.shape
+
+    if index_type == "flat":
+        index = faiss.IndexFlatL2(dimension)
+    elif index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+    else:
+        nlist = min(nlist or default_nlist(n_vectors), n_vectors)
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        else:
+            if dimension % pq_m != 0:
+                raise ValueError(f"pq_m={pq_m} precisa dividir a dimensão {dimension}")
+            # Bases pequenas não têm pontos para treinar 2^pq_bits centróides por subespaço
+            pq_bits = min(pq_bits, max(1, int(math.log2(n_vectors))))
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_bits)
+        index.train(vectors)
+        index.nprobe = min(nprobe, nlist)
+
+    index.add(vectors)
+    return index
+
+
+def apply_search_params(index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """Ajusta nprobe (IVF) e ef_search (HNSW) de um índice já carregado."""
+    import faiss
+
+    if nprobe:
+        try:
+            ivf = faiss.extract_index_ivf(index)
+            ivf.nprobe = min(nprobe, ivf.nlist)
+        except RuntimeError:
+            pass  # não é um índice IVF
+    if ef_search and hasattr(index, "hnsw"):
+        index.hnsw.efSearch = ef_search
+    return index
+
+
+def index_vectors(index) -> np.ndarray:
+    """Recupera os vetores de um índice (flat, IVF ou HNSW) na ordem dos ids."""
+    import faiss
+
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def describe_index(index) -> str:
+    """Descrição curta do índice e dos seus parâmetros de busca."""
+    import faiss
+
+    name = type(index).__name__
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        return f"{name}(nlist={ivf.nlist}, nprobe={ivf.nprobe})"
+    except RuntimeError:
+        pass
+    if hasattr(index, "hnsw"):
+        return f"{name}(M={index.hnsw.nb_neighbors(1)}, efSearch={index.hnsw.efSearch})"
+    return name
+
+
+def vectorstore_from_documents(documents: List, embeddings, index_type: str = "flat", batch_size: int = 64, **params):
+    """
+    Equivalente ao FAISS.from_documents do LangChain, mas com o tipo de índice
+    escolhido. Os embeddings são gerados em lotes.
+    """
+    import uuid
+
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    texts = [doc.page_content for doc in documents]
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[start:start + batch_size]))
+
+    index = build_faiss_index(np.asarray(vectors, dtype=np.float32), index_type, **params)
+    ids = [str(uuid.uuid4()) for _ in documents]
+    docstore = InMemoryDocstore(dict(zip(ids, documents)))
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
+
+
+def rebuild_index(
+    source_dir: str,
+    output_dir: str,
+    index_type: str,
+    index_name: str = "index",
+    **params,
+) -> str:
+    """
+    Gera um índice de outro tipo a partir de um índice existente, sem
+    recalcular embeddings. Os documentos (pkl/docstore mapeado) são copiados.
+    """
+    import faiss
+
+    source = faiss.read_index(os.path.join(source_dir, f"{index_name}.faiss"))
+    index = build_faiss_index(index_vectors(source), index_type, **params)
+
+    os.makedirs(output_dir, exist_ok=True)
+    faiss.write_index(index, os.path.join(output_dir, f"{index_name}.faiss"))
+    for suffix in (".pkl", ".docs.bin", ".docs.idx", ".docs.json"):
+        path = os.path.join(source_dir, f"{index_name}{suffix}")
+        if os.path.exists(path):
+            shutil.copy2(path, os.path.join(output_dir, f"{index_name}{suffix}"))
+    return describe_index(index)
+
+
+def add_index_arguments(parser: argparse.ArgumentParser):
+    """Opções de tipo de índice compartilhadas pelos scripts de vetorização."""
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="flat")
+    parser.add_argument("--nlist", type=int, default=None, help="listas do IVF (padrão: ~4*sqrt(n))")
+    parser.add_argument("--nprobe", type=int, default=DEFAULT_NPROBE, help="listas visitadas por busca (IVF)")
+    parser.add_argument("--pq-m", type=int, default=DEFAULT_PQ_M, help="subvetores do PQ (divide a dimensão)")
+    parser.add_argument("--pq-bits", type=int, default=DEFAULT_PQ_BITS)
+    parser.add_argument("--hnsw-m", type=int, default=DEFAULT_HNSW_M, help="vizinhos por nó do HNSW")
+    parser.add_argument("--ef-construction", type=int, default=DEFAULT_EF_CONSTRUCTION)
+    parser.add_argument("--ef-search", type=int, default=DEFAULT_EF_SEARCH)
+
+
+def index_params_from_args(args: argparse.Namespace) -> dict:
+    return {
+        "nlist": args.nlist,
+        "nprobe": args.nprobe,
+        "pq_m": args.pq_m,
+        "pq_bits": args.pq_bits,
+        "hnsw_m": args.hnsw_m,
+        "ef_construction": args.ef_construction,
+        "ef_search": args.ef_search,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconstrói um índice FAISS existente em outro tipo.")
+    parser.add_argument("source_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--index-name", default="index")
+    add_index_arguments(parser)
+    args = parser.parse_args()
+
+    description = rebuild_index(
+        args.source_dir, args.output_dir, args.index_type,
+        index_name=args.index_name, **index_params_from_args(args)
+    )
+    print(f"✅ {description} salvo em '{args.output_dir}'")
+
+
+if __name__ == "__main__":
+    main()
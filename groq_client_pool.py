@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Pool de clientes Groq para A.T.E.N.A.
+Reutiliza conexões HTTP (keep-alive) entre as chamadas dos professores,
+recriando o cliente apenas quando a API key muda.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator
+
+import httpx
+from groq import Groq
+
+# Limites do pool de conexões HTTP de cada cliente
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE_CONNECTIONS = 10
+KEEPALIVE_EXPIRY_SECONDS = 60.0
+
+# Quantas API keys diferentes podem ter um cliente ativo ao mesmo tempo
+MAX_CLIENTS = 4
+
+
+def _fingerprint(api_key: str) -> str:
+    """Gera uma identificação da API key sem guardá-la em texto puro."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class _PooledClient:
+    """Cliente Groq com seu próprio pool de conexões e contadores de uso."""
+
+    def __init__(self, api_key: str):
+        self.requests = 0
+        self.created_at = time.time()
+        self.last_used = self.created_at
+        self.http_client = httpx.Client(
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            event_hooks={"request": [self._on_request]},
+        )
+        self.client = Groq(api_key=api_key, http_client=self.http_client)
+
+    def _on_request(self, request):
+        self.requests += 1
+        self.last_used = time.time()
+
+    def open_connections(self) -> int:
+        """Conta as conexões abertas no pool (melhor esforço, depende do httpcore)."""
+        try:
+            return len(self.http_client._transport._pool.connections)
+        except Exception:
+            return -1
+
+    def close(self):
+        try:
+            self.http_client.close()
+        except Exception:
+            pass
+
+
+class GroqClientPool:
+    """Fábrica de clientes Groq compartilhados, indexados pela API key."""
+
+    def __init__(self, max_clients: int = MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._clients: "OrderedDict[str, _PooledClient]" = OrderedDict()
+        self._created = 0
+        self._reused = 0
+        self._evicted = 0
+
+    def get_client(self, api_key: str) -> Groq:
+        """Retorna o cliente da API key, criando-o apenas na primeira vez."""
+        api_key = api_key.strip()
+        key = _fingerprint(api_key)
+
+        with self._lock:
+            pooled = self._clients.get(key)
+            if pooled is not None:
+                self._clients.move_to_end(key)
+                self._reused += 1
+                return pooled.client
+
+            pooled = _PooledClient(api_key)
+            self._clients[key] = pooled
+            self._created += 1
+
+            # Descarta os clientes de keys antigas (ex.: key rotacionada). Não fecha:
+            # outra thread pode estar no meio de um streaming com ele; as conexões
+            # são liberadas quando o último uso termina e o cliente é coletado.
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+                self._evicted += 1
+
+            return pooled.client
+
+    def invalidate(self, api_key: str):
+        """Descarta o cliente de uma API key (ex.: após erro 401)."""
+        with self._lock:
+            pooled = self._clients.pop(_fingerprint(api_key.strip()), None)
+        if pooled is not None:
+            pooled.close()
+
+    def close_all(self):
+        """Fecha todos os clientes e conexões do pool."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for pooled in clients:
+            pooled.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna estatísticas do pool de clientes e conexões."""
+        with self._lock:
+            return {
+                "clientes_ativos": len(self._clients),
+                "clientes_criados": self._created,
+                "reutilizacoes": self._reused,
+                "clientes_descartados": self._evicted,
+                "clientes": [
+                    {
+                        "key_id": key[:8],
+                        "requisicoes": pooled.requests,
+                        "conexoes_abertas": pooled.open_connections(),
+                        "idade_segundos": round(time.time() - pooled.created_at, 1),
+                    }
+                    for key, pooled in self._clients.items()
+                ]
+            }
+
+
+_pool_instance = None
+_pool_lock = threading.Lock()
+
+
+def get_groq_client_pool() -> GroqClientPool:
+    """Retorna a instância única (singleton) do pool de clientes Groq."""
+    global _pool_instance
+    if _pool_instance is None:
+        with _pool_lock:
+            if _pool_instance is None:
+                _pool_instance = GroqClientPool()
+    return _pool_instance
+
+
+def get_groq_client(api_key: str) -> Groq:
+    """Atalho para obter o cliente Groq compartilhado de uma API key."""
+    return get_groq_client_pool().get_client(api_key)
+
+
+def iter_chat_completion(api_key: str, **kwargs: Any) -> Iterator[str]:
+    """
+    Faz uma chamada de chat com stream=True e devolve o texto de cada chunk
+    conforme a Groq o envia, usando o cliente compartilhado da API key.
+    """
+    client = get_groq_client(api_key)
+    stream = client.chat.completions.create(stream=True, **kwargs)
+    for chunk in stream:
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            yield content
+
+
+def get_groq_pool_stats() -> Dict[str, Any]:
+    """Atalho para as estatísticas do pool."""
+    return get_groq_client_pool().get_stats()
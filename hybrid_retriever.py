@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Busca híbrida (léxica + densa) para os professores de A.T.E.N.A.
+A busca densa (distiluse-base-multilingual-cased-v1) perde termos exatos como
+"estequiometria", "Bhaskara" ou fórmulas químicas. Um índice BM25 auxiliar é
+montado a partir dos textos do docstore de cada índice FAISS (menos de um
+segundo por matéria), as duas buscas rodam em paralelo e os resultados são
+fundidos por reciprocal-rank fusion (RRF) ou por soma ponderada das
+pontuações normalizadas. A pontuação final vai em metadata["score"], que o
+context_packer usa para ordenar o contexto.
+"""
+
+import os
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Tuple
+
+from langchain.schema import BaseRetriever, Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from pydantic import ConfigDict
+
+# BM25 (opcional; depende do NumPy)
+try:
+    from bm25_ranker import BM25FIndex
+    BM25_AVAILABLE = True
+except ImportError:
+    BM25_AVAILABLE = False
+
+# "hybrid" (padrão) ou "dense" (só FAISS, como antes)
+RAG_RETRIEVAL = os.getenv("RAG_RETRIEVAL", "hybrid")
+
+# Fusão: "rrf" ou "weighted"
+HYBRID_FUSION = os.getenv("HYBRID_FUSION", "rrf")
+
+# Candidatos buscados em cada lado antes da fusão
+HYBRID_FETCH_K = int(os.getenv("HYBRID_FETCH_K", "20"))
+
+# Constante do RRF (60 é o valor usual da literatura)
+RRF_K = 60
+
+# Peso da busca densa na fusão ponderada (o resto é do BM25)
+DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "0.6"))
+
+# Palavras muito frequentes que não ajudam a distinguir trechos
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "da", "do", "das", "dos",
+    "e", "em", "na", "no", "nas", "nos", "por", "para", "pela", "pelo", "com", "sem",
+    "que", "se", "ao", "aos", "ou", "como", "mais", "mas", "sua", "seu", "suas", "seus",
+    "ser", "sao", "foi", "ja", "nao", "qual", "quais", "sobre", "entre", "isso", "esse",
+    "essa", "este", "esta", "me", "explique", "explica", "voce",
+}
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+_search_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="busca-hibrida")
+
+
+def tokenize(text: str) -> List[str]:
+    """Minúsculas, sem acentos, sem stopwords; números e fórmulas (h2so4) ficam inteiros."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return [token for token in _TOKEN_PATTERN.findall(text) if token not in STOPWORDS]
+
+
+class BM25Sidecar:
+    """
+    Índice BM25 dos textos do docstore de um vectorstore FAISS.
+    Guarda só os ids: os trechos escolhidos são lidos do docstore na hora da busca.
+    """
+
+    def __init__(self, vectorstore):
+        self.docstore = vectorstore.docstore
+        documents = self.docstore._dict
+        records = {doc_id: {"texto": documents[doc_id].page_content} for doc_id in documents}
+        self.index = BM25FIndex(records, {"texto": 1.0}, tokenize)
+
+    def __len__(self) -> int:
+        return len(self.index.ids)
+
+    def iter_documents(self) -> Iterator[Document]:
+        """Percorre todos os trechos indexados, lidos do docstore sob demanda."""
+        documents = self.docstore._dict
+        for doc_id in self.index.ids:
+            yield documents[doc_id]
+
+    def search(self, query: str, k: int) -> List[Tuple[Document, float]]:
+        results = []
+        for doc_id, score in self.index.top_k(query, k):
+            doc = self.docstore.search(doc_id)
+            if isinstance(doc, Document):
+                results.append((doc, score))
+        return results
+
+
+def doc_key(doc: Document) -> Tuple[str, str]:
+    return ((doc.metadata or {}).get("source", ""), doc.page_content)
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], rrf_k: int = RRF_K) -> List[Tuple[Document, float]]:
+    """Soma 1/(rrf_k + posição) de cada lista em que o trecho aparece."""
+    scores: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            key = doc_key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(((docs[key], score) for key, score in scores.items()), key=lambda item: -item[1])
+
+
+def weighted_fusion(
+    dense: List[Tuple[Document, float]],
+    lexical: List[Tuple[Document, float]],
+    dense_weight: float = DENSE_WEIGHT,
+) -> List[Tuple[Document, float]]:
+    """Soma ponderada: distância L2 do FAISS -> 1/(1+d); BM25 dividido pelo maior valor."""
+    scores: Dict[Tuple[str, str], float] = {}
+    docs: Dict[Tuple[str, str], Document] = {}
+    for doc, distance in dense:
+        key = doc_key(doc)
+        docs.setdefault(key, doc)
+        scores[key] = scores.get(key, 0.0) + dense_weight / (1.0 + max(float(distance), 0.0))
+    top_bm25 = max((score for _, score in lexical), default=0.0)
+    for doc, score in lexical:
+        key = doc_key(doc)
+        docs.setdefault(key, doc)
+        scores[key] = scores.get(key, 0.0) + (1.0 - dense_weight) * float(score) / top_bm25
+    return sorted(((docs[key], score) for key, score in scores.items()), key=lambda item: -item[1])
+
+
+class HybridRetriever(BaseRetriever):
+    """FAISS + BM25 em paralelo, fundidos por RRF (ou soma ponderada)."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    vectorstore: Any
+    sidecar: Any
+    k: int = 5
+    fetch_k: int = HYBRID_FETCH_K
+    fusion: str = HYBRID_FUSION
+
+    def search(self, query: str, k: int) -> List[Document]:
+        fetch_k = max(self.fetch_k, k)
+        dense_future = _search_executor.submit(self.vectorstore.similarity_search_with_score, query, fetch_k)
+        lexical = self.sidecar.search(query, fetch_k)
+        dense = dense_future.result()
+
+        if self.fusion == "weighted":
+            fused = weighted_fusion(dense, lexical)
+        else:
+            fused = reciprocal_rank_fusion([[doc for doc, _ in dense], [doc for doc, _ in lexical]])
+
+        results = []
+        for doc, score in fused[:k]:
+            metadata = dict(doc.metadata or {})
+            metadata["score"] = round(float(score), 6)
+            results.append(Document(page_content=doc.page_content, metadata=metadata))
+        return results
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search(query, self.k)
+
+
+def build_subject_retriever(vectorstore, k: int = 5):
+    """Retriever da matéria: híbrido quando possível, senão a busca densa de sempre."""
+    if RAG_RETRIEVAL == "hybrid" and BM25_AVAILABLE:
+        try:
+            sidecar = BM25Sidecar(vectorstore)
+            print(f"🔎 Índice BM25 auxiliar: {len(sidecar)} trechos")
+            return HybridRetriever(vectorstore=vectorstore, sidecar=sidecar, k=k)
+        except Exception as e:
+            print(f"⚠️ Busca híbrida indisponível, usando só a densa: {e}")
+    return vectorstore.as_retriever(search_type="similarity", search_kwargs={"k": k})
+
+
+def search_documents(retriever, vectorstore, query: str, k: int) -> List[Document]:
+    """Busca avulsa com k próprio (search_relevant_content), pelo mesmo caminho da cadeia."""
+    if isinstance(retriever, HybridRetriever):
+        return retriever.search(query, k)
+    return vectorstore.similarity_search(query, k=k)
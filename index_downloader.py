@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Download dos índices FAISS para A.T.E.N.A.
+Baixa os arquivos em paralelo, retoma downloads interrompidos com HTTP Range,
+grava em arquivos temporários (.part) renomeados atomicamente e confere o
+SHA-256 de cada arquivo antes de liberá-lo para o FAISS.
+
+Para gerar o manifesto de hashes a partir dos arquivos publicados
+(use caminho=nome_remoto quando o nome local for diferente do publicado):
+    python index_downloader.py faiss_index_math/index.faiss faiss_index_physics/index.faiss=index_physics.faiss ...
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+# Manifesto com o SHA-256 e o tamanho de cada arquivo publicado (chave: nome do arquivo remoto)
+INDEX_MANIFEST_FILE = "index_manifest.json"
+
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+MAX_PARALLEL_DOWNLOADS = 4
+MAX_RETRIES = 3
+REQUEST_TIMEOUT = (10, 60)
+
+_SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+def sha256_arquivo(path: str) -> str:
+    """Calcula o SHA-256 de um arquivo em blocos."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path: str = INDEX_MANIFEST_FILE) -> Dict[str, Dict]:
+    """Carrega o manifesto de hashes (vazio se não existir)."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Manifesto de índices inválido ({path}): {e}")
+        return {}
+
+
+def _remote_name(url: str) -> str:
+    return url.rstrip("/").split("/")[-1].split("?")[0]
+
+
+def _sidecar_path(local_path: str) -> str:
+    """Arquivo ao lado do índice com o hash conferido no download."""
+    return local_path + ".sha256"
+
+
+def _read_sidecar(local_path: str) -> Optional[str]:
+    try:
+        with open(_sidecar_path(local_path), "r", encoding="utf-8") as f:
+            return f.read().split()[0]
+    except (OSError, IndexError):
+        return None
+
+
+def _expected_sha256(url: str, manifest: Dict[str, Dict]) -> Optional[str]:
+    entry = manifest.get(_remote_name(url)) or {}
+    return entry.get("sha256")
+
+
+def is_file_valid(local_path: str, expected_sha256: Optional[str] = None) -> bool:
+    """
+    Confere se um arquivo local pode ser usado: precisa existir e bater com o
+    hash esperado (manifesto ou o hash registrado quando foi baixado).
+    Arquivos antigos sem nenhuma referência de hash são aceitos se não estiverem vazios.
+    """
+    if not os.path.exists(local_path) or os.path.getsize(local_path) == 0:
+        return False
+
+    expected = expected_sha256 or _read_sidecar(local_path)
+    if not expected:
+        return True
+    return sha256_arquivo(local_path) == expected
+
+
+def _header_sha256(response: requests.Response) -> Optional[str]:
+    """O Hugging Face informa o SHA-256 dos arquivos LFS no X-Linked-Etag."""
+    for header in ("X-Linked-Etag", "ETag"):
+        value = response.headers.get(header, "").strip('"').lower()
+        if value.startswith("w/"):
+            continue
+        if _SHA256_PATTERN.match(value):
+            return value
+    return None
+
+
+def _total_size(response: requests.Response, offset: int) -> Optional[int]:
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length) + (offset if response.status_code == 206 else 0)
+    return None
+
+
+def download_file(
+    url: str,
+    local_path: str,
+    expected_sha256: Optional[str] = None,
+    session: Optional[requests.Session] = None,
+    max_retries: int = MAX_RETRIES,
+) -> bool:
+    """
+    Baixa um arquivo para `local_path` de forma segura:
+    retoma do .part com Range, confere tamanho e SHA-256 e só então renomeia.
+    """
+    session = session or requests.Session()
+    part_path = local_path + ".part"
+    os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+
+    for attempt in range(1, max_retries + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+        try:
+            with session.get(url, stream=True, headers=headers, timeout=REQUEST_TIMEOUT) as r:
+                if r.status_code == 416:
+                    # O .part já está completo (ou é inválido): recomeça do zero
+                    os.remove(part_path)
+                    continue
+                r.raise_for_status()
+
+                # Servidor ignorou o Range: reescreve o arquivo inteiro
+                if offset and r.status_code != 206:
+                    offset = 0
+                total = _total_size(r, offset)
+                expected = expected_sha256 or _header_sha256(r)
+
+                with open(part_path, "ab" if offset else "wb") as f:
+                    for chunk in r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        if chunk:
+                            f.write(chunk)
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Download interrompido ({_remote_name(url)}, tentativa {attempt}/{max_retries}): {e}")
+            time.sleep(min(2 ** attempt, 10))
+            continue
+
+        size = os.path.getsize(part_path)
+        if total is not None and size < total:
+            print(f"⚠️ Download incompleto ({_remote_name(url)}: {size}/{total} bytes), retomando...")
+            continue
+        if total is not None and size > total:
+            os.remove(part_path)
+            continue
+
+        digest = sha256_arquivo(part_path)
+        if expected and digest != expected:
+            print(f"❌ SHA-256 não confere para {_remote_name(url)}: esperado {expected[:12]}…, obtido {digest[:12]}…")
+            os.remove(part_path)
+            continue
+
+        os.replace(part_path, local_path)
+        with open(_sidecar_path(local_path), "w", encoding="utf-8") as f:
+            f.write(f"{digest} {size}\n")
+        print(f"✅ Arquivo baixado: {local_path}")
+        return True
+
+    print(f"❌ Falha ao baixar {url} após {max_retries} tentativas")
+    return False
+
+
+def download_files(
+    files: List[Tuple[str, str]],
+    manifest: Optional[Dict[str, Dict]] = None,
+    max_workers: int = MAX_PARALLEL_DOWNLOADS,
+) -> Dict[str, bool]:
+    """
+    Garante uma lista de (url, caminho local): arquivos íntegros são mantidos
+    e os demais são baixados em paralelo. Retorna o resultado por caminho.
+    """
+    manifest = load_manifest() if manifest is None else manifest
+    results: Dict[str, bool] = {}
+    pending = []
+    for url, local_path in files:
+        expected = _expected_sha256(url, manifest)
+        if is_file_valid(local_path, expected):
+            results[local_path] = True
+        else:
+            pending.append((url, local_path, expected))
+
+    if pending:
+        session = requests.Session()
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            futures = {
+                local_path: executor.submit(download_file, url, local_path, expected, session)
+                for url, local_path, expected in pending
+            }
+            for local_path, future in futures.items():
+                results[local_path] = future.result()
+    return results
+
+
+def files_ready(files: List[Tuple[str, str]], manifest: Optional[Dict[str, Dict]] = None) -> bool:
+    """Indica se todos os arquivos já estão disponíveis e íntegros."""
+    manifest = load_manifest() if manifest is None else manifest
+    return all(is_file_valid(local_path, _expected_sha256(url, manifest)) for url, local_path in files)
+
+
+def ensure_files(files: List[Tuple[str, str]], manifest: Optional[Dict[str, Dict]] = None) -> bool:
+    """Baixa o que faltar e retorna True se todos os arquivos ficaram prontos."""
+    return all(download_files(files, manifest).values())
+
+
+def write_manifest(paths: List[str], manifest_path: str = INDEX_MANIFEST_FILE) -> Dict[str, Dict]:
+    """
+    Gera (ou atualiza) o manifesto com o hash e o tamanho dos arquivos informados.
+    Cada item é "caminho" ou "caminho=nome_remoto".
+    """
+    manifest = load_manifest(manifest_path)
+    for item in paths:
+        path, _, remote_name = item.partition("=")
+        manifest[remote_name or os.path.basename(path)] = {
+            "sha256": sha256_arquivo(path),
+            "size": os.path.getsize(path),
+        }
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    manifest = write_manifest(sys.argv[1:])
+    print(f"✅ Manifesto atualizado com {len(manifest)} arquivos em '{INDEX_MANIFEST_FILE}'")
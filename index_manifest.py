@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Manifesto de conteúdo para reindexação incremental de A.T.E.N.A.
+Guarda, para cada arquivo de origem (PDF), o SHA-256 do conteúdo e os ids
+dos trechos gravados no vectorstore. Numa nova indexação só os arquivos
+novos ou alterados são vetorizados, e os trechos de arquivos alterados ou
+removidos são apagados pelos ids.
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+from index_downloader import sha256_arquivo
+
+# Gravado dentro da pasta do índice (FAISS) ou do Chroma persistido
+BUILD_MANIFEST_FILE = "build_manifest.json"
+
+
+def chunk_id(key: str, sha256: str, position: int) -> str:
+    """
+    Id determinístico de um trecho: chave do arquivo + hash + posição (muda quando
+    o conteúdo muda). A chave separa PDFs idênticos guardados em pastas diferentes.
+    """
+    return f"{key}:{sha256[:16]}:{position}"
+
+
+def chunk_ids_for(key: str, sha256: str, count: int) -> List[str]:
+    """Ids de todos os trechos de um arquivo."""
+    return [chunk_id(key, sha256, i) for i in range(count)]
+
+
+def file_key(path: str, root: str) -> str:
+    """Chave estável do arquivo no manifesto: caminho relativo com '/'."""
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+class ManifestDiff:
+    """Resultado da comparação entre os arquivos atuais e o manifesto."""
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.changed: List[str] = []
+        self.removed: List[str] = []
+        self.unchanged: List[str] = []
+        # Manifesto de origem (com os hashes já calculados na comparação)
+        self.manifest: Optional["IndexManifest"] = None
+
+    @property
+    def to_index(self) -> List[str]:
+        """Arquivos que precisam ser extraídos e vetorizados."""
+        return self.added + self.changed
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+    def summary(self) -> str:
+        return (f"{len(self.added)} novos, {len(self.changed)} alterados, "
+                f"{len(self.removed)} removidos, {len(self.unchanged)} sem mudança")
+
+
+class IndexManifest:
+    """Manifesto {arquivo: sha256, tamanho, mtime, ids dos trechos} de um índice."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data: Dict = {"files": {}}
+        self._hashes: Dict[str, str] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.data = json.load(f)
+                self.data.setdefault("files", {})
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Manifesto de conteúdo inválido ({path}): {e}")
+
+    @property
+    def files(self) -> Dict[str, Dict]:
+        return self.data["files"]
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path) and bool(self.files)
+
+    def compatible(self, settings: Dict) -> bool:
+        """O índice só pode ser atualizado se foi gerado com as mesmas configurações."""
+        return self.data.get("settings") == settings
+
+    def sha256_for(self, key: str, path: str) -> str:
+        """SHA-256 do arquivo, calculado uma vez por execução."""
+        if key not in self._hashes:
+            self._hashes[key] = sha256_arquivo(path)
+        return self._hashes[key]
+
+    def diff(self, paths: Dict[str, str]) -> ManifestDiff:
+        """
+        Compara {chave: caminho} com o manifesto. Tamanho e mtime iguais evitam
+        recalcular o hash; se mudarem, o SHA-256 decide se o conteúdo mudou.
+        """
+        result = ManifestDiff()
+        result.manifest = self
+        for key, path in paths.items():
+            entry = self.files.get(key)
+            if entry is None:
+                result.added.append(key)
+                continue
+            stat = os.stat(path)
+            if entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+                result.unchanged.append(key)
+            elif entry.get("sha256") == self.sha256_for(key, path):
+                # Só o mtime mudou (cópia, checkout): mantém os trechos
+                entry["mtime_ns"] = stat.st_mtime_ns
+                result.unchanged.append(key)
+            else:
+                result.changed.append(key)
+        result.removed = [key for key in self.files if key not in paths]
+        return result
+
+    def stale_chunk_ids(self, keys: Iterable[str]) -> List[str]:
+        """Ids dos trechos gravados para os arquivos informados."""
+        ids: List[str] = []
+        for key in keys:
+            ids.extend(self.files.get(key, {}).get("chunk_ids", []))
+        return ids
+
+    def record(self, key: str, path: str, chunk_ids: List[str], **extra):
+        """Registra um arquivo indexado com os ids dos seus trechos."""
+        stat = os.stat(path)
+        entry = {
+            "sha256": self.sha256_for(key, path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "chunks": len(chunk_ids),
+            "chunk_ids": chunk_ids,
+        }
+        entry.update(extra)
+        self.files[key] = entry
+
+    def forget(self, key: str):
+        self.files.pop(key, None)
+
+    def save(self, settings: Optional[Dict] = None, **fields):
+        """Grava o manifesto de forma atômica."""
+        if settings is not None:
+            self.data["settings"] = settings
+        self.data.update(fields)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
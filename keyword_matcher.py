@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Classificação por palavras-chave em uma única passada sobre o texto.
+As tabelas de palavras-chave (rótulo -> palavras) são compiladas uma vez numa
+expressão regular em forma de trie; cada busca percorre o texto uma vez e
+devolve todas as ocorrências, com contagem, em vez de um teste `in` por
+palavra. Os resultados são os mesmos dos testes de substring: palavras que
+aparecem dentro de outras (ex.: 'mol' em 'molécula') também contam.
+
+Uso:
+    matcher = KeywordMatcher(TABELA_AREAS, TABELA_TOPICOS)
+    hits = matcher.count(texto.lower())
+    label_scores(hits, TABELA_AREAS)   # {"Matemática": 3, ...}
+    first_label(hits, TABELA_TOPICOS)  # primeiro tópico com alguma palavra
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional
+
+KeywordTable = Dict[str, List[str]]
+
+
+def _trie_pattern(node: Dict) -> str:
+    """Converte a trie em regex; o '?' guloso faz cada posição casar a palavra mais longa."""
+    terminal = "" in node
+    branches = [re.escape(char) + _trie_pattern(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if terminal:
+        return "(?:" + body + ")?"
+    return body
+
+
+class KeywordMatcher:
+    """Palavras-chave de uma ou mais tabelas, compiladas uma vez para busca linear."""
+
+    def __init__(self, *tables: KeywordTable):
+        keywords = {keyword for table in tables for words in table.values() for keyword in words if keyword}
+
+        trie: Dict = {}
+        for keyword in keywords:
+            node = trie
+            for char in keyword:
+                node = node.setdefault(char, {})
+            node[""] = {}
+        self._pattern = re.compile(_trie_pattern(trie)) if keywords else None
+
+        # A palavra mais longa que começa numa posição determina todas as que
+        # começam ali: são exatamente as palavras que são prefixo dela
+        self._prefixes: Dict[str, List[str]] = {
+            keyword: [other for other in keywords if keyword.startswith(other)]
+            for keyword in keywords
+        }
+
+    def count(self, text: str) -> Dict[str, int]:
+        """Ocorrências de cada palavra-chave no texto (uma passada)."""
+        counts: Dict[str, int] = {}
+        if self._pattern is None:
+            return counts
+        search = self._pattern.search
+        prefixes = self._prefixes
+        match = search(text)
+        while match:
+            for keyword in prefixes[match.group()]:
+                counts[keyword] = counts.get(keyword, 0) + 1
+            # Recomeça na posição seguinte ao início: pega ocorrências sobrepostas
+            match = search(text, match.start() + 1)
+        return counts
+
+
+def label_scores(hits: Dict[str, int], table: KeywordTable) -> Dict[str, int]:
+    """Quantas palavras distintas de cada rótulo aparecem nos acertos."""
+    return {label: sum(1 for keyword in words if keyword in hits) for label, words in table.items()}
+
+
+def first_label(hits: Dict[str, int], table: KeywordTable) -> Optional[str]:
+    """Primeiro rótulo (na ordem da tabela) com alguma palavra nos acertos."""
+    if not hits:
+        return None
+    for label, words in table.items():
+        if any(keyword in hits for keyword in words):
+            return label
+    return None
+
+
+def first_keyword(hits: Dict[str, int], keywords: Iterable[str]) -> Optional[str]:
+    """Primeira palavra (na ordem da lista) presente nos acertos."""
+    if not hits:
+        return None
+    for keyword in keywords:
+        if keyword in hits:
+            return keyword
+    return None
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Streaming de respostas dos LLMs para A.T.E.N.A.
+Leva os tokens gerados pela Groq (stream=True) até o chat do Streamlit,
+aplicando os formatadores das matérias sobre o texto parcial.
+"""
+
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from langchain.callbacks.base import BaseCallbackHandler
+
+# Intervalo mínimo entre duas atualizações do placeholder (segundos)
+RENDER_INTERVAL_SECONDS = 0.05
+
+# Cursor exibido enquanto a resposta ainda está sendo gerada
+STREAM_CURSOR = "▌"
+
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL)
+_DONE = object()
+
+
+def strip_partial_think(text: str) -> str:
+    """
+    Remove o raciocínio interno (<think>...</think>) do texto parcial.
+    Um bloco <think> ainda aberto esconde tudo o que vem depois dele.
+    """
+    text = _THINK_BLOCK.sub("", text)
+    open_pos = text.find("<think>")
+    if open_pos != -1:
+        text = text[:open_pos]
+    return text
+
+
+class _QueueCallbackHandler(BaseCallbackHandler):
+    """Encaminha cada token gerado pelo LLM para uma fila."""
+
+    def __init__(self, token_queue: "queue.Queue"):
+        self.token_queue = token_queue
+
+    def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        if token:
+            self.token_queue.put(token)
+
+
+def stream_chain_answer(chain, inputs: Dict[str, Any], output: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+    """
+    Executa uma cadeia LangChain em segundo plano e devolve os tokens da resposta
+    conforme chegam. O resultado completo (answer, source_documents...) é copiado
+    para `output` ao final, para quem precisa das fontes.
+    """
+    token_queue: "queue.Queue" = queue.Queue()
+    handler = _QueueCallbackHandler(token_queue)
+
+    def _run():
+        try:
+            result = chain.invoke(inputs, config={"callbacks": [handler]})
+            if output is not None:
+                output.update(result)
+        except Exception as e:
+            if output is not None:
+                output["answer"] = f"Erro ao processar a pergunta: {str(e)}"
+        finally:
+            token_queue.put(_DONE)
+
+    threading.Thread(target=_run, daemon=True).start()
+
+    while True:
+        token = token_queue.get()
+        if token is _DONE:
+            break
+        yield token
+
+
+class StreamRenderer:
+    """
+    Acumula os tokens e repassa o texto formatado para a interface,
+    limitando a frequência de atualizações do placeholder.
+    """
+
+    def __init__(
+        self,
+        on_text: Callable[[str], None],
+        formatter: Optional[Callable[[str], str]] = None,
+        min_interval: float = RENDER_INTERVAL_SECONDS,
+    ):
+        self.on_text = on_text
+        self.formatter = formatter
+        self.min_interval = min_interval
+        self.raw_text = ""
+        self.first_token_at: Optional[float] = None
+        self._started_at = time.time()
+        self._last_render = 0.0
+
+    def _visible_text(self) -> str:
+        text = strip_partial_think(self.raw_text)
+        if self.formatter and text.strip():
+            try:
+                text = self.formatter(text)
+            except Exception:
+                pass
+        return text
+
+    def feed(self, token: str):
+        """Recebe um novo token e atualiza a interface se já passou o intervalo."""
+        if self.first_token_at is None:
+            self.first_token_at = time.time()
+        self.raw_text += token
+
+        now = time.time()
+        if now - self._last_render >= self.min_interval:
+            self._last_render = now
+            visible = self._visible_text()
+            if visible.strip():
+                self.on_text(visible + STREAM_CURSOR)
+
+    def time_to_first_token(self) -> Optional[float]:
+        """Tempo (segundos) até o primeiro token, ou None se nada chegou."""
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self._started_at
@@ -6,26 +6,41 @@ Utiliza um índice FAISS pré-construído e baixado do Hugging Face.
 
 import streamlit as st
 import os
-import requests
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
 
 # LangChain imports
-from langchain_community.vectorstores import FAISS
-try:
-    from langchain_huggingface import HuggingFaceEmbeddings
-except ImportError:
-    from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
-from langchain.chains import ConversationalRetrievalChain
-try:
-    from langchain_community.memory import ConversationBufferMemory
-except ImportError:
-    from langchain.memory import ConversationBufferMemory
 from langchain.llms.base import LLM
 from langchain.callbacks.manager import CallbackManagerForLLMRun
+from langchain.schema.output import GenerationChunk
 
 # Groq para LLM
-from groq import Groq
+from groq_client_pool import get_groq_client, iter_chat_completion
+
+# Streaming de tokens até a interface
+from llm_streaming import stream_chain_answer
+
+# Cache semântico de respostas (perguntas repetidas não chamam a Groq de novo)
+from response_cache import cached_rag_response, cached_rag_stream
+
+# Busca + uma única chamada ao LLM por pergunta (sem reformulação via LLM)
+from rag_pipeline import SingleCallRAGPipeline
+
+# Histórico com orçamento de tokens e resumo contínuo das trocas antigas
+from conversation_memory import TokenBudgetMemory
+
+# Registro compartilhado de embeddings (um modelo por processo)
+from embeddings_registry import acquire_embeddings
+
+# Download paralelo e verificado dos índices FAISS
+from index_downloader import files_ready, ensure_files
+# Índice unificado opcional (UNIFIED_INDEX=1), com o índice da matéria como alternativa
+from unified_index import has_unified_subject, load_subject_vectorstore
+# Busca híbrida (BM25 + FAISS, fundidos por RRF)
+from hybrid_retriever import build_subject_retriever, search_documents
+
+# Matéria usada como chave no cache de respostas
+CACHE_SUBJECT = "História"
 
 # Diretório para armazenar o índice FAISS
 FAISS_INDEX_DIR = "faiss_index_history"
@@ -35,6 +50,7 @@ class GroqLLM(LLM):
     
     api_key: str
     model_name: str = "deepseek-r1-distill-llama-70b"
+    streaming: bool = False
     
     class Config:
         arbitrary_types_allowed = True
@@ -53,9 +69,13 @@ class GroqLLM(LLM):
         run_manager: Optional[CallbackManagerForLLMRun] = None,
         **kwargs: Any,
     ) -> str:
+        if self.streaming:
+            # Junta os chunks; cada token já foi repassado aos callbacks
+            return "".join(chunk.text for chunk in self._stream(prompt, stop, run_manager, **kwargs))
+        
         try:
-            # Cria uma nova instância do cliente a cada chamada para evitar cache corrompido
-            client = Groq(api_key=self.api_key)
+            # Reutiliza o cliente do pool (recriado apenas quando a API key muda)
+            client = get_groq_client(self.api_key)
             response = client.chat.completions.create(
                 model=self.model_name,
                 messages=[{"role": "user", "content": prompt}],
@@ -65,6 +85,29 @@ class GroqLLM(LLM):
             return response.choices[0].message.content
         except Exception as e:
             return f"Erro na API: {str(e)}"
+    
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        try:
+            tokens = iter_chat_completion(
+                self.api_key,
+                model=self.model_name,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=0.7,
+                max_tokens=2048
+            )
+            for token in tokens:
+                chunk = GenerationChunk(text=token)
+                if run_manager:
+                    run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+        except Exception as e:
+            yield GenerationChunk(text=f"Erro na API: {str(e)}")
 
 class LocalHistoryRAG:
     """Sistema RAG que carrega um índice FAISS remoto para História."""
@@ -88,7 +131,7 @@ class LocalHistoryRAG:
             return
         
         try:
-            self.embeddings = HuggingFaceEmbeddings(
+            self.embeddings = acquire_embeddings(
                 model_name=model_name,
                 model_kwargs={'device': 'cpu'},
                 encode_kwargs={'normalize_embeddings': True}
@@ -98,21 +141,6 @@ class LocalHistoryRAG:
                 st.error(f"Falha ao carregar o modelo de embeddings: {e}")
             self.embeddings = None
 
-    def _download_file(self, url: str, local_path: str):
-        """Baixa um arquivo de uma URL para um caminho local."""
-        try:
-            with requests.get(url, stream=True) as r:
-                r.raise_for_status()
-                with open(local_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            print(f"✅ Arquivo baixado: {local_path}")
-            return True
-        except requests.exceptions.RequestException as e:
-            st.error(f"Erro de rede ao baixar {url}: {e}")
-            print(f"❌ Erro de rede ao baixar {url}: {e}")
-            return False
-        
     def _ensure_faiss_index_is_ready(self) -> bool:
         """
         Garante que o índice FAISS esteja disponível, baixando-o se necessário.
@@ -122,33 +150,26 @@ class LocalHistoryRAG:
         index_file = os.path.join(FAISS_INDEX_DIR, "index_history.faiss")
         pkl_file = os.path.join(FAISS_INDEX_DIR, "index_history.pkl")
 
-        # Verifica se os dois arquivos já existem
-        if os.path.exists(index_file) and os.path.exists(pkl_file):
+        # URLs dos arquivos no Hugging Face
+        faiss_url = "https://huggingface.co/Andre13Filho/rag_enem/resolve/main/index_history.faiss"
+        pkl_url = "https://huggingface.co/Andre13Filho/rag_enem/resolve/main/index_history.pkl"
+        files = [(faiss_url, index_file), (pkl_url, pkl_file)]
+
+        # Verifica se os dois arquivos já existem e estão íntegros (SHA-256)
+        if files_ready(files):
             print("✅ Índice FAISS de história já existe localmente.")
             return True
 
         st.info("📥 Baixando índice de história do Hugging Face...")
         print("📥 Baixando índice de história do Hugging Face...")
 
-        # URLs dos arquivos no Hugging Face
-        faiss_url = "https://huggingface.co/Andre13Filho/rag_enem/resolve/main/index_history.faiss"
-        pkl_url = "https://huggingface.co/Andre13Filho/rag_enem/resolve/main/index_history.pkl"
-
-        # Baixa os dois arquivos
-        faiss_success = self._download_file(faiss_url, index_file)
-        pkl_success = self._download_file(pkl_url, pkl_file)
-
-        if faiss_success and pkl_success:
+        # Baixa os dois arquivos em paralelo, com retomada e verificação de integridade
+        if ensure_files(files):
             st.success("✅ Índice de história baixado com sucesso!")
             return True
         else:
             st.error("❌ Falha ao baixar os arquivos do índice de história.")
-            # Limpa arquivos parciais em caso de falha
-            if os.path.exists(index_file): 
-                os.remove(index_file)
-            if os.path.exists(pkl_file): 
-                os.remove(pkl_file)
-                return False
+            return False
             
     def initialize(self, api_key: str) -> bool:
         """
@@ -157,8 +178,8 @@ class LocalHistoryRAG:
         if self.is_initialized:
             return True
             
-        # 1. Garantir que o índice FAISS está disponível
-        if not self._ensure_faiss_index_is_ready():
+        # 1. Garantir que o índice FAISS está disponível (dispensado se o índice unificado tiver a matéria)
+        if not has_unified_subject(CACHE_SUBJECT) and not self._ensure_faiss_index_is_ready():
             return False
             
         # 2. Carregar o Vectorstore FAISS (e configurar embeddings aqui)
@@ -172,15 +193,8 @@ class LocalHistoryRAG:
                 st.error("Embeddings não foram inicializadas. Abortando.")
                 return False
 
-            self.vectorstore = FAISS.load_local(
-                FAISS_INDEX_DIR, 
-                self.embeddings,
-                allow_dangerous_deserialization=True # Necessário para pkl
-            )
-            self.retriever = self.vectorstore.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": 5}
-            )
+            self.vectorstore = load_subject_vectorstore(CACHE_SUBJECT, FAISS_INDEX_DIR, self.embeddings)
+            self.retriever = build_subject_retriever(self.vectorstore, k=5)
             st.success("✅ Base de conhecimento carregada.")
             print("✅ Base de conhecimento carregada.")
         except Exception as e:
@@ -193,15 +207,20 @@ class LocalHistoryRAG:
             st.info("🔗 Criando a cadeia de conversação RAG...")
             print("🔗 Criando a cadeia de conversação RAG...")
             
-            self.memory = ConversationBufferMemory(
+            # Trocas antigas viram um resumo feito em segundo plano (LLM sem streaming)
+            self.memory = TokenBudgetMemory.for_subject(
+                CACHE_SUBJECT,
+                llm=GroqLLM(api_key=api_key),
                 memory_key="chat_history",
                 return_messages=True,
                 output_key="answer"
             )
             
-            llm = GroqLLM(api_key=api_key)
+            # Uma chamada ao LLM por pergunta, transmitida em streaming; perguntas de
+            # continuação são resolvidas na busca, sem reformulação pelo LLM
+            llm = GroqLLM(api_key=api_key, streaming=True)
 
-            self.rag_chain = ConversationalRetrievalChain.from_llm(
+            self.rag_chain = SingleCallRAGPipeline.from_llm(
                 llm=llm,
                 retriever=self.retriever,
                 memory=self.memory,
@@ -260,8 +279,7 @@ PERGUNTA: {question}
 RESPOSTA (com datas bem formatadas e estilo do Professor Eduardo):
 """
             # Atualiza o prompt da cadeia
-            if hasattr(self.rag_chain.combine_docs_chain, "llm_chain"):
-                self.rag_chain.combine_docs_chain.llm_chain.prompt.template = prompt_template
+            self.rag_chain.set_prompt_template(prompt_template)
             
             self.is_initialized = True
             st.success("✅ Cadeia RAG criada e pronta para uso!")
@@ -279,17 +297,38 @@ RESPOSTA (com datas bem formatadas e estilo do Professor Eduardo):
             return {"answer": "O sistema RAG não foi inicializado corretamente."}
         
         try:
-            return self.rag_chain({"question": question})
+            return cached_rag_response(
+                CACHE_SUBJECT, question, self.embeddings, self.memory,
+                lambda: self.rag_chain({"question": question})
+            )
         except Exception as e:
             return {"answer": f"Erro ao processar a pergunta: {str(e)}"}
     
+    def stream_response(self, question: str, output: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Gera a resposta token a token. Ao final, `output` recebe o resultado
+        completo da cadeia (answer e source_documents).
+        """
+        if not self.rag_chain:
+            answer = "O sistema RAG não foi inicializado corretamente."
+            if output is not None:
+                output["answer"] = answer
+            yield answer
+            return
+        
+        yield from cached_rag_stream(
+            CACHE_SUBJECT, question, self.embeddings, self.memory,
+            lambda result: stream_chain_answer(self.rag_chain, {"question": question}, result),
+            output
+        )
+    
     def search_relevant_content(self, query: str, k: int = 3) -> List[Document]:
         """Busca por conteúdo relevante no vectorstore."""
         if not self.vectorstore:
             return []
         
         try:
-            return self.vectorstore.similarity_search(query, k=k)
+            return search_documents(self.retriever, self.vectorstore, query, k)
         except Exception as e:
             print(f"Erro na busca de similaridade: {str(e)}")
             return []
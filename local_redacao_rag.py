@@ -6,7 +6,6 @@ Utiliza índices FAISS pré-construídos e baixados do Hugging Face.
 
 import streamlit as st
 import os
-import requests
 import re
 import tempfile
 from typing import Dict, List, Any, Optional
@@ -23,11 +22,6 @@ except ImportError:
     st.warning("⚠️ Bibliotecas de PDF não instaladas. Execute: pip install PyPDF2 PyMuPDF")
 
 # LangChain imports
-from langchain_community.vectorstores import FAISS
-try:
-    from langchain_huggingface import HuggingFaceEmbeddings
-except ImportError:
-    from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.schema import Document
 from langchain.chains import ConversationalRetrievalChain
 try:
@@ -38,12 +32,30 @@ from langchain.llms.base import LLM
 from langchain.callbacks.manager import CallbackManagerForLLMRun
 
 # Groq para LLM
-from groq import Groq
+from groq_client_pool import get_groq_client
+
+# Registro compartilhado de embeddings (um modelo por processo)
+from embeddings_registry import acquire_embeddings
+
+# Trechos de apoio sem repetição e dentro de um orçamento de tokens
+from context_packer import pack_documents
+
+# Download paralelo e verificado dos índices FAISS
+from index_downloader import files_ready, ensure_files
+# Índice unificado opcional (UNIFIED_INDEX=1), com os índices de redação como alternativa
+from unified_index import KIND_CASO_SUCESSO, has_unified_subject, load_subject_vectorstore
 
 # Diretórios para armazenar os índices FAISS
 FAISS_INDEX_DIR = "faiss_index_redacao"
 FAISS_SUCCESS_INDEX_DIR = "faiss_index_success_redacao"
 
+# Matéria de redação no índice unificado
+REDACAO_SUBJECT = "Redação"
+
+# Tokens de material de apoio no prompt de correção (critérios e exemplos nota 1000)
+REDACAO_CRITERIA_TOKENS = int(os.getenv("REDACAO_CRITERIA_TOKENS", "350"))
+REDACAO_EXAMPLES_TOKENS = int(os.getenv("REDACAO_EXAMPLES_TOKENS", "350"))
+
 class GroqLLM(LLM):
     """LLM personalizado para DeepSeek R1 Distill via Groq"""
     
@@ -68,8 +80,8 @@ class GroqLLM(LLM):
         **kwargs: Any,
     ) -> str:
         try:
-            # Cria uma nova instância do cliente a cada chamada para evitar cache corrompido
-            client = Groq(api_key=self.api_key)
+            # Reutiliza o cliente do pool (recriado apenas quando a API key muda)
+            client = get_groq_client(self.api_key)
             
             # Sistema de prompt da Professora Carla
             system_prompt = """Você é a Professora Carla, especialista em redação do ENEM. Você está conversando com Sther, uma estudante de 17 anos que quer muito bem no ENEM.
@@ -146,7 +158,7 @@ class LocalRedacaoRAG:
             return
         
         try:
-            self.embeddings = HuggingFaceEmbeddings(
+            self.embeddings = acquire_embeddings(
                 model_name=model_name,
                 model_kwargs={'device': 'cpu'},
                 encode_kwargs={'normalize_embeddings': True}
@@ -156,21 +168,6 @@ class LocalRedacaoRAG:
                 st.error(f"Falha ao carregar o modelo de embeddings: {e}")
             self.embeddings = None
 
-    def _download_file(self, url: str, local_path: str):
-        """Baixa um arquivo de uma URL para um caminho local."""
-        try:
-            with requests.get(url, stream=True) as r:
-                r.raise_for_status()
-                with open(local_path, 'wb') as f:
-                    for chunk in r.iter_content(chunk_size=8192):
-                        f.write(chunk)
-            print(f"✅ Arquivo baixado: {local_path}")
-            return True
-        except requests.exceptions.RequestException as e:
-            st.error(f"Erro de rede ao baixar {url}: {e}")
-            print(f"❌ Erro de rede ao baixar {url}: {e}")
-            return False
-        
     def _ensure_faiss_index_is_ready(self) -> bool:
         """
         Garante que os índices FAISS estejam disponíveis, baixando-os se necessário.
@@ -186,15 +183,6 @@ class LocalRedacaoRAG:
         success_index_file = os.path.join(FAISS_SUCCESS_INDEX_DIR, "index.faiss")
         success_pkl_file = os.path.join(FAISS_SUCCESS_INDEX_DIR, "index.pkl")
 
-        # Verifica se todos os arquivos já existem
-        if (os.path.exists(index_file) and os.path.exists(pkl_file) and 
-            os.path.exists(success_index_file) and os.path.exists(success_pkl_file)):
-            print("✅ Índices FAISS de redação já existem localmente.")
-            return True
-
-        st.info("📥 Baixando índices de redação do Hugging Face...")
-        print("📥 Baixando índices de redação do Hugging Face...")
-
         # URLs dos arquivos principais no Hugging Face
         faiss_url = "https://huggingface.co/Andre13Filho/rag_enem/resolve/main/index_redacao.faiss"
         pkl_url = "https://huggingface.co/Andre13Filho/rag_enem/resolve/main/index_redacao.pkl"
@@ -203,23 +191,28 @@ class LocalRedacaoRAG:
         success_faiss_url = "https://huggingface.co/Andre13Filho/rag_enem/resolve/main/index_success_red.faiss"
         success_pkl_url = "https://huggingface.co/Andre13Filho/rag_enem/resolve/main/index_success_red.pkl"
 
-        # Baixa os arquivos principais com nomes padrão do FAISS
-        faiss_success = self._download_file(faiss_url, index_file)
-        pkl_success = self._download_file(pkl_url, pkl_file)
-        
-        # Baixa os arquivos de casos de sucesso com nomes padrão do FAISS
-        success_faiss_success = self._download_file(success_faiss_url, success_index_file)
-        success_pkl_success = self._download_file(success_pkl_url, success_pkl_file)
+        # Arquivos salvos com os nomes padrão do FAISS
+        files = [
+            (faiss_url, index_file),
+            (pkl_url, pkl_file),
+            (success_faiss_url, success_index_file),
+            (success_pkl_url, success_pkl_file),
+        ]
 
-        if (faiss_success and pkl_success and success_faiss_success and success_pkl_success):
+        # Verifica se todos os arquivos já existem e estão íntegros (SHA-256)
+        if files_ready(files):
+            print("✅ Índices FAISS de redação já existem localmente.")
+            return True
+
+        st.info("📥 Baixando índices de redação do Hugging Face...")
+        print("📥 Baixando índices de redação do Hugging Face...")
+
+        # Baixa os quatro arquivos em paralelo, com retomada e verificação de integridade
+        if ensure_files(files):
             st.success("✅ Índices de redação baixados com sucesso!")
             return True
         else:
             st.error("❌ Falha ao baixar os arquivos dos índices de redação.")
-            # Limpa arquivos parciais em caso de falha
-            for file_path in [index_file, pkl_file, success_index_file, success_pkl_file]:
-                if os.path.exists(file_path): 
-                    os.remove(file_path)
             return False
             
     def initialize(self, api_key: str) -> bool:
@@ -229,8 +222,9 @@ class LocalRedacaoRAG:
         if self.is_initialized:
             return True
             
-        # 1. Garantir que os índices FAISS estão disponíveis
-        if not self._ensure_faiss_index_is_ready():
+        # 1. Garantir que os índices FAISS estão disponíveis (dispensado se o índice unificado tiver os dois)
+        in_unified = has_unified_subject(REDACAO_SUBJECT) and has_unified_subject(REDACAO_SUBJECT, KIND_CASO_SUCESSO)
+        if not in_unified and not self._ensure_faiss_index_is_ready():
             return False
             
         # 2. Carregar os Vectorstores FAISS (e configurar embeddings aqui)
@@ -245,17 +239,11 @@ class LocalRedacaoRAG:
                 return False
 
             # Carrega o vectorstore principal de redação
-            self.vectorstore = FAISS.load_local(
-                FAISS_INDEX_DIR, 
-                self.embeddings,
-                allow_dangerous_deserialization=True # Necessário para pkl
-            )
+            self.vectorstore = load_subject_vectorstore(REDACAO_SUBJECT, FAISS_INDEX_DIR, self.embeddings)
             
             # Carrega o vectorstore de casos de sucesso
-            self.success_vectorstore = FAISS.load_local(
-                FAISS_SUCCESS_INDEX_DIR, 
-                self.embeddings,
-                allow_dangerous_deserialization=True
+            self.success_vectorstore = load_subject_vectorstore(
+                REDACAO_SUBJECT, FAISS_SUCCESS_INDEX_DIR, self.embeddings, kind=KIND_CASO_SUCESSO
             )
             
             print(f"✅ Vectorstore principal carregado: {self.vectorstore.index.ntotal} documentos")
@@ -506,8 +494,8 @@ A API key não foi encontrada ou não está funcionando.
         success_docs = self.search_success_cases(query_sucesso, k=3)
         
         # Montar contexto para análise
-        context_redacao = "\n\n".join([doc.page_content for doc in redacao_docs])
-        context_success = "\n\n".join([doc.page_content for doc in success_docs])
+        context_redacao = pack_documents(redacao_docs, REDACAO_CRITERIA_TOKENS).text
+        context_success = pack_documents(success_docs, REDACAO_EXAMPLES_TOKENS).text
         
         # Prompt específico e detalhado para análise de redação
         analysis_prompt = f"""
@@ -520,8 +508,8 @@ PROFESSORA CARLA, ANALISE ESTA REDAÇÃO DA STHER:
 {texto_redacao}
 
 🎯 **MATERIAL DE APOIO DISPONÍVEL:**
-**Critérios do ENEM:** {context_redacao[:500]}...
-**Exemplos Nota 1000:** {context_success[:500]}...
+**Critérios do ENEM:** {context_redacao}
+**Exemplos Nota 1000:** {context_success}
 
 📋 **TAREFA ESPECÍFICA:**
 Como Professora Carla, faça uma análise COMPLETA seguindo os critérios oficiais do ENEM:
@@ -690,7 +678,7 @@ def validate_api_key(api_key: str) -> bool:
         
     try:
         # Teste rápido com a API Groq
-        client = Groq(api_key=api_key)
+        client = get_groq_client(api_key)
         response = client.chat.completions.create(
             model="deepseek-r1-distill-llama-70b",
             messages=[{"role": "user", "content": "teste"}],
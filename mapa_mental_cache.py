@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Cache persistente de mapas mentais para A.T.E.N.A.
+O markdown gerado pela IA é guardado em SQLite com uma chave estável
+(SHA-256 da pergunta normalizada + tópico detectado + nível + matéria), então
+uma pergunta equivalente em outra sessão ou processo reaproveita o mapa sem
+nova chamada à Groq. O número de mapas é limitado, com despejo LRU.
+
+Os tópicos mais comuns também podem vir de um arquivo de mapas pré-gerados
+(pregerar_mapas_mentais.py), servidos sem nenhuma chamada à IA.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Optional
+
+# Arquivo SQLite do cache
+MAPA_MENTAL_CACHE_DB = os.getenv("MAPA_MENTAL_CACHE_DB", "cache_mapas_mentais.sqlite3")
+
+# Máximo de mapas guardados; acima disso saem os menos usados recentemente
+MAX_ENTRIES = int(os.getenv("MAPA_MENTAL_CACHE_MAX_ENTRIES", "1000"))
+
+# Mapas pré-gerados (JSON compactado com gzip)
+MAPAS_PREGERADOS_FILE = os.getenv("MAPAS_PREGERADOS_FILE", "mapas_mentais_pregerados.json.gz")
+
+
+def normalizar_pergunta(pergunta: str) -> str:
+    """Minúsculas, sem acentos, sem pontuação e com espaços simples."""
+    texto = unicodedata.normalize("NFKD", pergunta.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = re.sub(r"[^\w\s]", " ", texto)
+    return " ".join(texto.split())
+
+
+def chave_mapa_mental(pergunta: str, topico: str, nivel: str, materia: str) -> str:
+    """Chave estável entre processos (o hash() do Python muda a cada execução)."""
+    partes = [materia, nivel, normalizar_pergunta(topico), normalizar_pergunta(pergunta)]
+    return hashlib.sha256("\x1f".join(partes).encode("utf-8")).hexdigest()
+
+
+class MapaMentalCache:
+    """Cache em disco de mapas mentais com despejo LRU e métricas de acerto."""
+
+    def __init__(self, db_path: str = MAPA_MENTAL_CACHE_DB, max_entries: int = MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS mapas (
+                chave TEXT PRIMARY KEY,
+                materia TEXT NOT NULL,
+                nivel TEXT NOT NULL,
+                topico TEXT NOT NULL,
+                pergunta TEXT NOT NULL,
+                markdown TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_mapas_access ON mapas(last_access)")
+        self._conn.commit()
+
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    def get(self, pergunta: str, topico: str, nivel: str, materia: str) -> Optional[str]:
+        """Markdown de um mapa equivalente já gerado, ou None."""
+        chave = chave_mapa_mental(pergunta, topico, nivel, materia)
+        with self._lock:
+            row = self._conn.execute("SELECT markdown FROM mapas WHERE chave = ?", (chave,)).fetchone()
+            if row is None:
+                self._misses += 1
+                return None
+            self._conn.execute(
+                "UPDATE mapas SET hits = hits + 1, last_access = ? WHERE chave = ?",
+                (time.time(), chave),
+            )
+            self._conn.commit()
+            self._hits += 1
+        return row[0]
+
+    def put(self, pergunta: str, topico: str, nivel: str, materia: str, markdown: str):
+        """Guarda um mapa gerado e aplica o limite de entradas."""
+        if not markdown:
+            return
+        chave = chave_mapa_mental(pergunta, topico, nivel, materia)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO mapas (chave, materia, nivel, topico, pergunta, markdown, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (chave, materia, nivel, topico, pergunta, markdown, now, now),
+            )
+            self._stores += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Remove os mapas menos acessados recentemente acima do limite."""
+        total = self._conn.execute("SELECT COUNT(*) FROM mapas").fetchone()[0]
+        if total > self.max_entries:
+            excess = total - self.max_entries
+            self._conn.execute(
+                "DELETE FROM mapas WHERE chave IN (SELECT chave FROM mapas ORDER BY last_access ASC LIMIT ?)",
+                (excess,),
+            )
+            self._evictions += excess
+
+    def clear(self, materia: Optional[str] = None):
+        """Apaga o cache inteiro ou só o de uma matéria."""
+        with self._lock:
+            if materia is None:
+                self._conn.execute("DELETE FROM mapas")
+            else:
+                self._conn.execute("DELETE FROM mapas WHERE materia = ?", (materia,))
+            self._conn.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna métricas de uso do cache (acertos, falhas, tamanho, despejos)."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            total = self._conn.execute("SELECT COUNT(*) FROM mapas").fetchone()[0]
+            return {
+                "acertos": self._hits,
+                "falhas": self._misses,
+                "taxa_acerto": round(self._hits / lookups, 3) if lookups else 0.0,
+                "mapas_guardados": self._stores,
+                "despejos": self._evictions,
+                "mapas_em_cache": total,
+                "limite": self.max_entries,
+            }
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_mapa_mental_cache() -> MapaMentalCache:
+    """Retorna a instância única (singleton) do cache de mapas mentais."""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = MapaMentalCache()
+    return _cache_instance
+
+
+def chave_mapa_pregerado(materia: str, nivel: str, topico: Optional[str] = None, pergunta: Optional[str] = None) -> str:
+    """Chave de um mapa pré-gerado: por tópico detectado ou por pergunta (tema do ENEM) exata."""
+    if pergunta is not None:
+        return f"p|{materia}|{nivel}|{normalizar_pergunta(pergunta)}"
+    return f"t|{materia}|{nivel}|{normalizar_pergunta(topico or '')}"
+
+
+class MapasPregerados:
+    """Mapas gerados em lote, carregados uma vez e servidos sem latência de IA."""
+
+    def __init__(self, path: str = MAPAS_PREGERADOS_FILE):
+        self.path = path
+        self.data: Dict[str, Any] = {"mapas": {}}
+        if os.path.exists(path):
+            try:
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    self.data = json.load(f)
+                self.data.setdefault("mapas", {})
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ Arquivo de mapas pré-gerados inválido ({path}): {e}")
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def mapas(self) -> Dict[str, Dict[str, Any]]:
+        return self.data["mapas"]
+
+    def __len__(self) -> int:
+        return len(self.mapas)
+
+    def __contains__(self, chave: str) -> bool:
+        return chave in self.mapas
+
+    def get(self, pergunta: str, topico: str, nivel: str, materia: str) -> Optional[str]:
+        """Mapa da mesma pergunta (tema) ou, senão, do mesmo tópico."""
+        for chave in (chave_mapa_pregerado(materia, nivel, pergunta=pergunta),
+                      chave_mapa_pregerado(materia, nivel, topico=topico)):
+            entrada = self.mapas.get(chave)
+            if entrada:
+                self._hits += 1
+                return entrada["markdown"]
+        self._misses += 1
+        return None
+
+    def add(self, chave: str, markdown: str, **metadados):
+        self.mapas[chave] = {"markdown": markdown, **metadados}
+
+    def save(self, **campos):
+        """Grava o arquivo de forma atômica."""
+        self.data.update(campos)
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, self.path)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"mapas_pregerados": len(self), "acertos": self._hits, "falhas": self._misses}
+
+
+_pregerados_instance = None
+
+
+def get_mapas_pregerados() -> MapasPregerados:
+    """Retorna a instância única dos mapas pré-gerados."""
+    global _pregerados_instance
+    if _pregerados_instance is None:
+        with _cache_lock:
+            if _pregerados_instance is None:
+                _pregerados_instance = MapasPregerados()
+    return _pregerados_instance
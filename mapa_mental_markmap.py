@@ -8,7 +8,9 @@ import streamlit as st
 import re
 import os
 from typing import Dict, List, Any, Optional
-from groq import Groq
+from groq_client_pool import get_groq_client
+from keyword_matcher import KeywordMatcher, first_label
+from mapa_mental_cache import chave_mapa_mental, get_mapa_mental_cache, get_mapas_pregerados
 import time
 
 try:
@@ -289,8 +291,9 @@ def exibir_mapa_mental_markmap(pergunta: str, api_key: str, nivel: str, debug_op
     if debug_options is None:
         debug_options = {'show_debug': False, 'test_pan': True}
     
-    # Cache baseado na pergunta, nível e matéria
-    cache_key = f"markmap_{hash(pergunta)}_{nivel}_{current_subject}"
+    # Cache da sessão com a mesma chave estável do cache em disco
+    topico_especifico = extrair_topico_especifico(pergunta, current_subject)
+    cache_key = f"markmap_{chave_mapa_mental(pergunta, topico_especifico, nivel, current_subject)}"
     
     # Verificar se é a primeira renderização para esta pergunta
     first_render_key = f"first_render_{cache_key}"
@@ -335,6 +338,11 @@ def exibir_mapa_mental_markmap(pergunta: str, api_key: str, nivel: str, debug_op
                 st.write(f"✅ Contém 'zoom:': {has_zoom}")
                 st.write(f"🔄 Primeira renderização: {is_first_render}")
                 
+                cache_mapas = _obter_cache_mapas()
+                if cache_mapas is not None:
+                    st.write(f"💾 Cache de mapas: {cache_mapas.get_stats()}")
+                st.write(f"📦 Mapas pré-gerados: {get_mapas_pregerados().get_stats()}")
+                
                 if not has_pan or not has_zoom:
                     st.warning("⚠️ Configurações de pan/zoom podem estar faltando!")
         
@@ -346,47 +354,51 @@ def exibir_mapa_mental_markmap(pergunta: str, api_key: str, nivel: str, debug_op
     else:
         st.error("❌ Erro ao gerar mapa mental. Tente novamente.")
 
-def gerar_markdown_mapa_mental(pergunta: str, api_key: str, nivel: str, current_subject: str) -> str:
-    """Gera o conteúdo markdown do mapa mental usando IA com RAG"""
-    
+def _obter_cache_mapas():
+    """Cache de mapas mentais em disco, ou None se não puder ser aberto"""
     try:
-        # Detectar tópico específico da pergunta ANTES de gerar o prompt
-        topico_especifico = extrair_topico_especifico(pergunta, current_subject)
-        
-        # INTEGRAÇÃO COM RAG - Buscar conteúdo real do Hugging Face
-        rag_content = buscar_conteudo_rag(pergunta, current_subject, api_key)
-        
-        # Configurações por nível com diferenças REAIS
-        nivel_config = {
-            "Básico": {
-                "conceitos": 3,
-                "profundidade": 2,
-                "detalhes": "definições básicas",
-                "expansion": "initialExpandLevel: 1",
-                "style": "conceitos fundamentais apenas"
-            },
-            "Intermediário": {
-                "conceitos": 6,
-                "profundidade": 3,
-                "detalhes": "fórmulas e aplicações",
-                "expansion": "initialExpandLevel: 2", 
-                "style": "métodos e estratégias"
-            },
-            "Avançado": {
-                "conceitos": 12,
-                "profundidade": 4,
-                "detalhes": "demonstrações e conexões profundas",
-                "expansion": "initialExpandLevel: 3",
-                "style": "análise completa e aplicações complexas"
-            }
+        return get_mapa_mental_cache()
+    except Exception as e:
+        print(f"⚠️ Cache de mapas mentais indisponível: {e}")
+        return None
+
+def gerar_mapa_mental_ia(pergunta: str, api_key: str, nivel: str, current_subject: str, topico_especifico: str) -> str:
+    """Chama a IA (com conteúdo RAG) e retorna o markdown limpo do mapa, sem fallback"""
+    
+    # INTEGRAÇÃO COM RAG - Buscar conteúdo real do Hugging Face
+    rag_content = buscar_conteudo_rag(pergunta, current_subject, api_key)
+    
+    # Configurações por nível com diferenças REAIS
+    nivel_config = {
+        "Básico": {
+            "conceitos": 3,
+            "profundidade": 2,
+            "detalhes": "definições básicas",
+            "expansion": "initialExpandLevel: 1",
+            "style": "conceitos fundamentais apenas"
+        },
+        "Intermediário": {
+            "conceitos": 6,
+            "profundidade": 3,
+            "detalhes": "fórmulas e aplicações",
+            "expansion": "initialExpandLevel: 2", 
+            "style": "métodos e estratégias"
+        },
+        "Avançado": {
+            "conceitos": 12,
+            "profundidade": 4,
+            "detalhes": "demonstrações e conexões profundas",
+            "expansion": "initialExpandLevel: 3",
+            "style": "análise completa e aplicações complexas"
         }
-        
-        config = nivel_config.get(nivel, nivel_config["Intermediário"])
-        
-        client = Groq(api_key=api_key)
-        
-        # Prompt completamente reformulado para ser OBJETIVO e EXPLICATIVO
-        prompt = f"""
+    }
+    
+    config = nivel_config.get(nivel, nivel_config["Intermediário"])
+    
+    client = get_groq_client(api_key)
+    
+    # Prompt completamente reformulado para ser OBJETIVO e EXPLICATIVO
+    prompt = f"""
 Você é um especialista em educação para ENEM. Crie um mapa mental EXPLICATIVO sobre "{topico_especifico}" para uma estudante de 17 anos.
 
 **PERGUNTA DA ESTUDANTE:** "{pergunta}"
@@ -453,31 +465,62 @@ Para outros tópicos: Use seu conhecimento especializado em {current_subject}.
 
 Agora crie o mapa explicativo focado especificamente em {topico_especifico}:
 """
+    
+    # Usar modelo mais recente e estável
+    response = client.chat.completions.create(
+        model="llama-3.2-90b-text-preview",
+        messages=[
+            {"role": "system", "content": f"{get_subject_system_prompt(current_subject)} Você está criando um mapa mental explicativo para Sther, de 17 anos, que vai prestar ENEM. Seja preciso e direcionado ao tópico da pergunta."},
+            {"role": "user", "content": prompt}
+        ],
+        max_tokens=1500,
+        temperature=0.1   # Muito baixo para máxima consistência e foco
+    )
+    
+    markdown_content = response.choices[0].message.content.strip()
+    
+    # Limpar e validar o markdown
+    markdown_content = limpar_markdown(markdown_content)
+    
+    return markdown_content
+
+def gerar_markdown_mapa_mental(pergunta: str, api_key: str, nivel: str, current_subject: str) -> str:
+    """Gera o conteúdo markdown do mapa mental usando IA com RAG"""
+    
+    try:
+        # Detectar tópico específico da pergunta ANTES de gerar o prompt
+        topico_especifico = extrair_topico_especifico(pergunta, current_subject)
         
-        # Usar modelo mais recente e estável
-        response = client.chat.completions.create(
-            model="llama-3.2-90b-text-preview",
-            messages=[
-                {"role": "system", "content": f"{get_subject_system_prompt(current_subject)} Você está criando um mapa mental explicativo para Sther, de 17 anos, que vai prestar ENEM. Seja preciso e direcionado ao tópico da pergunta."},
-                {"role": "user", "content": prompt}
-            ],
-            max_tokens=1500,
-            temperature=0.1   # Muito baixo para máxima consistência e foco
+        # Tópicos comuns já têm mapa pré-gerado (pregerar_mapas_mentais.py)
+        markdown_pregerado = get_mapas_pregerados().get(pergunta, topico_especifico, nivel, current_subject)
+        if markdown_pregerado:
+            return markdown_pregerado
+        
+        # Mapa equivalente já gerado (nesta ou em outra sessão): sem nova chamada à IA
+        cache_mapas = _obter_cache_mapas()
+        if cache_mapas is not None:
+            markdown_em_cache = cache_mapas.get(pergunta, topico_especifico, nivel, current_subject)
+            if markdown_em_cache:
+                return markdown_em_cache
+        
+        markdown_content = gerar_mapa_mental_ia(pergunta, api_key, nivel, current_subject, topico_especifico)
+        
+        # Validar se o conteúdo é específico (verificar se menciona o tópico) e tem tamanho adequado
+        mapa_valido = (
+            bool(markdown_content)
+            and len(markdown_content) >= 100
+            and validar_especificidade_mapa(markdown_content, topico_especifico)
         )
+        if not mapa_valido:
+            # Se não for específico, usar versão básica específica (não vai para o cache:
+            # é montada localmente e uma nova tentativa da IA pode dar um mapa melhor)
+            return criar_mapa_mental_especifico(pergunta, topico_especifico, nivel, current_subject)
         
-        markdown_content = response.choices[0].message.content.strip()
-        
-        # Limpar e validar o markdown
-        markdown_content = limpar_markdown(markdown_content)
-        
-        # Validar se o conteúdo é específico (verificar se menciona o tópico)
-        if not validar_especificidade_mapa(markdown_content, topico_especifico):
-            # Se não for específico, usar versão básica específica
-            markdown_content = criar_mapa_mental_especifico(pergunta, topico_especifico, nivel, current_subject)
-        
-        # Se ainda não conseguiu gerar conteúdo adequado, usar fallback
-        if not markdown_content or len(markdown_content) < 100:
-            markdown_content = criar_mapa_mental_especifico(pergunta, topico_especifico, nivel, current_subject)
+        if cache_mapas is not None:
+            try:
+                cache_mapas.put(pergunta, topico_especifico, nivel, current_subject, markdown_content)
+            except Exception as e:
+                print(f"⚠️ Falha ao gravar no cache de mapas mentais: {e}")
         
         return markdown_content
         
@@ -515,370 +558,243 @@ def limpar_markdown(texto: str) -> str:
     
     return texto.strip() 
 
-def extrair_topico_especifico(pergunta: str, current_subject: str) -> str:
-    """Extrai o tópico específico da pergunta com detecção avançada para TODAS as matérias do ENEM"""
-    pergunta_lower = pergunta.lower()
-    
-    # MATEMÁTICA - Cobertura completa dos tópicos ENEM
-    if current_subject == 'Matemática':
+# Regras de tópico por matéria, em ordem de prioridade: vale o primeiro tópico
+# com alguma palavra-chave na pergunta. Novos tópicos entram só nesta tabela.
+REGRAS_TOPICOS: Dict[str, Dict[str, List[str]]] = {
+    'Matemática': {
         # Álgebra
-        if any(palavra in pergunta_lower for palavra in ['equação', 'equacao', 'primeiro grau', 'linear']):
-            return 'Equações do 1º Grau'
-        elif any(palavra in pergunta_lower for palavra in ['segundo grau', 'bhaskara', 'quadrática', 'parábola']):
-            return 'Equações do 2º Grau'
-        elif any(palavra in pergunta_lower for palavra in ['sistema', 'linear', 'substituição', 'eliminação']):
-            return 'Sistemas de Equações'
-        elif any(palavra in pergunta_lower for palavra in ['inequação', 'inequacao', 'desigualdade']):
-            return 'Inequações'
-        
+        'Equações do 1º Grau': ['equação', 'equacao', 'primeiro grau', 'linear'],
+        'Equações do 2º Grau': ['segundo grau', 'bhaskara', 'quadrática', 'parábola'],
+        'Sistemas de Equações': ['sistema', 'linear', 'substituição', 'eliminação'],
+        'Inequações': ['inequação', 'inequacao', 'desigualdade'],
+
         # Funções
-        elif any(palavra in pergunta_lower for palavra in ['função', 'funcao', 'domínio', 'imagem']):
-            return 'Funções'
-        elif any(palavra in pergunta_lower for palavra in ['afim', 'linear', 'coeficiente angular']):
-            return 'Função Afim'
-        elif any(palavra in pergunta_lower for palavra in ['quadrática', 'parabola', 'vértice']):
-            return 'Função Quadrática'
-        elif any(palavra in pergunta_lower for palavra in ['exponencial', 'crescimento', 'decaimento']):
-            return 'Função Exponencial'
-        elif any(palavra in pergunta_lower for palavra in ['logaritmo', 'log', 'logarítmica']):
-            return 'Logaritmos'
-        
+        'Funções': ['função', 'funcao', 'domínio', 'imagem'],
+        'Função Afim': ['afim', 'linear', 'coeficiente angular'],
+        'Função Quadrática': ['quadrática', 'parabola', 'vértice'],
+        'Função Exponencial': ['exponencial', 'crescimento', 'decaimento'],
+        'Logaritmos': ['logaritmo', 'log', 'logarítmica'],
+
         # Trigonometria
-        elif any(palavra in pergunta_lower for palavra in ['trigonometria', 'seno', 'cosseno', 'tangente']):
-            return 'Trigonometria'
-        elif any(palavra in pergunta_lower for palavra in ['círculo trigonométrico', 'radianos', 'graus']):
-            return 'Círculo Trigonométrico'
-        
+        'Trigonometria': ['trigonometria', 'seno', 'cosseno', 'tangente'],
+        'Círculo Trigonométrico': ['círculo trigonométrico', 'radianos', 'graus'],
+
         # Geometria
-        elif any(palavra in pergunta_lower for palavra in ['área', 'perímetro', 'geometria plana']):
-            return 'Geometria Plana'
-        elif any(palavra in pergunta_lower for palavra in ['volume', 'prisma', 'pirâmide', 'cilindro', 'cone', 'esfera']):
-            return 'Geometria Espacial'
-        elif any(palavra in pergunta_lower for palavra in ['triângulo', 'teorema de pitágoras', 'pitagoras']):
-            return 'Triângulos'
-        elif any(palavra in pergunta_lower for palavra in ['circunferência', 'círculo', 'pi']):
-            return 'Círculo e Circunferência'
-        
+        'Geometria Plana': ['área', 'perímetro', 'geometria plana'],
+        'Geometria Espacial': ['volume', 'prisma', 'pirâmide', 'cilindro', 'cone', 'esfera'],
+        'Triângulos': ['triângulo', 'teorema de pitágoras', 'pitagoras'],
+        'Círculo e Circunferência': ['circunferência', 'círculo', 'pi'],
+
         # Álgebra Linear
-        elif any(palavra in pergunta_lower for palavra in ['matriz', 'matrizes', 'determinante']):
-            return 'Matrizes e Determinantes'
-        
+        'Matrizes e Determinantes': ['matriz', 'matrizes', 'determinante'],
+
         # Estatística
-        elif any(palavra in pergunta_lower for palavra in ['média', 'mediana', 'moda', 'estatística']):
-            return 'Estatística'
-        elif any(palavra in pergunta_lower for palavra in ['probabilidade', 'chance', 'evento']):
-            return 'Probabilidade'
-        elif any(palavra in pergunta_lower for palavra in ['combinação', 'arranjo', 'permutação']):
-            return 'Análise Combinatória'
-        
+        'Estatística': ['média', 'mediana', 'moda', 'estatística'],
+        'Probabilidade': ['probabilidade', 'chance', 'evento'],
+        'Análise Combinatória': ['combinação', 'arranjo', 'permutação'],
+
         # Progressões
-        elif any(palavra in pergunta_lower for palavra in ['progressão aritmética', 'pa']):
-            return 'Progressão Aritmética'
-        elif any(palavra in pergunta_lower for palavra in ['progressão geométrica', 'pg']):
-            return 'Progressão Geométrica'
-    
-    # FÍSICA - Cobertura completa dos tópicos ENEM
-    elif current_subject == 'Física':
+        'Progressão Aritmética': ['progressão aritmética', 'pa'],
+        'Progressão Geométrica': ['progressão geométrica', 'pg'],
+    },
+    'Física': {
         # Mecânica
-        if any(palavra in pergunta_lower for palavra in ['velocidade', 'aceleração', 'movimento uniforme']):
-            return 'Cinemática'
-        elif any(palavra in pergunta_lower for palavra in ['força', 'newton', 'dinâmica', 'leis de newton']):
-            return 'Dinâmica'
-        elif any(palavra in pergunta_lower for palavra in ['trabalho', 'energia', 'potência', 'conservação']):
-            return 'Energia e Trabalho'
-        elif any(palavra in pergunta_lower for palavra in ['impulso', 'quantidade de movimento', 'colisão']):
-            return 'Impulso e Quantidade de Movimento'
-        elif any(palavra in pergunta_lower for palavra in ['gravitação', 'gravidade', 'kepler']):
-            return 'Gravitação Universal'
-        elif any(palavra in pergunta_lower for palavra in ['estática', 'equilíbrio', 'alavanca']):
-            return 'Estática'
-        
+        'Cinemática': ['velocidade', 'aceleração', 'movimento uniforme'],
+        'Dinâmica': ['força', 'newton', 'dinâmica', 'leis de newton'],
+        'Energia e Trabalho': ['trabalho', 'energia', 'potência', 'conservação'],
+        'Impulso e Quantidade de Movimento': ['impulso', 'quantidade de movimento', 'colisão'],
+        'Gravitação Universal': ['gravitação', 'gravidade', 'kepler'],
+        'Estática': ['estática', 'equilíbrio', 'alavanca'],
+
         # Termologia
-        elif any(palavra in pergunta_lower for palavra in ['temperatura', 'calor', 'termômetro']):
-            return 'Temperatura e Calor'
-        elif any(palavra in pergunta_lower for palavra in ['dilatação', 'expansão térmica']):
-            return 'Dilatação Térmica'
-        elif any(palavra in pergunta_lower for palavra in ['calorimetria', 'capacidade térmica']):
-            return 'Calorimetria'
-        elif any(palavra in pergunta_lower for palavra in ['termodinâmica', 'máquina térmica', 'ciclo']):
-            return 'Termodinâmica'
-        elif any(palavra in pergunta_lower for palavra in ['mudança de estado', 'fusão', 'vaporização']):
-            return 'Mudanças de Estado'
-        
+        'Temperatura e Calor': ['temperatura', 'calor', 'termômetro'],
+        'Dilatação Térmica': ['dilatação', 'expansão térmica'],
+        'Calorimetria': ['calorimetria', 'capacidade térmica'],
+        'Termodinâmica': ['termodinâmica', 'máquina térmica', 'ciclo'],
+        'Mudanças de Estado': ['mudança de estado', 'fusão', 'vaporização'],
+
         # Óptica
-        elif any(palavra in pergunta_lower for palavra in ['luz', 'reflexão', 'refração']):
-            return 'Óptica Geométrica'
-        elif any(palavra in pergunta_lower for palavra in ['espelho', 'lente', 'imagem']):
-            return 'Espelhos e Lentes'
-        
+        'Óptica Geométrica': ['luz', 'reflexão', 'refração'],
+        'Espelhos e Lentes': ['espelho', 'lente', 'imagem'],
+
         # Ondulatória
-        elif any(palavra in pergunta_lower for palavra in ['onda', 'ondas', 'frequência', 'amplitude']):
-            return 'Ondulatória'
-        elif any(palavra in pergunta_lower for palavra in ['som', 'acústica', 'eco']):
-            return 'Acústica'
-        
+        'Ondulatória': ['onda', 'ondas', 'frequência', 'amplitude'],
+        'Acústica': ['som', 'acústica', 'eco'],
+
         # Eletricidade
-        elif any(palavra in pergunta_lower for palavra in ['corrente', 'tensão', 'resistência', 'ohm']):
-            return 'Eletricidade Básica'
-        elif any(palavra in pergunta_lower for palavra in ['circuito', 'lei de ohm', 'resistor']):
-            return 'Circuitos Elétricos'
-        elif any(palavra in pergunta_lower for palavra in ['campo elétrico', 'carga', 'coulomb']):
-            return 'Campo Elétrico'
-        elif any(palavra in pergunta_lower for palavra in ['campo magnético', 'ímã', 'magnetismo']):
-            return 'Magnetismo'
-        elif any(palavra in pergunta_lower for palavra in ['indução', 'gerador', 'motor']):
-            return 'Indução Eletromagnética'
-        
+        'Eletricidade Básica': ['corrente', 'tensão', 'resistência', 'ohm'],
+        'Circuitos Elétricos': ['circuito', 'lei de ohm', 'resistor'],
+        'Campo Elétrico': ['campo elétrico', 'carga', 'coulomb'],
+        'Magnetismo': ['campo magnético', 'ímã', 'magnetismo'],
+        'Indução Eletromagnética': ['indução', 'gerador', 'motor'],
+
         # Física Moderna
-        elif any(palavra in pergunta_lower for palavra in ['relatividade', 'einstein', 'quântica']):
-            return 'Física Moderna'
-    
-    # QUÍMICA - Cobertura completa dos tópicos ENEM
-    elif current_subject == 'Química':
+        'Física Moderna': ['relatividade', 'einstein', 'quântica'],
+    },
+    'Química': {
         # Química Geral
-        if any(palavra in pergunta_lower for palavra in ['átomo', 'atomo', 'próton', 'nêutron', 'elétron']):
-            return 'Estrutura Atômica'
-        elif any(palavra in pergunta_lower for palavra in ['tabela periódica', 'elemento', 'propriedades periódicas']):
-            return 'Tabela Periódica'
-        elif any(palavra in pergunta_lower for palavra in ['ligação', 'ligacao', 'iônica', 'covalente', 'metálica']):
-            return 'Ligações Químicas'
-        elif any(palavra in pergunta_lower for palavra in ['geometria molecular', 'hibridização', 'polaridade']):
-            return 'Geometria Molecular'
-        
+        'Estrutura Atômica': ['átomo', 'atomo', 'próton', 'nêutron', 'elétron'],
+        'Tabela Periódica': ['tabela periódica', 'elemento', 'propriedades periódicas'],
+        'Ligações Químicas': ['ligação', 'ligacao', 'iônica', 'covalente', 'metálica'],
+        'Geometria Molecular': ['geometria molecular', 'hibridização', 'polaridade'],
+
         # Físico-Química
-        elif any(palavra in pergunta_lower for palavra in ['mol', 'massa molar', 'avogadro']):
-            return 'Quantidade de Matéria'
-        elif any(palavra in pergunta_lower for palavra in ['solução', 'soluçao', 'concentração', 'molaridade']):
-            return 'Soluções'
-        elif any(palavra in pergunta_lower for palavra in ['termoquímica', 'entalpia', 'calor de reação']):
-            return 'Termoquímica'
-        elif any(palavra in pergunta_lower for palavra in ['cinética', 'velocidade de reação', 'catalisador']):
-            return 'Cinética Química'
-        elif any(palavra in pergunta_lower for palavra in ['equilíbrio', 'equilibrio', 'constante', 'le chatelier']):
-            return 'Equilíbrio Químico'
-        elif any(palavra in pergunta_lower for palavra in ['eletroquímica', 'pilha', 'eletrólise']):
-            return 'Eletroquímica'
-        
+        'Quantidade de Matéria': ['mol', 'massa molar', 'avogadro'],
+        'Soluções': ['solução', 'soluçao', 'concentração', 'molaridade'],
+        'Termoquímica': ['termoquímica', 'entalpia', 'calor de reação'],
+        'Cinética Química': ['cinética', 'velocidade de reação', 'catalisador'],
+        'Equilíbrio Químico': ['equilíbrio', 'equilibrio', 'constante', 'le chatelier'],
+        'Eletroquímica': ['eletroquímica', 'pilha', 'eletrólise'],
+
         # Química Inorgânica
-        elif any(palavra in pergunta_lower for palavra in ['ácido', 'base', 'ph', 'neutralização']):
-            return 'Ácidos e Bases'
-        elif any(palavra in pergunta_lower for palavra in ['sal', 'óxido', 'hidreto']):
-            return 'Funções Inorgânicas'
-        elif any(palavra in pergunta_lower for palavra in ['reação', 'reacao', 'balanceamento', 'estequiometria']):
-            return 'Reações Químicas'
-        
+        'Ácidos e Bases': ['ácido', 'base', 'ph', 'neutralização'],
+        'Funções Inorgânicas': ['sal', 'óxido', 'hidreto'],
+        'Reações Químicas': ['reação', 'reacao', 'balanceamento', 'estequiometria'],
+
         # Química Orgânica
-        elif any(palavra in pergunta_lower for palavra in ['carbono', 'orgânica', 'organica', 'cadeia carbônica']):
-            return 'Química Orgânica'
-        elif any(palavra in pergunta_lower for palavra in ['hidrocarboneto', 'alcano', 'alceno', 'alcino']):
-            return 'Hidrocarbonetos'
-        elif any(palavra in pergunta_lower for palavra in ['álcool', 'aldeído', 'cetona', 'ácido carboxílico']):
-            return 'Funções Orgânicas'
-        elif any(palavra in pergunta_lower for palavra in ['isomeria', 'isômero']):
-            return 'Isomeria'
-        elif any(palavra in pergunta_lower for palavra in ['polímero', 'plástico', 'polimerização']):
-            return 'Polímeros'
-        
+        'Química Orgânica': ['carbono', 'orgânica', 'organica', 'cadeia carbônica'],
+        'Hidrocarbonetos': ['hidrocarboneto', 'alcano', 'alceno', 'alcino'],
+        'Funções Orgânicas': ['álcool', 'aldeído', 'cetona', 'ácido carboxílico'],
+        'Isomeria': ['isomeria', 'isômero'],
+        'Polímeros': ['polímero', 'plástico', 'polimerização'],
+
         # Bioquímica
-        elif any(palavra in pergunta_lower for palavra in ['proteína', 'aminoácido', 'enzima']):
-            return 'Bioquímica'
-    
-    # BIOLOGIA - Cobertura completa dos tópicos ENEM
-    elif current_subject == 'Biologia':
+        'Bioquímica': ['proteína', 'aminoácido', 'enzima'],
+    },
+    'Biologia': {
         # Citologia
-        if any(palavra in pergunta_lower for palavra in ['célula', 'celula', 'membrana', 'organela']):
-            return 'Citologia'
-        elif any(palavra in pergunta_lower for palavra in ['mitose', 'meiose', 'divisão celular']):
-            return 'Divisão Celular'
-        elif any(palavra in pergunta_lower for palavra in ['fotossíntese', 'fotossintese', 'cloroplasto']):
-            return 'Fotossíntese'
-        elif any(palavra in pergunta_lower for palavra in ['respiração celular', 'mitocôndria', 'atp']):
-            return 'Respiração Celular'
-        
+        'Citologia': ['célula', 'celula', 'membrana', 'organela'],
+        'Divisão Celular': ['mitose', 'meiose', 'divisão celular'],
+        'Fotossíntese': ['fotossíntese', 'fotossintese', 'cloroplasto'],
+        'Respiração Celular': ['respiração celular', 'mitocôndria', 'atp'],
+
         # Genética
-        elif any(palavra in pergunta_lower for palavra in ['dna', 'rna', 'gene', 'cromossomo']):
-            return 'Genética Molecular'
-        elif any(palavra in pergunta_lower for palavra in ['mendel', 'dominante', 'recessivo', 'hereditariedade']):
-            return 'Genética Clássica'
-        elif any(palavra in pergunta_lower for palavra in ['mutação', 'evolução', 'seleção natural']):
-            return 'Evolução'
-        
+        'Genética Molecular': ['dna', 'rna', 'gene', 'cromossomo'],
+        'Genética Clássica': ['mendel', 'dominante', 'recessivo', 'hereditariedade'],
+        'Evolução': ['mutação', 'evolução', 'seleção natural'],
+
         # Fisiologia
-        elif any(palavra in pergunta_lower for palavra in ['sistema nervoso', 'neurônio', 'impulso']):
-            return 'Sistema Nervoso'
-        elif any(palavra in pergunta_lower for palavra in ['sistema circulatório', 'coração', 'sangue']):
-            return 'Sistema Circulatório'
-        elif any(palavra in pergunta_lower for palavra in ['sistema digestório', 'digestão', 'enzima digestiva']):
-            return 'Sistema Digestório'
-        elif any(palavra in pergunta_lower for palavra in ['sistema respiratório', 'pulmão', 'respiração']):
-            return 'Sistema Respiratório'
-        elif any(palavra in pergunta_lower for palavra in ['sistema reprodutor', 'reprodução', 'hormônio']):
-            return 'Sistema Reprodutor'
-        
+        'Sistema Nervoso': ['sistema nervoso', 'neurônio', 'impulso'],
+        'Sistema Circulatório': ['sistema circulatório', 'coração', 'sangue'],
+        'Sistema Digestório': ['sistema digestório', 'digestão', 'enzima digestiva'],
+        'Sistema Respiratório': ['sistema respiratório', 'pulmão', 'respiração'],
+        'Sistema Reprodutor': ['sistema reprodutor', 'reprodução', 'hormônio'],
+
         # Ecologia
-        elif any(palavra in pergunta_lower for palavra in ['ecologia', 'ecosystem', 'cadeia alimentar', 'teia']):
-            return 'Ecologia'
-        elif any(palavra in pergunta_lower for palavra in ['população', 'comunidade', 'bioma']):
-            return 'Ecossistemas'
-        elif any(palavra in pergunta_lower for palavra in ['poluição', 'aquecimento global', 'sustentabilidade']):
-            return 'Impactos Ambientais'
-        
+        'Ecologia': ['ecologia', 'ecosystem', 'cadeia alimentar', 'teia'],
+        'Ecossistemas': ['população', 'comunidade', 'bioma'],
+        'Impactos Ambientais': ['poluição', 'aquecimento global', 'sustentabilidade'],
+
         # Botânica
-        elif any(palavra in pergunta_lower for palavra in ['planta', 'flor', 'fruto', 'semente']):
-            return 'Botânica'
-        
+        'Botânica': ['planta', 'flor', 'fruto', 'semente'],
+
         # Zoologia
-        elif any(palavra in pergunta_lower for palavra in ['animal', 'vertebrado', 'invertebrado']):
-            return 'Zoologia'
-        
+        'Zoologia': ['animal', 'vertebrado', 'invertebrado'],
+
         # Microbiologia
-        elif any(palavra in pergunta_lower for palavra in ['bactéria', 'vírus', 'fungo', 'protozoário']):
-            return 'Microbiologia'
-    
-    # GEOGRAFIA - Cobertura completa dos tópicos ENEM
-    elif current_subject == 'Geografia':
+        'Microbiologia': ['bactéria', 'vírus', 'fungo', 'protozoário'],
+    },
+    'Geografia': {
         # Geografia Física
-        if any(palavra in pergunta_lower for palavra in ['clima', 'temperatura', 'chuva', 'precipitação']):
-            return 'Climatologia'
-        elif any(palavra in pergunta_lower for palavra in ['relevo', 'montanha', 'planície', 'planalto']):
-            return 'Geomorfologia'
-        elif any(palavra in pergunta_lower for palavra in ['solo', 'erosão', 'intemperismo']):
-            return 'Pedologia'
-        elif any(palavra in pergunta_lower for palavra in ['rio', 'bacia hidrográfica', 'água']):
-            return 'Hidrografia'
-        elif any(palavra in pergunta_lower for palavra in ['vegetação', 'bioma', 'floresta', 'cerrado']):
-            return 'Biogeografia'
-        
+        'Climatologia': ['clima', 'temperatura', 'chuva', 'precipitação'],
+        'Geomorfologia': ['relevo', 'montanha', 'planície', 'planalto'],
+        'Pedologia': ['solo', 'erosão', 'intemperismo'],
+        'Hidrografia': ['rio', 'bacia hidrográfica', 'água'],
+        'Biogeografia': ['vegetação', 'bioma', 'floresta', 'cerrado'],
+
         # Geografia Humana
-        elif any(palavra in pergunta_lower for palavra in ['população', 'demografia', 'migração', 'natalidade']):
-            return 'Geografia da População'
-        elif any(palavra in pergunta_lower for palavra in ['cidade', 'urbano', 'metrópole', 'urbanização']):
-            return 'Geografia Urbana'
-        elif any(palavra in pergunta_lower for palavra in ['agricultura', 'rural', 'agropecuária']):
-            return 'Geografia Agrária'
-        elif any(palavra in pergunta_lower for palavra in ['indústria', 'industrial', 'produção']):
-            return 'Geografia Industrial'
-        
+        'Geografia da População': ['população', 'demografia', 'migração', 'natalidade'],
+        'Geografia Urbana': ['cidade', 'urbano', 'metrópole', 'urbanização'],
+        'Geografia Agrária': ['agricultura', 'rural', 'agropecuária'],
+        'Geografia Industrial': ['indústria', 'industrial', 'produção'],
+
         # Geografia Regional
-        elif any(palavra in pergunta_lower for palavra in ['brasil', 'região', 'nordeste', 'sudeste']):
-            return 'Geografia do Brasil'
-        elif any(palavra in pergunta_lower for palavra in ['globalização', 'mundial', 'internacional']):
-            return 'Geografia Mundial'
-        
+        'Geografia do Brasil': ['brasil', 'região', 'nordeste', 'sudeste'],
+        'Geografia Mundial': ['globalização', 'mundial', 'internacional'],
+
         # Cartografia
-        elif any(palavra in pergunta_lower for palavra in ['mapa', 'escala', 'coordenada', 'gps']):
-            return 'Cartografia'
-        
+        'Cartografia': ['mapa', 'escala', 'coordenada', 'gps'],
+
         # Geopolítica
-        elif any(palavra in pergunta_lower for palavra in ['fronteira', 'território', 'geopolítica']):
-            return 'Geopolítica'
-    
-    # HISTÓRIA - Cobertura completa dos tópicos ENEM
-    elif current_subject == 'História':
+        'Geopolítica': ['fronteira', 'território', 'geopolítica'],
+    },
+    'História': {
         # História Antiga
-        if any(palavra in pergunta_lower for palavra in ['grécia', 'roma', 'antiguidade']):
-            return 'História Antiga'
-        
+        'História Antiga': ['grécia', 'roma', 'antiguidade'],
+
         # História Medieval
-        elif any(palavra in pergunta_lower for palavra in ['idade média', 'feudalismo', 'medieval']):
-            return 'Idade Média'
-        
+        'Idade Média': ['idade média', 'feudalismo', 'medieval'],
+
         # História Moderna
-        elif any(palavra in pergunta_lower for palavra in ['renascimento', 'reforma protestante', 'absolutismo']):
-            return 'História Moderna'
-        elif any(palavra in pergunta_lower for palavra in ['grandes navegações', 'descobrimento', 'colonização']):
-            return 'Grandes Navegações'
-        elif any(palavra in pergunta_lower for palavra in ['revolução francesa', 'iluminismo', 'robespierre']):
-            return 'Revolução Francesa'
-        elif any(palavra in pergunta_lower for palavra in ['revolução industrial', 'máquina a vapor']):
-            return 'Revolução Industrial'
-        
+        'História Moderna': ['renascimento', 'reforma protestante', 'absolutismo'],
+        'Grandes Navegações': ['grandes navegações', 'descobrimento', 'colonização'],
+        'Revolução Francesa': ['revolução francesa', 'iluminismo', 'robespierre'],
+        'Revolução Industrial': ['revolução industrial', 'máquina a vapor'],
+
         # História Contemporânea
-        elif any(palavra in pergunta_lower for palavra in ['primeira guerra', 'guerra mundial']):
-            return 'Primeira Guerra Mundial'
-        elif any(palavra in pergunta_lower for palavra in ['segunda guerra', 'nazismo', 'hitler']):
-            return 'Segunda Guerra Mundial'
-        elif any(palavra in pergunta_lower for palavra in ['guerra fria', 'capitalismo', 'socialismo', 'urss']):
-            return 'Guerra Fria'
-        
+        'Primeira Guerra Mundial': ['primeira guerra', 'guerra mundial'],
+        'Segunda Guerra Mundial': ['segunda guerra', 'nazismo', 'hitler'],
+        'Guerra Fria': ['guerra fria', 'capitalismo', 'socialismo', 'urss'],
+
         # História do Brasil
-        elif any(palavra in pergunta_lower for palavra in ['brasil colônia', 'colonial', 'capitanias']):
-            return 'Brasil Colonial'
-        elif any(palavra in pergunta_lower for palavra in ['independência', 'dom pedro', '1822']):
-            return 'Independência do Brasil'
-        elif any(palavra in pergunta_lower for palavra in ['império', 'dom pedro ii', 'monarquia']):
-            return 'Brasil Império'
-        elif any(palavra in pergunta_lower for palavra in ['república', 'proclamação da república']):
-            return 'República Brasileira'
-        elif any(palavra in pergunta_lower for palavra in ['getúlio vargas', 'era vargas', 'estado novo']):
-            return 'Era Vargas'
-        elif any(palavra in pergunta_lower for palavra in ['ditadura militar', 'golpe de 64', 'ai-5']):
-            return 'Ditadura Militar'
-        elif any(palavra in pergunta_lower for palavra in ['redemocratização', 'constituição de 88']):
-            return 'Nova República'
-        
+        'Brasil Colonial': ['brasil colônia', 'colonial', 'capitanias'],
+        'Independência do Brasil': ['independência', 'dom pedro', '1822'],
+        'Brasil Império': ['império', 'dom pedro ii', 'monarquia'],
+        'República Brasileira': ['república', 'proclamação da república'],
+        'Era Vargas': ['getúlio vargas', 'era vargas', 'estado novo'],
+        'Ditadura Militar': ['ditadura militar', 'golpe de 64', 'ai-5'],
+        'Nova República': ['redemocratização', 'constituição de 88'],
+
         # Escravidão
-        elif any(palavra in pergunta_lower for palavra in ['escravidão', 'abolição', 'lei áurea', 'quilombo']):
-            return 'Escravidão no Brasil'
-    
-    # LÍNGUA PORTUGUESA - Cobertura completa dos tópicos ENEM
-    elif current_subject == 'Língua Portuguesa':
+        'Escravidão no Brasil': ['escravidão', 'abolição', 'lei áurea', 'quilombo'],
+    },
+    'Língua Portuguesa': {
         # Gramática
-        if any(palavra in pergunta_lower for palavra in ['sintaxe', 'sujeito', 'predicado', 'complemento']):
-            return 'Sintaxe'
-        elif any(palavra in pergunta_lower for palavra in ['morfologia', 'substantivo', 'adjetivo', 'verbo']):
-            return 'Morfologia'
-        elif any(palavra in pergunta_lower for palavra in ['crase', 'acento', 'ortografia']):
-            return 'Ortografia e Acentuação'
-        elif any(palavra in pergunta_lower for palavra in ['concordância', 'verbal', 'nominal']):
-            return 'Concordância'
-        elif any(palavra in pergunta_lower for palavra in ['regência', 'preposição']):
-            return 'Regência'
-        elif any(palavra in pergunta_lower for palavra in ['pontuação', 'vírgula', 'ponto']):
-            return 'Pontuação'
-        
+        'Sintaxe': ['sintaxe', 'sujeito', 'predicado', 'complemento'],
+        'Morfologia': ['morfologia', 'substantivo', 'adjetivo', 'verbo'],
+        'Ortografia e Acentuação': ['crase', 'acento', 'ortografia'],
+        'Concordância': ['concordância', 'verbal', 'nominal'],
+        'Regência': ['regência', 'preposição'],
+        'Pontuação': ['pontuação', 'vírgula', 'ponto'],
+
         # Estilística
-        elif any(palavra in pergunta_lower for palavra in ['figura de linguagem', 'metáfora', 'metonímia']):
-            return 'Figuras de Linguagem'
-        elif any(palavra in pergunta_lower for palavra in ['função da linguagem', 'emotiva', 'referencial']):
-            return 'Funções da Linguagem'
-        
+        'Figuras de Linguagem': ['figura de linguagem', 'metáfora', 'metonímia'],
+        'Funções da Linguagem': ['função da linguagem', 'emotiva', 'referencial'],
+
         # Literatura
-        elif any(palavra in pergunta_lower for palavra in ['literatura', 'movimento literário']):
-            return 'Literatura Brasileira'
-        elif any(palavra in pergunta_lower for palavra in ['barroco', 'gregório de matos']):
-            return 'Barroco'
-        elif any(palavra in pergunta_lower for palavra in ['arcadismo', 'árcade']):
-            return 'Arcadismo'
-        elif any(palavra in pergunta_lower for palavra in ['romantismo', 'josé de alencar', 'gonçalves dias']):
-            return 'Romantismo'
-        elif any(palavra in pergunta_lower for palavra in ['realismo', 'machado de assis']):
-            return 'Realismo'
-        elif any(palavra in pergunta_lower for palavra in ['parnasianismo', 'olavo bilac']):
-            return 'Parnasianismo'
-        elif any(palavra in pergunta_lower for palavra in ['simbolismo', 'cruz e sousa']):
-            return 'Simbolismo'
-        elif any(palavra in pergunta_lower for palavra in ['modernismo', 'semana de arte moderna', 'mário de andrade']):
-            return 'Modernismo'
-        
+        'Literatura Brasileira': ['literatura', 'movimento literário'],
+        'Barroco': ['barroco', 'gregório de matos'],
+        'Arcadismo': ['arcadismo', 'árcade'],
+        'Romantismo': ['romantismo', 'josé de alencar', 'gonçalves dias'],
+        'Realismo': ['realismo', 'machado de assis'],
+        'Parnasianismo': ['parnasianismo', 'olavo bilac'],
+        'Simbolismo': ['simbolismo', 'cruz e sousa'],
+        'Modernismo': ['modernismo', 'semana de arte moderna', 'mário de andrade'],
+
         # Interpretação
-        elif any(palavra in pergunta_lower for palavra in ['interpretação', 'texto', 'leitura', 'compreensão']):
-            return 'Interpretação de Textos'
-        elif any(palavra in pergunta_lower for palavra in ['gênero textual', 'crônica', 'artigo']):
-            return 'Gêneros Textuais'
-    
-    # REDAÇÃO - Tópicos específicos
-    elif current_subject == 'Redação':
-        if any(palavra in pergunta_lower for palavra in ['dissertação', 'argumentação', 'enem']):
-            return 'Dissertação Argumentativa'
-        elif any(palavra in pergunta_lower for palavra in ['introdução', 'tese', 'contextualização']):
-            return 'Introdução'
-        elif any(palavra in pergunta_lower for palavra in ['desenvolvimento', 'argumento', 'fundamentação']):
-            return 'Desenvolvimento'
-        elif any(palavra in pergunta_lower for palavra in ['conclusão', 'proposta', 'intervenção']):
-            return 'Conclusão'
-        elif any(palavra in pergunta_lower for palavra in ['coesão', 'coerência', 'conectivo']):
-            return 'Coesão e Coerência'
+        'Interpretação de Textos': ['interpretação', 'texto', 'leitura', 'compreensão'],
+        'Gêneros Textuais': ['gênero textual', 'crônica', 'artigo'],
+    },
+    'Redação': {
+        'Dissertação Argumentativa': ['dissertação', 'argumentação', 'enem'],
+        'Introdução': ['introdução', 'tese', 'contextualização'],
+        'Desenvolvimento': ['desenvolvimento', 'argumento', 'fundamentação'],
+        'Conclusão': ['conclusão', 'proposta', 'intervenção'],
+        'Coesão e Coerência': ['coesão', 'coerência', 'conectivo'],
+    },
+}
+
+# Compiladas uma vez (uma passada sobre a pergunta em vez de um teste por palavra)
+TOPICOS_MATCHERS = {materia: KeywordMatcher(regras) for materia, regras in REGRAS_TOPICOS.items()}
+
+def extrair_topico_especifico(pergunta: str, current_subject: str) -> str:
+    """Extrai o tópico específico da pergunta com detecção avançada para TODAS as matérias do ENEM"""
+    regras = REGRAS_TOPICOS.get(current_subject)
+    if regras:
+        hits = TOPICOS_MATCHERS[current_subject].count(pergunta.lower())
+        topico = first_label(hits, regras)
+        if topico:
+            return topico
     
     # Fallback inteligente: extrair palavras-chave da pergunta
     palavras = pergunta.split()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Docstore mapeado em memória para os índices FAISS de A.T.E.N.A.
+
+Converte o docstore em pickle (index.pkl) para três arquivos simples:
+    <nome>.docs.bin   textos e metadados (JSON UTF-8) concatenados
+    <nome>.docs.idx   offsets de cada documento (int64, formato .npy)
+    <nome>.docs.json  ids dos documentos e o mapeamento posição FAISS -> id
+
+Na leitura o .bin é aberto com mmap e cada documento só é materializado
+quando uma busca retorna o seu id. Vários processos do Streamlit
+compartilham as mesmas páginas pelo cache do sistema operacional.
+
+Conversão offline:
+    python mmap_docstore.py faiss_index_math [index]
+"""
+
+import json
+import mmap
+import os
+import pickle
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Tuple, Union
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+except ImportError:
+    from langchain.schema import Document
+
+try:
+    from langchain_community.docstore.base import Docstore
+except ImportError:
+    from langchain.docstore.base import Docstore
+
+
+def docstore_paths(folder_path: str, index_name: str = "index") -> Tuple[str, str, str]:
+    """Caminhos dos arquivos do docstore mapeado (.bin, .idx, .json)."""
+    base = os.path.join(folder_path, f"{index_name}.docs")
+    return base + ".bin", base + ".idx", base + ".json"
+
+
+def has_mmap_docstore(folder_path: str, index_name: str = "index") -> bool:
+    """Indica se o docstore mapeado já foi exportado para o índice."""
+    return all(os.path.exists(path) for path in docstore_paths(folder_path, index_name))
+
+
+def export_docstore(
+    docstore_items: Dict[str, Document],
+    index_to_docstore_id: Dict[int, str],
+    folder_path: str,
+    index_name: str = "index",
+) -> int:
+    """
+    Grava os documentos no formato mapeado. Os arquivos são escritos em
+    temporários e renomeados no fim, para nunca deixar um docstore pela metade.
+    """
+    bin_path, idx_path, json_path = docstore_paths(folder_path, index_name)
+    # Sufixo por processo: dois workers exportando ao mesmo tempo não se atrapalham
+    tmp = f".{os.getpid()}.tmp"
+    ids: List[str] = list(docstore_items.keys())
+    offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+
+    with open(bin_path + tmp, "wb") as f:
+        for i, doc_id in enumerate(ids):
+            doc = docstore_items[doc_id]
+            record = json.dumps(
+                {"page_content": doc.page_content, "metadata": doc.metadata},
+                ensure_ascii=False,
+                default=str,
+            ).encode("utf-8")
+            f.write(record)
+            offsets[i + 1] = offsets[i] + len(record)
+
+    with open(idx_path + tmp, "wb") as f:
+        np.save(f, offsets)
+
+    positions = sorted(index_to_docstore_id)
+    with open(json_path + tmp, "w", encoding="utf-8") as f:
+        json.dump({
+            "ids": ids,
+            "index_to_docstore_id": [index_to_docstore_id[pos] for pos in positions],
+        }, f, ensure_ascii=False)
+
+    # O .json é renomeado por último: ele marca o docstore como completo
+    for path in (bin_path, idx_path, json_path):
+        os.replace(path + tmp, path)
+    return len(ids)
+
+
+def export_pickle_docstore(folder_path: str, index_name: str = "index") -> int:
+    """
+    Converte o index.pkl (docstore + mapeamento do LangChain) para o formato mapeado.
+    É o único ponto que ainda precisa desserializar o pickle.
+    """
+    with open(os.path.join(folder_path, f"{index_name}.pkl"), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return export_docstore(docstore._dict, index_to_docstore_id, folder_path, index_name)
+
+
+class _LazyDocuments(Mapping):
+    """Visão somente-leitura id -> Document, compatível com o uso de docstore._dict."""
+
+    def __init__(self, store: "MmapDocstore"):
+        self._store = store
+
+    def __getitem__(self, doc_id: str) -> Document:
+        position = self._store.positions.get(doc_id)
+        if position is None:
+            raise KeyError(doc_id)
+        return self._store.document_at(position)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._store.ids)
+
+    def __len__(self) -> int:
+        return len(self._store.ids)
+
+
+class MmapDocstore(Docstore):
+    """Docstore somente-leitura apoiado em um arquivo mapeado em memória."""
+
+    def __init__(self, folder_path: str, index_name: str = "index"):
+        bin_path, idx_path, json_path = docstore_paths(folder_path, index_name)
+        with open(json_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+
+        self.ids: List[str] = header["ids"]
+        self.positions: Dict[str, int] = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self.index_to_docstore_id: Dict[int, str] = dict(enumerate(header["index_to_docstore_id"]))
+        self.offsets = np.load(idx_path, mmap_mode="r")
+
+        self._file = open(bin_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def document_at(self, position: int) -> Document:
+        """Lê e materializa o documento da posição informada."""
+        start, end = int(self.offsets[position]), int(self.offsets[position + 1])
+        record = json.loads(bytes(self._mmap[start:end]).decode("utf-8"))
+        return Document(page_content=record["page_content"], metadata=record["metadata"])
+
+    def search(self, search: str) -> Union[str, Document]:
+        position = self.positions.get(search)
+        if position is None:
+            return f"ID {search} not found."
+        return self.document_at(position)
+
+    @property
+    def _dict(self) -> Mapping:
+        # Mantém compatível o código que lê docstore._dict (ex.: get_stats)
+        return _LazyDocuments(self)
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    folder = sys.argv[1]
+    name = sys.argv[2] if len(sys.argv) > 2 else "index"
+    total = export_pickle_docstore(folder, name)
+    print(f"✅ {total} documentos exportados para {docstore_paths(folder, name)[0]}")
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Extração de texto de PDFs em paralelo para a ingestão das provas do ENEM.
+Cada PDF (ou cada faixa de páginas, nas provas grandes) vira uma tarefa de um
+ProcessPoolExecutor; os textos voltam na ordem original dos arquivos e páginas.
+Só depende do pypdf, para os processos do pool não importarem o Streamlit.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from pypdf import PdfReader
+
+# Provas com mais páginas que isso são divididas em faixas entre os processos
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+
+# 0 = um processo por núcleo
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "0"))
+
+
+def count_pages(pdf_path: str) -> int:
+    return len(PdfReader(pdf_path).pages)
+
+
+def extract_page_range(pdf_path: str, start: int = 0, end: Optional[int] = None) -> List[str]:
+    """Texto das páginas [start, end) que não estão vazias."""
+    reader = PdfReader(pdf_path)
+    texts = []
+    for page in reader.pages[start:end]:
+        text = page.extract_text()
+        if text.strip():
+            texts.append(text)
+    return texts
+
+
+def join_page_texts(texts: List[str]) -> str:
+    """Junta as páginas num texto só (uma quebra de linha após cada página)."""
+    return "".join(text + "\n" for text in texts)
+
+
+def plan_tasks(pdf_paths: List[str], pages_per_task: int = PAGES_PER_TASK) -> List[Tuple[str, int, Optional[int]]]:
+    """Divide os PDFs em tarefas (arquivo, página inicial, página final)."""
+    tasks = []
+    for pdf_path in pdf_paths:
+        try:
+            total = count_pages(pdf_path)
+        except Exception:
+            # O erro aparece (e é tratado) na extração do arquivo inteiro
+            tasks.append((pdf_path, 0, None))
+            continue
+        if total <= pages_per_task:
+            tasks.append((pdf_path, 0, None))
+        else:
+            tasks.extend((pdf_path, start, min(start + pages_per_task, total)) for start in range(0, total, pages_per_task))
+    return tasks
+
+
+def _run_task(task: Tuple[str, int, Optional[int]]) -> List[str]:
+    return extract_page_range(*task)
+
+
+def extract_pdf_texts(
+    pdf_paths: List[str],
+    workers: Optional[int] = None,
+    pages_per_task: int = PAGES_PER_TASK,
+) -> Dict[str, Optional[str]]:
+    """
+    Extrai o texto completo de cada PDF em paralelo. Retorna {caminho: texto}
+    na ordem recebida; PDFs que falharam ficam com None.
+    """
+    workers = workers or PDF_EXTRACTION_WORKERS or None
+    tasks = plan_tasks(pdf_paths, pages_per_task)
+    page_texts: Dict[str, List[str]] = {pdf_path: [] for pdf_path in pdf_paths}
+    failed = set()
+
+    if workers == 1 or len(tasks) <= 1:
+        results = []
+        for task in tasks:
+            try:
+                results.append(_run_task(task))
+            except Exception as e:
+                results.append(e)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_run_task, task) for task in tasks]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+
+    # As tarefas estão na ordem dos arquivos e das páginas: basta concatenar
+    for (pdf_path, _, _), result in zip(tasks, results):
+        if isinstance(result, Exception):
+            if pdf_path not in failed:
+                print(f"Erro ao processar PDF {pdf_path}: {result}")
+            failed.add(pdf_path)
+        else:
+            page_texts[pdf_path].extend(result)
+
+    return {
+        pdf_path: None if pdf_path in failed else join_page_texts(page_texts[pdf_path])
+        for pdf_path in pdf_paths
+    }
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Pré-geração em lote dos mapas mentais do catálogo de tópicos do ENEM.
+
+O catálogo junta os tópicos de REGRAS_TOPICOS (mapa_mental_markmap.py) e os
+temas mais frequentes das questões (questions_primeiro_dia.json e
+questions_segundo_enem.json). Cada tópico é gerado nos níveis Básico,
+Intermediário e Avançado com concorrência limitada e limite de requisições por
+minuto. Só os mapas que passam em validar_especificidade_mapa e têm conceitos
+suficientes (analisar_markdown_stats) são gravados em
+mapas_mentais_pregerados.json.gz. Em tempo de execução esses mapas são
+servidos sem chamada à IA.
+
+Uso:
+    python pregerar_mapas_mentais.py --dry-run                   # só lista o catálogo
+    python pregerar_mapas_mentais.py --materias Biologia,Física --concorrencia 2 --rpm 20
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Dict, List
+
+from mapa_mental_cache import MAPAS_PREGERADOS_FILE, MapasPregerados, chave_mapa_pregerado
+from mapa_mental_markmap import (
+    REGRAS_TOPICOS,
+    analisar_markdown_stats,
+    extrair_topico_especifico,
+    gerar_mapa_mental_ia,
+    validar_especificidade_mapa,
+)
+from questions_embeddings import QUESTIONS_FILES
+
+NIVEIS = ["Básico", "Intermediário", "Avançado"]
+
+# Conceitos mínimos (linhas # ou -) para aceitar um mapa de cada nível
+MIN_CONCEITOS = {"Básico": 5, "Intermediário": 8, "Avançado": 10}
+
+# Disciplina das questões -> matéria do mapa mental
+DISCIPLINAS_MATERIAS = {
+    "Matemática": "Matemática",
+    "Matemática e suas Tecnologias": "Matemática",
+    "Física": "Física",
+    "Química": "Química",
+    "Biologia": "Biologia",
+    "Geografia": "Geografia",
+    "História": "História",
+    "Português": "Língua Portuguesa",
+    "Literatura": "Língua Portuguesa",
+}
+
+# Temas genéricos que não viram mapa
+TEMAS_IGNORADOS = {"", "tema geral", "geral"}
+
+MAX_TENTATIVAS = 3
+
+
+class RateLimiter:
+    """Espaça as chamadas para no máximo `rpm` por minuto (entre todas as threads)."""
+
+    def __init__(self, rpm: float):
+        self.intervalo = 60.0 / rpm if rpm > 0 else 0.0
+        self._proxima = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            agora = time.monotonic()
+            espera = self._proxima - agora
+            self._proxima = max(agora, self._proxima) + self.intervalo
+        if espera > 0:
+            time.sleep(espera)
+
+
+def montar_catalogo(materias: List[str], max_temas: int) -> List[Dict[str, str]]:
+    """
+    Itens {materia, topico, pergunta, tipo}. Temas que caem num tópico da
+    tabela só aumentam a prioridade dele; os demais viram itens próprios.
+    """
+    frequencia_topicos: Counter = Counter()
+    temas: Dict[str, Counter] = {materia: Counter() for materia in materias}
+    for path in QUESTIONS_FILES:
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            for questao in json.load(f).values():
+                materia = DISCIPLINAS_MATERIAS.get(questao.get("disciplina", ""))
+                tema = (questao.get("tema") or "").strip()
+                if materia not in temas or tema.lower() in TEMAS_IGNORADOS:
+                    continue
+                topico = extrair_topico_especifico(tema, materia)
+                if topico in REGRAS_TOPICOS.get(materia, {}):
+                    frequencia_topicos[(materia, topico)] += 1
+                else:
+                    temas[materia][tema] += 1
+
+    catalogo = []
+    for materia in materias:
+        # Tópicos da tabela, os mais cobrados no ENEM primeiro
+        topicos = sorted(REGRAS_TOPICOS.get(materia, {}), key=lambda t: -frequencia_topicos[(materia, t)])
+        for topico in topicos:
+            catalogo.append({"materia": materia, "topico": topico, "pergunta": f"Explique {topico}", "tipo": "topico"})
+        # Temas fora da tabela: o próprio tema é o tópico do mapa (a busca é pela pergunta)
+        for tema, _ in temas[materia].most_common(max_temas):
+            catalogo.append({"materia": materia, "topico": tema, "pergunta": tema, "tipo": "pergunta"})
+    return catalogo
+
+
+def chave_do_item(item: Dict[str, str], nivel: str) -> str:
+    if item["tipo"] == "topico":
+        return chave_mapa_pregerado(item["materia"], nivel, topico=item["topico"])
+    return chave_mapa_pregerado(item["materia"], nivel, pergunta=item["pergunta"])
+
+
+def gerar_item(item: Dict[str, str], nivel: str, api_key: str, limiter: RateLimiter) -> Dict:
+    """Gera e valida um mapa; tenta de novo (com espera crescente) em erros da API."""
+    ultimo_erro = ""
+    for tentativa in range(1, MAX_TENTATIVAS + 1):
+        limiter.wait()
+        try:
+            markdown = gerar_mapa_mental_ia(item["pergunta"], api_key, nivel, item["materia"], item["topico"])
+        except Exception as e:
+            ultimo_erro = str(e)[:200]
+            time.sleep(2 ** tentativa)
+            continue
+
+        stats = analisar_markdown_stats(markdown)
+        if not validar_especificidade_mapa(markdown, item["topico"]):
+            ultimo_erro = "mapa não menciona o tópico"
+        elif stats["conceitos"] < MIN_CONCEITOS.get(nivel, 0):
+            ultimo_erro = f"poucos conceitos ({stats['conceitos']})"
+        else:
+            return {"markdown": markdown, "stats": stats}
+    return {"erro": ultimo_erro}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pré-gera os mapas mentais do catálogo de tópicos do ENEM.")
+    parser.add_argument("--materias", default=",".join(REGRAS_TOPICOS), help="lista separada por vírgulas")
+    parser.add_argument("--niveis", default=",".join(NIVEIS))
+    parser.add_argument("--max-temas", type=int, default=10, help="temas extras (fora da tabela) por matéria")
+    parser.add_argument("--concorrencia", type=int, default=2, help="chamadas simultâneas à Groq")
+    parser.add_argument("--rpm", type=float, default=20, help="máximo de chamadas por minuto")
+    parser.add_argument("--saida", default=MAPAS_PREGERADOS_FILE)
+    parser.add_argument("--forcar", action="store_true", help="gera de novo mapas que já existem")
+    parser.add_argument("--dry-run", action="store_true", help="só mostra o catálogo")
+    args = parser.parse_args()
+
+    materias = [m.strip() for m in args.materias.split(",") if m.strip()]
+    niveis = [n.strip() for n in args.niveis.split(",") if n.strip()]
+    catalogo = montar_catalogo(materias, args.max_temas)
+
+    mapas = MapasPregerados(args.saida)
+    tarefas = [
+        (item, nivel) for item in catalogo for nivel in niveis
+        if args.forcar or chave_do_item(item, nivel) not in mapas
+    ]
+    print(f"📚 Catálogo: {len(catalogo)} tópicos x {len(niveis)} níveis; "
+          f"{len(tarefas)} mapas a gerar ({len(mapas)} já no arquivo)")
+
+    if args.dry_run:
+        for item in catalogo:
+            print(f"   {item['materia']:<18} {item['tipo']:<8} {item['topico']}  <- {item['pergunta']}")
+        return
+
+    api_key = os.environ.get("GROQ_API_KEY", "").strip()
+    if not api_key:
+        print("❌ Defina GROQ_API_KEY para gerar os mapas")
+        return
+
+    limiter = RateLimiter(args.rpm)
+    gerados = falhas = 0
+    inicio = time.time()
+    with ThreadPoolExecutor(max_workers=max(1, args.concorrencia)) as executor:
+        futures = {executor.submit(gerar_item, item, nivel, api_key, limiter): (item, nivel) for item, nivel in tarefas}
+        for n, future in enumerate(as_completed(futures), start=1):
+            item, nivel = futures[future]
+            resultado = future.result()
+            rotulo = f"{item['materia']} / {item['topico']} / {nivel}"
+            if "markdown" in resultado:
+                mapas.add(
+                    chave_do_item(item, nivel), resultado["markdown"],
+                    materia=item["materia"], nivel=nivel, topico=item["topico"], pergunta=item["pergunta"],
+                )
+                gerados += 1
+                print(f"   ✅ [{n}/{len(tarefas)}] {rotulo} ({resultado['stats']['conceitos']} conceitos)")
+                # Grava aos poucos: uma interrupção não perde o que já foi gerado
+                if gerados % 10 == 0:
+                    mapas.save(gerado_em=datetime.now().isoformat(timespec="seconds"))
+            else:
+                falhas += 1
+                print(f"   ⚠️ [{n}/{len(tarefas)}] {rotulo}: {resultado['erro']}")
+
+    mapas.save(gerado_em=datetime.now().isoformat(timespec="seconds"))
+    tamanho_kb = os.path.getsize(args.saida) / 1024
+    print(f"\n✅ {gerados} mapas gerados, {falhas} rejeitados em {time.time() - inicio:.0f}s")
+    print(f"📦 '{args.saida}': {len(mapas)} mapas, {tamanho_kb:.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
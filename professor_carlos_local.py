@@ -4,7 +4,7 @@ Usa documentos locais da pasta matemática em vez da API do Google Drive
 """
 
 import streamlit as st
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 from datetime import datetime
 import os
 
@@ -28,6 +28,9 @@ except ImportError:
     ANALOGIES_AVAILABLE = False
     print("⚠️ Sistema de analogias da Sther não disponível")
 
+# Streaming de tokens até a interface
+from llm_streaming import StreamRenderer
+
 class ProfessorCarlosLocal:
     """Professor Carlos especializado usando documentos locais"""
     
@@ -79,8 +82,11 @@ class ProfessorCarlosLocal:
             st.session_state.rag_initialized_carlos = False
             return False
     
-    def get_response(self, user_message: str, api_key: str) -> str:
-        """Gera uma resposta para a mensagem do usuário."""
+    def get_response(self, user_message: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """
+        Gera uma resposta para a mensagem do usuário.
+        Se `on_token` for informado, recebe o texto parcial (já formatado) conforme a resposta é gerada.
+        """
         
         if not LOCAL_RAG_AVAILABLE:
             return """
@@ -211,7 +217,13 @@ Pode me fazer uma pergunta mais específica sobre algum desses tópicos que eu p
         
         try:
             # Gera resposta usando RAG
-            result = self.rag_system.get_response(user_message)
+            if on_token is not None:
+                result = {}
+                renderer = StreamRenderer(on_token, format_professor_response if MATH_FORMATTER_AVAILABLE else None)
+                for token in self.rag_system.stream_response(user_message, output=result):
+                    renderer.feed(token)
+            else:
+                result = self.rag_system.get_response(user_message)
             
             answer = result.get("answer", "Desculpe, não consegui gerar uma resposta.")
             source_docs = result.get("source_documents", [])
@@ -457,4 +469,37 @@ Me peça exercícios específicos quando quiser treinar! 🚀
 💡 **Prática recomendada**
 
 Para fixar o conteúdo, sempre recomendo exercícios! Me pergunte quando quiser praticar! 💪
-"""
\ No newline at end of file
+"""
+
+_singleton_instance = None
+
+def get_professor_carlos_local_instance() -> ProfessorCarlosLocal:
+    """
+    Retorna uma instância única (singleton) do ProfessorCarlosLocal.
+    Mantém o sistema inicializado entre as mensagens da conversa.
+    """
+    global _singleton_instance
+    if _singleton_instance is None:
+        _singleton_instance = ProfessorCarlosLocal()
+    return _singleton_instance
+
+def setup_professor_carlos_local_ui():
+    """Configura interface do Professor Carlos (Matemática Local)"""
+    professor = get_professor_carlos_local_instance()
+    
+    if not LOCAL_RAG_AVAILABLE or professor.rag_system is None:
+        st.error("❌ Sistema RAG Local de Matemática não disponível. Verifique as dependências.")
+        return None
+    
+    stats = professor.rag_system.get_stats()
+    status_icon = "✅" if stats.get("status") == "Carregado" else "❌"
+    st.markdown(f"**🧮 Base de Matemática:** {status_icon} {stats.get('status', 'N/A')} "
+                f"({stats.get('total_documents', 0)} trechos)")
+    return professor
+
+def get_professor_carlos_local_response(user_message: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Gera resposta do Professor Carlos usando RAG local.
+    Se `on_token` for informado, recebe o texto parcial (já formatado) conforme a resposta é gerada.
+    """
+    return get_professor_carlos_local_instance().get_response(user_message, api_key, on_token=on_token)
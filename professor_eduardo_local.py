@@ -1,59 +1,50 @@
 import streamlit as st
-from local_history_rag import history_rag_system
-import os
+from local_history_rag import get_local_history_rag_instance
+from typing import Optional, Callable
 from encoding_utils import safe_str
 
+# Formatação específica de História
+try:
+    from history_formatter import format_history_response
+    FORMATTER_AVAILABLE = True
+except ImportError:
+    FORMATTER_AVAILABLE = False
+
+# Streaming de tokens até a interface
+from llm_streaming import StreamRenderer
+
 def setup_professor_eduardo_local_ui():
     """Configura interface do Professor Eduardo (História Local)"""
     
     st.markdown("### 🏛️ Professor Eduardo - História")
     st.markdown("**Sistema RAG Local com base de conhecimento em História**")
     
+    history_rag_system = get_local_history_rag_instance()
+    
     # Status do sistema RAG
     with st.expander("📊 Status do Sistema", expanded=False):
-        if history_rag_system.embeddings is None:
-            st.error("❌ Sistema de embeddings não inicializado")
-            return
-        
-        # Informações sobre documentos
-        docs_path = history_rag_system.history_folder_path
-        if os.path.exists(docs_path):
-            if os.listdir(docs_path):
-                st.success(f"✅ Pasta de história encontrada com {len(os.listdir(docs_path))} arquivos")
-            else:
-                st.warning("⚠️ Pasta de história está vazia")
+        stats = history_rag_system.get_stats()
+        if stats["status"] == "Carregado":
+            st.success(f"✅ Base de conhecimento carregada com {stats['total_documents']} trechos")
+            for doc_name in stats["sample_documents"]:
+                st.markdown(f"- `{doc_name}`")
         else:
-            st.error("❌ Pasta 'historia' não encontrada")
-        
-        # Status do vectorstore
-        vectorstore_path = history_rag_system.persist_directory
-        if os.path.exists(vectorstore_path):
-            st.success("✅ Base de conhecimento (vectorstore) existe")
-        else:
-            st.info("ℹ️ Base de conhecimento será criada no primeiro uso")
+            st.info("ℹ️ Base de conhecimento será baixada e carregada no primeiro uso")
     
     # Controles do sistema
     with st.expander("🔧 Controles do Sistema", expanded=False):
         col1, col2 = st.columns(2)
         
         with col1:
-            if st.button("🔄 Recriar Base", help="Reprocessa todos os documentos"):
-                with st.spinner("Recriando base de conhecimento..."):
-                    success = history_rag_system.process_history_documents()
-                    if success:
-                        st.success("✅ Base recriada com sucesso!")
-                    else:
-                        st.error("❌ Erro ao recriar base")
+            if st.button("🗑️ Limpar Conversa", help="Apaga o histórico da conversa"):
+                history_rag_system.clear_memory()
+                st.success("✅ Histórico da conversa apagado!")
         
         with col2:
             if st.button("🏛️ Testar Sistema", help="Testa uma consulta simples"):
                 with st.spinner("Testando sistema..."):
                     test_query = "O que foi a Revolução Francesa?"
                     try:
-                        # Inicializa vectorstore se necessário
-                        if not history_rag_system.vectorstore:
-                            history_rag_system.load_existing_vectorstore()
-                        
                         docs = history_rag_system.search_relevant_content(test_query, k=1)
                         if docs:
                             st.success(f"✅ Sistema funcionando! Encontrou {len(docs)} documento(s)")
@@ -80,43 +71,43 @@ def setup_professor_eduardo_local_ui():
         - "Explique a Era Vargas"
         """)
 
-def get_professor_eduardo_local_response(user_message: str, api_key: str) -> str:
-    """Gera resposta do Professor Eduardo usando RAG local"""
+def get_professor_eduardo_local_response(user_message: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Gera resposta do Professor Eduardo usando RAG local.
+    Se `on_token` for informado, recebe o texto parcial (já formatado) conforme a resposta é gerada.
+    """
     
     try:
-        # Verifica se RAG chain existe, se não, cria
-        if not history_rag_system.rag_chain:
-            # Carrega vectorstore se necessário
-            if not history_rag_system.vectorstore:
-                success = history_rag_system.load_existing_vectorstore()
-                if not success:
-                    # Se não existe, processa documentos
-                    success = history_rag_system.process_history_documents()
-                    if not success:
-                        return """
+        history_rag_system = get_local_history_rag_instance()
+        
+        # Baixa o índice e cria a cadeia RAG se necessário
+        if not history_rag_system.is_initialized:
+            success = history_rag_system.initialize(api_key)
+            if not success:
+                return """
 ❌ **Erro ao inicializar sistema de história**
 
 Não foi possível carregar a base de conhecimento. Verifique:
-1. Se a pasta `historia` existe e contém documentos
+1. Sua conexão com a internet (o índice é baixado no primeiro uso)
 2. Se as dependências estão instaladas
 3. Se há espaço em disco suficiente
 
 💡 Use os controles na barra lateral para diagnóstico.
 """
-            
-            # Cria chain RAG
-            history_rag_system.create_rag_chain(api_key)
         
         # Gera resposta usando RAG
-        result = history_rag_system.get_response(user_message)
+        if on_token is not None:
+            result = {}
+            renderer = StreamRenderer(on_token, format_history_response if FORMATTER_AVAILABLE else None)
+            for token in history_rag_system.stream_response(user_message, output=result):
+                renderer.feed(token)
+        else:
+            result = history_rag_system.get_response(user_message)
         response = result.get("answer", "❌ Erro ao gerar resposta")
         
         # Aplica formatação específica de história
-        try:
-            from history_formatter import format_history_response
+        if FORMATTER_AVAILABLE:
             response = format_history_response(response)
-        except ImportError:
-            pass
             
         return response
         
@@ -129,7 +120,7 @@ Detalhes do erro: {error_msg}
 
 💡 **Possíveis soluções:**
 1. Verifique se a pasta `historia` contém documentos
-2. Reinstale as dependências: `pip install langchain chromadb sentence-transformers`
+2. Reinstale as dependências: `pip install -r requirements.txt`
 3. Verifique sua conexão com a internet
-4. Tente recriar a base de conhecimento na barra lateral
+4. Tente limpar a conversa na barra lateral
 """ 
\ No newline at end of file
@@ -6,16 +6,25 @@ A.T.E.N.A. - Interface integrada com Streamlit
 
 import streamlit as st
 import time
-from typing import Dict, Any, List
-import os
+from typing import Dict, Any, List, Optional, Callable
 
 # Importa sistema RAG de português
 try:
-    from local_portuguese_rag import local_portuguese_rag
+    from local_portuguese_rag import get_local_portuguese_rag_instance
     PORTUGUESE_RAG_AVAILABLE = True
 except ImportError:
     PORTUGUESE_RAG_AVAILABLE = False
 
+# Formatação específica de Língua Portuguesa
+try:
+    from portuguese_formatter import format_portuguese_response
+    FORMATTER_AVAILABLE = True
+except ImportError:
+    FORMATTER_AVAILABLE = False
+
+# Streaming de tokens até a interface
+from llm_streaming import StreamRenderer
+
 def setup_professor_leticia_local_ui():
     """Configura interface da Professora Letícia"""
     
@@ -25,33 +34,25 @@ def setup_professor_leticia_local_ui():
     
     st.markdown("### 📚 Materiais de Língua Portuguesa")
     
-    # Verifica se a pasta existe
-    if not os.path.exists("./Língua Portuguesa"):
-        st.warning("⚠️ Pasta 'Língua Portuguesa' não encontrada. Crie a pasta e adicione seus materiais.")
-        return
-    
-    # Botão para processar documentos
-    if st.button("🔄 Processar Materiais", key="process_portuguese"):
-        with st.spinner("Processando materiais de português..."):
-            success = local_portuguese_rag.process_portuguese_documents()
-            if success:
-                st.success("✅ Materiais processados com sucesso!")
-            else:
-                st.error("❌ Erro ao processar materiais")
+    local_portuguese_rag = get_local_portuguese_rag_instance()
     
     # Estatísticas
     stats = local_portuguese_rag.get_stats()
-    col1, col2, col3 = st.columns(3)
+    col1, col2 = st.columns(2)
     
     with col1:
-        st.metric("Documentos", stats["total_documentos"])
+        st.metric("Trechos", stats["total_documents"])
     with col2:
-        st.metric("VectorStore", "✅" if stats["vectorstore_inicializado"] else "❌")
-    with col3:
-        st.metric("RAG Chain", "✅" if stats["rag_chain_configurada"] else "❌")
+        st.metric("VectorStore", "✅" if stats["status"] == "Carregado" else "❌")
+    
+    if stats["status"] != "Carregado":
+        st.info("ℹ️ Os materiais são baixados e carregados na primeira pergunta.")
 
-def get_professor_leticia_local_response(question: str, api_key: str) -> str:
-    """Gera resposta da Professora Letícia usando RAG local"""
+def get_professor_leticia_local_response(question: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Gera resposta da Professora Letícia usando RAG local.
+    Se `on_token` for informado, recebe o texto parcial (já formatado) conforme a resposta é gerada.
+    """
     
     if not PORTUGUESE_RAG_AVAILABLE:
         return "❌ Sistema RAG Local de Língua Portuguesa não está disponível. Verifique as dependências."
@@ -60,27 +61,26 @@ def get_professor_leticia_local_response(question: str, api_key: str) -> str:
         return "🔑 Por favor, configure sua chave da API Groq para continuar."
     
     try:
-        # Tenta carregar vectorstore existente
-        if not local_portuguese_rag.vectorstore:
-            if not local_portuguese_rag.load_existing_vectorstore():
-                # Se não existir, processa documentos
-                if not local_portuguese_rag.process_portuguese_documents():
-                    return "❌ Erro ao processar materiais de português. Verifique se a pasta 'Língua Portuguesa' existe e contém documentos."
+        local_portuguese_rag = get_local_portuguese_rag_instance()
         
-        # Configura RAG chain se necessário
-        if not local_portuguese_rag.rag_chain:
-            local_portuguese_rag.create_rag_chain(api_key)
+        # Baixa o índice e configura a cadeia RAG se necessário
+        if not local_portuguese_rag.is_initialized:
+            if not local_portuguese_rag.initialize(api_key):
+                return "❌ Erro ao carregar os materiais de português. Tente novamente em instantes."
         
         # Gera resposta
-        result = local_portuguese_rag.get_response(question)
+        if on_token is not None:
+            result = {}
+            renderer = StreamRenderer(on_token, format_portuguese_response if FORMATTER_AVAILABLE else None)
+            for token in local_portuguese_rag.stream_response(question, output=result):
+                renderer.feed(token)
+        else:
+            result = local_portuguese_rag.get_response(question)
         response = result["answer"]
         
         # Aplica formatação específica de português
-        try:
-            from portuguese_formatter import format_portuguese_response
+        if FORMATTER_AVAILABLE:
             response = format_portuguese_response(response)
-        except ImportError:
-            pass
         
         # Limpa memória após cada resposta
         local_portuguese_rag.clear_memory()
@@ -6,16 +6,26 @@ A.T.E.N.A. - Interface integrada com Streamlit
 
 import streamlit as st
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Callable
 import os
 
 # Importa sistema RAG de química
 try:
-    from local_chemistry_rag import local_chemistry_rag
+    from local_chemistry_rag import get_local_chemistry_rag_instance
     CHEMISTRY_RAG_AVAILABLE = True
 except ImportError:
     CHEMISTRY_RAG_AVAILABLE = False
 
+# Formatação específica de química
+try:
+    from chemistry_formatter import format_chemistry_response
+    CHEMISTRY_FORMATTER_AVAILABLE = True
+except ImportError:
+    CHEMISTRY_FORMATTER_AVAILABLE = False
+
+# Streaming de tokens até a interface
+from llm_streaming import StreamRenderer
+
 def setup_professor_luciana_local_ui():
     """Configura interface da Professora Luciana com RAG local"""
     
@@ -31,56 +41,36 @@ def setup_professor_luciana_local_ui():
         st.info("Verifique se as dependências estão instaladas: langchain, chromadb, sentence-transformers")
         return None
     
-    # Verifica se há documentos processados
-    if not local_chemistry_rag.documents:
-        st.warning("⚠️ Nenhum documento de química foi processado ainda.")
-        
-        # Botão para processar documentos
-        if st.button("📁 Processar Documentos de Química"):
-            with st.spinner("Processando documentos de química..."):
-                success = local_chemistry_rag.process_chemistry_documents()
-                if success:
-                    st.success("✅ Documentos de química processados com sucesso!")
-                    st.rerun()
-                else:
-                    st.error("❌ Erro ao processar documentos de química")
+    local_chemistry_rag = get_local_chemistry_rag_instance()
+    
+    # Verifica se a base de conhecimento já foi carregada
+    if not local_chemistry_rag.is_initialized:
+        st.warning("⚠️ A base de química ainda não foi carregada.")
+        st.info("Ela é baixada e carregada automaticamente na primeira pergunta.")
         return None
     
     # Mostra estatísticas da base de conhecimento
     stats = local_chemistry_rag.get_stats()
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2 = st.columns(2)
     
     with col1:
         st.metric(
-            label="📚 Documentos",
-            value=stats["total_documentos"]
+            label="📚 Trechos Indexados",
+            value=stats["total_documents"]
         )
     
     with col2:
-        st.metric(
-            label="🎯 Tópicos",
-            value=stats["topicos_unicos"]
-        )
-    
-    with col3:
         st.metric(
             label="💾 RAG Status",
-            value="✅ Ativo" if stats["vectorstore_inicializado"] else "❌ Inativo"
+            value="✅ Ativo" if stats["status"] == "Carregado" else "❌ Inativo"
         )
     
-    # Mostra lista de tópicos disponíveis
-    if stats["lista_topicos"]:
-        with st.expander("📋 Tópicos de Química Disponíveis"):
-            topics_per_row = 3
-            topic_chunks = [stats["lista_topicos"][i:i+topics_per_row] 
-                          for i in range(0, len(stats["lista_topicos"]), topics_per_row)]
-            
-            for chunk in topic_chunks:
-                cols = st.columns(topics_per_row)
-                for i, topic in enumerate(chunk):
-                    with cols[i]:
-                        st.info(f"⚗️ {topic}")
+    # Mostra amostra dos materiais disponíveis
+    if stats["sample_documents"]:
+        with st.expander("📋 Materiais de Química na Base"):
+            for doc_name in stats["sample_documents"]:
+                st.markdown(f"- `{doc_name}`")
     
     # Área de busca rápida
     with st.expander("🔍 Busca Rápida nos Materiais"):
@@ -96,7 +86,7 @@ def setup_professor_luciana_local_ui():
                     for i, doc in enumerate(docs, 1):
                         with st.container():
                             st.markdown(f"**📄 Resultado {i}:**")
-                            st.markdown(f"*Fonte: {doc.metadata.get('filename', 'N/A')}*")
+                            st.markdown(f"*Fonte: {doc.metadata.get('source', 'N/A')}*")
                             st.markdown(f"*Tópico: {doc.metadata.get('topic', 'N/A')}*")
                             
                             # Mostra trecho do conteúdo
@@ -111,8 +101,11 @@ def setup_professor_luciana_local_ui():
     
     return local_chemistry_rag
 
-def get_professor_luciana_local_response(user_message: str, api_key: str) -> str:
-    """Gera resposta da Professora Luciana usando RAG local"""
+def get_professor_luciana_local_response(user_message: str, api_key: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    Gera resposta da Professora Luciana usando RAG local.
+    Se `on_token` for informado, recebe o texto parcial (já formatado) conforme a resposta é gerada.
+    """
     
     if not CHEMISTRY_RAG_AVAILABLE:
         return "❌ Sistema RAG Local de Química não está disponível. Verifique as dependências."
@@ -121,38 +114,44 @@ def get_professor_luciana_local_response(user_message: str, api_key: str) -> str
         return "🔑 Por favor, configure sua chave da API Groq para continuar."
     
     try:
-        # Configura chain RAG se necessário
-        if not local_chemistry_rag.rag_chain:
+        local_chemistry_rag = get_local_chemistry_rag_instance()
+        
+        # Baixa o índice e configura a cadeia RAG se necessário
+        if not local_chemistry_rag.is_initialized:
             with st.spinner("Configurando sistema de IA..."):
-                local_chemistry_rag.create_rag_chain(api_key)
+                if not local_chemistry_rag.initialize(api_key):
+                    return "❌ Não foi possível carregar a base de química. Tente novamente em instantes."
         
         # Gera resposta
-        with st.spinner("⚗️ Professora Luciana analisando sua pergunta..."):
-            result = local_chemistry_rag.get_response(user_message)
-            
-            response = result.get("answer", "Desculpe, não consegui gerar uma resposta.")
-            
-            # Aplica formatação específica de química
-            try:
-                from chemistry_formatter import format_chemistry_response
-                response = format_chemistry_response(response)
-            except ImportError:
-                pass
-            
-            # Adiciona informação sobre fontes se disponível
-            source_docs = result.get("source_documents", [])
-            if source_docs:
-                sources = set()
-                for doc in source_docs:
-                    filename = doc.metadata.get("filename", "N/A")
-                    topic = doc.metadata.get("topic", "N/A")
-                    sources.add(f"{topic} ({filename})")
-                
-                if sources:
-                    sources_text = "\n".join([f"- {source}" for source in sorted(sources)])
-                    response += f"\n\n**📚 Fontes consultadas:**\n{sources_text}"
+        if on_token is not None:
+            result = {}
+            renderer = StreamRenderer(on_token, format_chemistry_response if CHEMISTRY_FORMATTER_AVAILABLE else None)
+            for token in local_chemistry_rag.stream_response(user_message, output=result):
+                renderer.feed(token)
+        else:
+            with st.spinner("⚗️ Professora Luciana analisando sua pergunta..."):
+                result = local_chemistry_rag.get_response(user_message)
+        
+        response = result.get("answer", "Desculpe, não consegui gerar uma resposta.")
+        
+        # Aplica formatação específica de química
+        if CHEMISTRY_FORMATTER_AVAILABLE:
+            response = format_chemistry_response(response)
+        
+        # Adiciona informação sobre fontes se disponível
+        source_docs = result.get("source_documents", [])
+        if source_docs:
+            sources = set()
+            for doc in source_docs:
+                filename = doc.metadata.get("source", "N/A")
+                topic = doc.metadata.get("topic", "N/A")
+                sources.add(f"{topic} ({filename})")
             
-            return response
+            if sources:
+                sources_text = "\n".join([f"- {source}" for source in sorted(sources)])
+                response += f"\n\n**📚 Fontes consultadas:**\n{sources_text}"
+        
+        return response
             
     except Exception as e:
         error_msg = f"Erro no sistema RAG de Química: {str(e)}"
@@ -161,5 +160,5 @@ def get_professor_luciana_local_response(user_message: str, api_key: str) -> str
 
 def clear_chemistry_conversation():
     """Limpa histórico da conversa de química"""
-    if CHEMISTRY_RAG_AVAILABLE and local_chemistry_rag.memory:
-        local_chemistry_rag.clear_memory()
+    if CHEMISTRY_RAG_AVAILABLE:
+        get_local_chemistry_rag_instance().clear_memory()
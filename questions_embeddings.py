@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Índice denso (embeddings) das questões do ENEM para A.T.E.N.A.
+
+Uso offline, para gerar o arquivo ao lado dos JSON:
+    python questions_embeddings.py [--dtype int8|float16]
+
+Em tempo de execução, o arquivo é carregado uma vez e cada busca é um
+produto matriz-vetor com top-k, com filtro opcional por matéria através
+de máscaras pré-calculadas (sem reler os JSON).
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Arquivo gerado ao lado de questions_primeiro_dia.json / questions_segundo_enem.json
+QUESTIONS_EMBEDDINGS_FILE = "questions_embeddings.npz"
+QUESTIONS_FILES = ["questions_primeiro_dia.json", "questions_segundo_enem.json"]
+
+# Mesmo modelo multilíngue dos índices FAISS dos professores
+QUESTIONS_EMBEDDINGS_MODEL = "sentence-transformers/distiluse-base-multilingual-cased-v1"
+
+# Tamanho máximo do conteúdo usado no texto de cada questão
+MAX_CONTEUDO_CHARS = 1000
+
+
+def question_text(question_data: Dict[str, str]) -> str:
+    """Texto embutido para cada questão: tema + conteúdo."""
+    tema = question_data.get("tema", "") or ""
+    conteudo = (question_data.get("conteudo", "") or "")[:MAX_CONTEUDO_CHARS]
+    return f"{tema}. {conteudo}".strip()
+
+
+def _quantize(matrix: np.ndarray, dtype: str):
+    """Compacta a matriz normalizada: int8 com escala por linha, ou float16."""
+    if dtype == "float16":
+        return matrix.astype(np.float16), np.ones(matrix.shape[0], dtype=np.float32)
+    if dtype == "int8":
+        scales = np.abs(matrix).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(matrix / scales[:, None]).astype(np.int8)
+        return quantized, scales.astype(np.float32)
+    raise ValueError(f"Tipo não suportado: {dtype}")
+
+
+def build_questions_embeddings(
+    questions: Dict[str, Dict[str, str]],
+    embeddings,
+    subject_mapping: Dict[str, List[str]],
+    output_path: str = QUESTIONS_EMBEDDINGS_FILE,
+    dtype: str = "int8",
+    batch_size: int = 64,
+) -> str:
+    """
+    Gera os embeddings de todas as questões e salva a matriz compacta,
+    os ids e as máscaras de disciplina por matéria em um .npz.
+    """
+    ids = list(questions.keys())
+    texts = [question_text(questions[qid]) for qid in ids]
+
+    vectors = []
+    for start in range(0, len(texts), batch_size):
+        vectors.extend(embeddings.embed_documents(texts[start:start + batch_size]))
+        print(f"  - {min(start + batch_size, len(texts))}/{len(texts)} questões")
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = matrix / norms
+
+    quantized, scales = _quantize(matrix, dtype)
+
+    # Máscaras de disciplina (mesma regra de substring das recomendações por palavra-chave)
+    subjects = list(subject_mapping.keys())
+    disciplinas = [questions[qid].get("disciplina", "").lower() for qid in ids]
+    masks = np.array([
+        [any(mapped in disciplina for mapped in subject_mapping[subject]) for disciplina in disciplinas]
+        for subject in subjects
+    ], dtype=bool)
+
+    np.savez_compressed(
+        output_path,
+        ids=np.array(ids),
+        vectors=quantized,
+        scales=scales,
+        subjects=np.array(subjects),
+        masks=masks,
+        model_name=np.array(QUESTIONS_EMBEDDINGS_MODEL),
+    )
+    return output_path
+
+
+class QuestionsEmbeddingIndex:
+    """Índice denso das questões carregado do .npz gerado offline."""
+
+    def __init__(self, path: str = QUESTIONS_EMBEDDINGS_FILE):
+        with np.load(path) as data:
+            self.ids: List[str] = [str(qid) for qid in data["ids"]]
+            # Desquantiza uma vez: a busca roda em float32 sobre a matriz contígua
+            self.matrix = np.ascontiguousarray(
+                data["vectors"].astype(np.float32) * data["scales"][:, None]
+            )
+            self.masks: Dict[str, np.ndarray] = {
+                str(subject): mask for subject, mask in zip(data["subjects"], data["masks"])
+            }
+            self.model_name = str(data["model_name"])
+
+    def search(self, query_vector, k: int = 5, subject: Optional[str] = None) -> List[Tuple[str, float]]:
+        """Top-k por similaridade de cosseno, opcionalmente restrito à matéria."""
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        scores = self.matrix @ query
+        mask = self.masks.get(subject) if subject else None
+        if mask is not None and mask.any():
+            scores = np.where(mask, scores, -np.inf)
+
+        k = min(k, len(self.ids))
+        if k <= 0:
+            return []
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best])]
+        return [(self.ids[i], float(scores[i])) for i in best if np.isfinite(scores[i])]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o índice denso das questões do ENEM.")
+    parser.add_argument("--dtype", choices=["int8", "float16"], default="int8")
+    parser.add_argument("--output", default=QUESTIONS_EMBEDDINGS_FILE)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    from embeddings_registry import acquire_embeddings
+    from exercicios_personalizados import SUBJECT_MAPPING
+
+    questions = {}
+    for path in QUESTIONS_FILES:
+        with open(path, "r", encoding="utf-8") as f:
+            questions.update(json.load(f))
+    print(f"📚 {len(questions)} questões carregadas")
+
+    embeddings = acquire_embeddings(
+        model_name=QUESTIONS_EMBEDDINGS_MODEL,
+        model_kwargs={'device': 'cpu'},
+        encode_kwargs={'normalize_embeddings': True}
+    )
+
+    start_time = time.time()
+    output = build_questions_embeddings(
+        questions, embeddings, SUBJECT_MAPPING,
+        output_path=args.output, dtype=args.dtype, batch_size=args.batch_size
+    )
+    size_kb = os.path.getsize(output) / 1024
+    print(f"✅ Índice salvo em '{output}' ({size_kb:.0f} KB) em {time.time() - start_time:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Pipeline RAG com uma única chamada ao LLM por pergunta para A.T.E.N.A.
+Substitui o ConversationalRetrievalChain dos professores: em vez de uma chamada
+extra ao LLM para reformular a pergunta quando há histórico, a busca usa a
+pergunta original (ou a pergunta anterior da aluna concatenada, uma reescrita
+local e sem custo) e só a resposta final passa pelo LLM, com o mesmo prompt
+de cada matéria. Aceita as mesmas entradas e saídas da cadeia antiga
+(question -> answer, source_documents), a mesma memória e os mesmos
+callbacks de streaming.
+"""
+
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from langchain.chains.base import Chain
+from langchain.schema import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForChainRun
+from langchain_core.language_models import BaseLanguageModel
+
+from context_packer import get_context_budget, pack_documents
+from conversation_memory import format_chat_history
+
+# Como a busca trata perguntas de continuação:
+#   concat  pergunta anterior da aluna + pergunta atual (padrão)
+#   raw     só a pergunta atual
+RAG_QUERY_REWRITE = os.getenv("RAG_QUERY_REWRITE", "concat")
+
+# Prompt usado até a matéria definir o seu (mesmas variáveis do prompt dos professores)
+DEFAULT_PROMPT_TEMPLATE = """Use o contexto abaixo para responder à pergunta.
+
+CONTEXTO:
+{context}
+
+PERGUNTA: {question}
+
+RESPOSTA:"""
+
+# Só estas variáveis são substituídas: as demais chaves do prompt (exemplos de
+# LaTeX como \frac{a}{b} ou C_6H_{12}O_6) ficam como estão
+_PROMPT_VARIABLES = re.compile(r"\{(context|question)\}")
+
+
+def last_user_turn(chat_history: Any) -> str:
+    """Texto da última pergunta da aluna no histórico (mensagens ou string)."""
+    if not chat_history or isinstance(chat_history, str):
+        return ""
+    for message in reversed(chat_history):
+        if getattr(message, "type", "") == "human":
+            return str(message.content or "")
+        if isinstance(message, tuple) and message:
+            return str(message[0])
+    return ""
+
+
+def rewrite_query(question: str, chat_history: Any, mode: str = RAG_QUERY_REWRITE) -> str:
+    """Consulta de busca: a pergunta atual, opcionalmente precedida da anterior."""
+    previous = last_user_turn(chat_history) if mode == "concat" else ""
+    if previous and previous.strip() != question.strip():
+        return f"{previous}\n{question}"
+    return question
+
+
+def question_with_context(question: str, chat_history: Any) -> str:
+    """Pergunta enviada ao prompt: numa continuação, vem junto da conversa mantida pela memória."""
+    history = format_chat_history(chat_history)
+    if history:
+        question = f"{question}\n\n(Conversa até aqui, para contexto:\n{history})"
+    return question
+
+
+class SingleCallRAGPipeline(Chain):
+    """Busca + uma geração: question -> answer, source_documents."""
+
+    llm: BaseLanguageModel
+    retriever: BaseRetriever
+    prompt_template: str = DEFAULT_PROMPT_TEMPLATE
+    query_rewrite: str = RAG_QUERY_REWRITE
+    return_source_documents: bool = True
+    output_key: str = "answer"
+    # Tokens de contexto no prompt; None usa o orçamento do modelo (context_packer)
+    context_max_tokens: Optional[int] = None
+
+    @classmethod
+    def from_llm(
+        cls,
+        llm: BaseLanguageModel,
+        retriever: BaseRetriever,
+        memory=None,
+        prompt_template: str = DEFAULT_PROMPT_TEMPLATE,
+        **kwargs: Any,
+    ) -> "SingleCallRAGPipeline":
+        return cls(
+            llm=llm,
+            retriever=retriever,
+            memory=memory,
+            prompt_template=prompt_template,
+            **kwargs,
+        )
+
+    def set_prompt_template(self, prompt_template: str):
+        """Troca o prompt da matéria (precisa de {context} e {question})."""
+        self.prompt_template = prompt_template
+
+    def format_prompt(self, context: str, question: str) -> str:
+        values = {"context": context, "question": question}
+        return _PROMPT_VARIABLES.sub(lambda match: values[match.group(1)], self.prompt_template)
+
+    @property
+    def input_keys(self) -> List[str]:
+        return ["question"]
+
+    @property
+    def output_keys(self) -> List[str]:
+        keys = [self.output_key]
+        if self.return_source_documents:
+            keys.append("source_documents")
+        return keys
+
+    @property
+    def _chain_type(self) -> str:
+        return "single_call_rag"
+
+    def _call(
+        self,
+        inputs: Dict[str, Any],
+        run_manager: Optional[CallbackManagerForChainRun] = None,
+    ) -> Dict[str, Any]:
+        run_manager = run_manager or CallbackManagerForChainRun.get_noop_manager()
+        question = inputs["question"]
+        chat_history = inputs.get("chat_history")
+
+        query = rewrite_query(question, chat_history, self.query_rewrite)
+        documents = self.retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+
+        # Sem trechos repetidos nem sobreposições, dentro do orçamento de tokens do modelo
+        max_tokens = self.context_max_tokens
+        if max_tokens is None:
+            max_tokens = get_context_budget(getattr(self.llm, "model_name", ""))
+        packed = pack_documents(documents, max_tokens)
+        print(f"📦 Contexto: {packed.raw_tokens} -> {packed.packed_tokens} tokens "
+              f"({len(documents)} -> {len(packed.documents)} trechos)")
+
+        prompt_text = self.format_prompt(
+            context=packed.text,
+            question=question_with_context(question, chat_history),
+        )
+        answer = self.llm.invoke(prompt_text, config={"callbacks": run_manager.get_child()})
+        if hasattr(answer, "content"):
+            answer = answer.content
+
+        output: Dict[str, Any] = {self.output_key: answer}
+        if self.return_source_documents:
+            output["source_documents"] = packed.documents
+        return output
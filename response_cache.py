@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Cache semântico de respostas dos professores para A.T.E.N.A.
+Perguntas parecidas (mesma matéria, embeddings com similaridade de cosseno
+acima do limiar) reutilizam a resposta já gerada, sem rodar a cadeia RAG
+nem chamar a Groq de novo. Os dados ficam em SQLite e sobrevivem a reinícios.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+from langchain.schema import Document
+
+# Arquivo SQLite do cache
+RESPONSE_CACHE_DB = os.getenv("RESPONSE_CACHE_DB", "cache_respostas.sqlite3")
+
+# Similaridade de cosseno mínima para considerar duas perguntas iguais
+SIMILARITY_THRESHOLD = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.92"))
+
+# Validade de uma resposta em cache (padrão: 7 dias)
+TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL", str(7 * 24 * 3600)))
+
+# Máximo de respostas guardadas; acima disso saem as menos usadas recentemente
+MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+
+# Respostas com estes trechos são erros e não devem ser reaproveitadas
+_ERROR_MARKERS = ("Erro na API", "Erro ao processar a pergunta", "não foi inicializado")
+
+
+class ResponseCache:
+    """Cache semântico de respostas com TTL, despejo LRU e métricas de acerto."""
+
+    def __init__(
+        self,
+        db_path: str = RESPONSE_CACHE_DB,
+        similarity_threshold: float = SIMILARITY_THRESHOLD,
+        ttl_seconds: int = TTL_SECONDS,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS respostas (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                subject TEXT NOT NULL,
+                question TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                answer TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                hits INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_subject ON respostas(subject)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_respostas_access ON respostas(last_access)")
+        self._conn.commit()
+
+        # Matriz de embeddings por matéria mantida em memória (ids, matriz normalizada)
+        self._matrices: Dict[str, Any] = {}
+
+        self._hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._evictions = 0
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _load_matrix(self, subject: str):
+        """Carrega (ou reaproveita) a matriz de embeddings válidos da matéria."""
+        cached = self._matrices.get(subject)
+        if cached is not None:
+            return cached
+
+        rows = self._conn.execute(
+            "SELECT id, embedding FROM respostas WHERE subject = ? AND created_at >= ?",
+            (subject, time.time() - self.ttl_seconds),
+        ).fetchall()
+        if rows:
+            ids = [row[0] for row in rows]
+            matrix = np.vstack([np.frombuffer(row[1], dtype=np.float32) for row in rows])
+        else:
+            ids, matrix = [], None
+        self._matrices[subject] = (ids, matrix)
+        return ids, matrix
+
+    def lookup(self, subject: str, embedding) -> Optional[Dict[str, Any]]:
+        """Procura uma resposta para uma pergunta semelhante da mesma matéria."""
+        query = self._normalize(embedding)
+
+        with self._lock:
+            ids, matrix = self._load_matrix(subject)
+            if matrix is None or matrix.shape[1] != query.shape[0]:
+                self._misses += 1
+                return None
+
+            scores = matrix @ query
+            best = int(np.argmax(scores))
+            if float(scores[best]) < self.similarity_threshold:
+                self._misses += 1
+                return None
+
+            row_id = ids[best]
+            row = self._conn.execute(
+                "SELECT question, answer, sources, created_at FROM respostas WHERE id = ?",
+                (row_id,),
+            ).fetchone()
+            if row is None or row[3] < time.time() - self.ttl_seconds:
+                # Entrada expirada: remove e trata como miss
+                self._delete_ids([row_id])
+                self._misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE respostas SET hits = hits + 1, last_access = ? WHERE id = ?",
+                (time.time(), row_id),
+            )
+            self._conn.commit()
+            self._hits += 1
+
+        return {
+            "question": row[0],
+            "answer": row[1],
+            "sources": json.loads(row[2]),
+            "similarity": float(scores[best]),
+        }
+
+    def store(self, subject: str, question: str, embedding, answer: str, sources: Optional[List[Dict[str, Any]]] = None):
+        """Guarda uma resposta nova e aplica TTL e limite de entradas."""
+        if not answer or any(marker in answer for marker in _ERROR_MARKERS):
+            return
+
+        vector = self._normalize(embedding)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO respostas (subject, question, embedding, answer, sources, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (subject, question, vector.tobytes(), answer, json.dumps(sources or [], default=str), now, now),
+            )
+            self._stores += 1
+            self._matrices.pop(subject, None)
+            self._evict(now)
+            self._conn.commit()
+
+    def _delete_ids(self, ids: List[int]):
+        if not ids:
+            return
+        self._conn.executemany("DELETE FROM respostas WHERE id = ?", [(i,) for i in ids])
+        self._conn.commit()
+        self._evictions += len(ids)
+        self._matrices.clear()
+
+    def _evict(self, now: float):
+        """Remove entradas expiradas e, se necessário, as menos acessadas recentemente."""
+        expired = [row[0] for row in self._conn.execute(
+            "SELECT id FROM respostas WHERE created_at < ?", (now - self.ttl_seconds,)
+        )]
+        self._delete_ids(expired)
+
+        total = self._conn.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        if total > self.max_entries:
+            oldest = [row[0] for row in self._conn.execute(
+                "SELECT id FROM respostas ORDER BY last_access ASC LIMIT ?", (total - self.max_entries,)
+            )]
+            self._delete_ids(oldest)
+
+    def clear(self, subject: Optional[str] = None):
+        """Apaga o cache inteiro ou só o de uma matéria."""
+        with self._lock:
+            if subject is None:
+                self._conn.execute("DELETE FROM respostas")
+            else:
+                self._conn.execute("DELETE FROM respostas WHERE subject = ?", (subject,))
+            self._conn.commit()
+            self._matrices.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retorna métricas de uso do cache (taxa de acerto, tamanho, despejos)."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            per_subject = dict(self._conn.execute(
+                "SELECT subject, COUNT(*) FROM respostas GROUP BY subject"
+            ).fetchall())
+            return {
+                "acertos": self._hits,
+                "falhas": self._misses,
+                "taxa_acerto": round(self._hits / lookups, 3) if lookups else 0.0,
+                "respostas_guardadas": self._stores,
+                "despejos": self._evictions,
+                "entradas_por_materia": per_subject,
+                "limiar_similaridade": self.similarity_threshold,
+            }
+
+
+_cache_instance = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Retorna a instância única (singleton) do cache de respostas."""
+    global _cache_instance
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                _cache_instance = ResponseCache()
+    return _cache_instance
+
+
+def _sources_from_documents(documents: List[Document]) -> List[Dict[str, Any]]:
+    return [dict(doc.metadata or {}) for doc in (documents or [])]
+
+
+def _documents_from_sources(sources: List[Dict[str, Any]]) -> List[Document]:
+    return [Document(page_content="", metadata=meta) for meta in sources]
+
+
+def _has_history(memory) -> bool:
+    try:
+        return bool(memory.chat_memory.messages)
+    except Exception:
+        return False
+
+
+def _lookup_cached(subject: str, question: str, embeddings, memory):
+    """Retorna (embedding da pergunta, resultado em cache ou None)."""
+    embedding = embeddings.embed_query(question)
+    cached = get_response_cache().lookup(subject, embedding)
+    if cached is None:
+        return embedding, None
+
+    print(f"⚡ Resposta em cache ({subject}, similaridade {cached['similarity']:.3f})")
+    if memory is not None:
+        memory.save_context({"question": question}, {"answer": cached["answer"]})
+    return embedding, {
+        "question": question,
+        "answer": cached["answer"],
+        "source_documents": _documents_from_sources(cached["sources"]),
+        "from_cache": True,
+    }
+
+
+def _store_result(subject: str, question: str, embedding, result: Dict[str, Any]):
+    try:
+        get_response_cache().store(
+            subject,
+            question,
+            embedding,
+            result.get("answer", ""),
+            _sources_from_documents(result.get("source_documents", [])),
+        )
+    except Exception as e:
+        print(f"⚠️ Falha ao gravar no cache de respostas: {e}")
+
+
+def cached_rag_response(
+    subject: str,
+    question: str,
+    embeddings,
+    memory,
+    compute: Callable[[], Dict[str, Any]],
+) -> Dict[str, Any]:
+    """
+    Coloca o cache semântico na frente de `compute` (a chamada da cadeia RAG).
+    Só perguntas sem histórico usam o cache, já que perguntas de continuação
+    dependem da conversa anterior. Num acerto, a troca é gravada na memória
+    para que as próximas perguntas tenham o contexto.
+    """
+    if embeddings is None or _has_history(memory):
+        return compute()
+
+    try:
+        embedding, cached = _lookup_cached(subject, question, embeddings, memory)
+    except Exception as e:
+        print(f"⚠️ Cache de respostas indisponível: {e}")
+        return compute()
+
+    if cached is not None:
+        return cached
+
+    result = compute()
+    _store_result(subject, question, embedding, result)
+    return result
+
+
+def cached_rag_stream(
+    subject: str,
+    question: str,
+    embeddings,
+    memory,
+    stream: Callable[[Dict[str, Any]], Iterator[str]],
+    output: Optional[Dict[str, Any]] = None,
+) -> Iterator[str]:
+    """
+    Versão de `cached_rag_response` para streaming: num acerto, a resposta
+    inteira sai de uma vez; numa falha, os tokens de `stream(output)` são
+    repassados e o resultado final é gravado no cache.
+    """
+    output = output if output is not None else {}
+
+    if embeddings is None or _has_history(memory):
+        yield from stream(output)
+        return
+
+    try:
+        embedding, cached = _lookup_cached(subject, question, embeddings, memory)
+    except Exception as e:
+        print(f"⚠️ Cache de respostas indisponível: {e}")
+        yield from stream(output)
+        return
+
+    if cached is not None:
+        output.update(cached)
+        yield cached["answer"]
+        return
+
+    yield from stream(output)
+    _store_result(subject, question, embedding, output)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Teste do downloader de índices FAISS (index_downloader.py)
+Usa um servidor HTTP local com suporte a Range no lugar do Hugging Face.
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from index_downloader import download_file, download_files, files_ready, is_file_valid
+
+FILES = {
+    "index_teste.faiss": os.urandom(3 * 1024 * 1024 + 123),
+    "index_teste.pkl": os.urandom(700 * 1024),
+}
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """Servidor com Range; pode cortar a primeira resposta de cada arquivo no meio."""
+
+    cut_first_response = False
+    ignore_range = False
+    served_bytes = 0
+    already_cut = set()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        name = self.path.lstrip("/")
+        data = FILES.get(name)
+        if data is None:
+            self.send_error(404)
+            return
+
+        start = 0
+        range_header = self.headers.get("Range")
+        if range_header and not self.ignore_range:
+            start = int(range_header.split("=")[1].split("-")[0])
+            if start >= len(data):
+                self.send_response(416)
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        if self.cut_first_response and name not in self.already_cut:
+            # Simula uma conexão derrubada na metade do arquivo
+            self.already_cut.add(name)
+            body = body[: len(body) // 2]
+            self.wfile.write(body)
+            RangeHandler.served_bytes += len(body)
+            self.close_connection = True
+            return
+
+        self.wfile.write(body)
+        RangeHandler.served_bytes += len(body)
+
+
+def start_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), RangeHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def reset_handler(**options):
+    RangeHandler.cut_first_response = options.get("cut_first_response", False)
+    RangeHandler.ignore_range = options.get("ignore_range", False)
+    RangeHandler.served_bytes = 0
+    RangeHandler.already_cut = set()
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_parallel_download(base_url: str):
+    """Baixa os dois arquivos em paralelo e confere conteúdo e hash."""
+    reset_handler()
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [(f"{base_url}/{name}", os.path.join(tmp, name)) for name in FILES]
+        manifest = {name: {"sha256": sha256(data)} for name, data in FILES.items()}
+
+        assert not files_ready(files, manifest)
+        results = download_files(files, manifest)
+        assert all(results.values()), results
+        for name, data in FILES.items():
+            with open(os.path.join(tmp, name), "rb") as f:
+                assert f.read() == data
+            assert not os.path.exists(os.path.join(tmp, name + ".part"))
+        assert files_ready(files, manifest)
+    print("✅ Download paralelo com verificação de SHA-256")
+
+
+def test_resume_with_range(base_url: str):
+    """Um .part existente é continuado com Range, sem baixar tudo de novo."""
+    reset_handler()
+    name = "index_teste.faiss"
+    data = FILES[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        local_path = os.path.join(tmp, name)
+        with open(local_path + ".part", "wb") as f:
+            f.write(data[:1024 * 1024])
+
+        assert download_file(f"{base_url}/{name}", local_path, sha256(data))
+        assert RangeHandler.served_bytes == len(data) - 1024 * 1024
+        with open(local_path, "rb") as f:
+            assert f.read() == data
+    print("✅ Retomada com HTTP Range")
+
+
+def test_connection_dropped(base_url: str):
+    """Conexão cortada na metade: o download é retomado e o arquivo final fica íntegro."""
+    reset_handler(cut_first_response=True)
+    name = "index_teste.pkl"
+    data = FILES[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        local_path = os.path.join(tmp, name)
+        assert download_file(f"{base_url}/{name}", local_path, sha256(data))
+        with open(local_path, "rb") as f:
+            assert f.read() == data
+        # A segunda requisição continua de onde parou (no máximo um bloco é perdido)
+        assert RangeHandler.served_bytes < len(data) * 1.5
+    print("✅ Conexão interrompida retomada sem arquivo truncado")
+
+
+def test_server_without_range(base_url: str):
+    """Servidor que ignora Range: o .part é descartado e o arquivo é baixado inteiro."""
+    reset_handler(ignore_range=True)
+    name = "index_teste.pkl"
+    data = FILES[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        local_path = os.path.join(tmp, name)
+        with open(local_path + ".part", "wb") as f:
+            f.write(b"lixo de um download antigo")
+        assert download_file(f"{base_url}/{name}", local_path, sha256(data))
+        with open(local_path, "rb") as f:
+            assert f.read() == data
+    print("✅ Servidor sem suporte a Range")
+
+
+def test_hash_mismatch(base_url: str):
+    """Hash diferente do manifesto: nada é liberado para o FAISS."""
+    reset_handler()
+    name = "index_teste.pkl"
+    with tempfile.TemporaryDirectory() as tmp:
+        local_path = os.path.join(tmp, name)
+        assert not download_file(f"{base_url}/{name}", local_path, "0" * 64, max_retries=1)
+        assert not os.path.exists(local_path)
+        assert not os.path.exists(local_path + ".part")
+    print("✅ SHA-256 divergente rejeitado")
+
+
+def test_truncated_local_file(base_url: str):
+    """Arquivo local truncado (hash registrado não confere) é baixado de novo."""
+    reset_handler()
+    name = "index_teste.faiss"
+    data = FILES[name]
+    with tempfile.TemporaryDirectory() as tmp:
+        files = [(f"{base_url}/{name}", os.path.join(tmp, name))]
+        assert download_files(files, manifest={})[files[0][1]]
+
+        with open(files[0][1], "r+b") as f:
+            f.truncate(1000)
+        assert not is_file_valid(files[0][1])
+
+        assert download_files(files, manifest={})[files[0][1]]
+        with open(files[0][1], "rb") as f:
+            assert f.read() == data
+    print("✅ Arquivo local truncado detectado e substituído")
+
+
+if __name__ == "__main__":
+    server, base_url = start_server()
+    try:
+        test_parallel_download(base_url)
+        test_resume_with_range(base_url)
+        test_connection_dropped(base_url)
+        test_server_without_range(base_url)
+        test_hash_mismatch(base_url)
+        test_truncated_local_file(base_url)
+        print("\n🎉 Todos os testes do downloader passaram!")
+    finally:
+        server.shutdown()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Teste da detecção de tópicos do mapa mental (extrair_topico_especifico)
+O corpus teste_topicos_mapa_mental.json tem perguntas sorteadas de
+questions_primeiro_dia.json / questions_segundo_enem.json (tema e tema +
+enunciado) e o tópico escolhido pela antiga cascata de if/elif; a tabela
+REGRAS_TOPICOS precisa escolher exatamente o mesmo tópico.
+"""
+
+import json
+import os
+import time
+
+from mapa_mental_markmap import REGRAS_TOPICOS, extrair_topico_especifico
+
+CORPUS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "teste_topicos_mapa_mental.json")
+
+
+def carregar_corpus():
+    with open(CORPUS_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_mesmo_topico_do_corpus():
+    """Cada pergunta do corpus recebe o mesmo tópico de antes"""
+    divergencias = []
+    for caso in carregar_corpus():
+        topico = extrair_topico_especifico(caso["pergunta"], caso["materia"])
+        if topico != caso["topico"]:
+            divergencias.append((caso["id"], caso["materia"], caso["topico"], topico))
+
+    for id_questao, materia, esperado, obtido in divergencias[:10]:
+        print(f"❌ {id_questao} ({materia}): esperado '{esperado}', obtido '{obtido}'")
+    assert not divergencias, f"{len(divergencias)} perguntas mudaram de tópico"
+
+
+def test_prioridade_das_regras():
+    """Vale o primeiro tópico da tabela, mesmo que outro também case"""
+    # 'linear' está em 'Equações do 1º Grau' e em 'Sistemas de Equações'
+    assert extrair_topico_especifico("sistema linear", "Matemática") == "Equações do 1º Grau"
+    # 'mol' casa dentro de 'molaridade' (teste de substring, como antes)
+    assert extrair_topico_especifico("molaridade da solução", "Química") == "Quantidade de Matéria"
+    assert extrair_topico_especifico("O que é eletrólise?", "Química") == "Eletroquímica"
+
+
+def test_fallback():
+    """Sem palavra-chave: palavras da pergunta ou a própria matéria"""
+    assert extrair_topico_especifico("Explique cubismo", "Artes") == "Explique Cubismo"
+    assert extrair_topico_especifico("oi", "Matemática") == "Matemática"
+    assert "Redação" in REGRAS_TOPICOS
+
+
+def main():
+    casos = carregar_corpus()
+    print(f"📚 {len(casos)} perguntas no corpus")
+
+    test_mesmo_topico_do_corpus()
+    print("✅ Mesmo tópico para todas as perguntas do corpus")
+    test_prioridade_das_regras()
+    print("✅ Prioridade das regras preservada")
+    test_fallback()
+    print("✅ Fallback preservado")
+
+    inicio = time.perf_counter()
+    for caso in casos:
+        extrair_topico_especifico(caso["pergunta"], caso["materia"])
+    decorrido = time.perf_counter() - inicio
+    print(f"⏱️ {decorrido * 1000 / len(casos):.3f} ms por pergunta")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Contagem de tokens para A.T.E.N.A.
+Usa o tiktoken (codificação cl100k_base) quando disponível; sem ele, estima
+um token a cada 4 caracteres, o suficiente para orçamentos de prompt.
+"""
+
+from functools import lru_cache
+from typing import Iterable
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Codificação usada para contar tokens (próxima da dos modelos servidos pela Groq)
+ENCODING_NAME = "cl100k_base"
+
+# Caracteres por token na estimativa sem tiktoken
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding(ENCODING_NAME)
+    except Exception as e:
+        # Sem rede para baixar a codificação: segue com a estimativa
+        print(f"⚠️ tiktoken indisponível ({e}); usando estimativa de tokens")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Número de tokens de um texto."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens_many(texts: Iterable[str]) -> int:
+    return sum(count_tokens(text) for text in texts)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Corta o texto para caber em `max_tokens` (mantém o começo)."""
+    if max_tokens <= 0 or not text:
+        return ""
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
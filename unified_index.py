@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+Índice vetorial unificado de A.T.E.N.A.
+Junta os índices de todas as matérias (e os de analogias e casos de sucesso
+de redação) em um único índice FAISS. Cada trecho carrega os metadados
+`subject` e `kind`, e os vetores de cada (matéria, tipo) ocupam faixas
+contíguas de ids. A busca por matéria é uma busca filtrada com
+IDSelectorRange (ou um bitmap pré-calculado quando há mais de uma faixa).
+
+Migração a partir dos índices existentes:
+    python unified_index.py [--output faiss_index_unificado]
+
+Ativação nos professores (opcional):
+    UNIFIED_INDEX=1
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import pickle
+import threading
+from collections.abc import Mapping
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from langchain_core.documents import Document
+    from langchain_core.vectorstores import VectorStore
+except ImportError:
+    from langchain.schema import Document
+    from langchain.vectorstores.base import VectorStore
+
+try:
+    from langchain_community.docstore.base import Docstore
+except ImportError:
+    from langchain.docstore.base import Docstore
+
+from mmap_docstore import MmapDocstore, export_docstore, has_mmap_docstore
+from vectorstore_loader import load_faiss_vectorstore, read_faiss_index
+
+# "1" faz os professores usarem o índice unificado quando ele contém a matéria
+USE_UNIFIED_INDEX = os.getenv("UNIFIED_INDEX", "0") == "1"
+UNIFIED_INDEX_DIR = os.getenv("UNIFIED_INDEX_DIR", "faiss_index_unificado")
+UNIFIED_INDEX_NAME = "index"
+
+# Tipos de trecho no índice unificado
+KIND_CONTEUDO = "conteudo"
+KIND_ANALOGIA = "analogia"
+KIND_CASO_SUCESSO = "caso_sucesso"
+
+# Origem de cada (matéria, tipo): a primeira fonte disponível é migrada.
+# Fontes FAISS são (pasta, nome do índice); fontes Chroma são a pasta persistida.
+UNIFIED_SOURCES: List[Tuple[str, str, List[Tuple[str, str, Optional[str]]]]] = [
+    ("Matemática", KIND_CONTEUDO, [
+        ("faiss", "faiss_index_math", "index"),
+        ("chroma", "chroma_math_vectorstore", None),
+    ]),
+    ("Física", KIND_CONTEUDO, [
+        ("faiss", "faiss_index_physics", "index"),
+        ("faiss", "faiss_index_physics", "index_physics"),
+        ("chroma", "vectorstores/física", None),
+    ]),
+    ("Química", KIND_CONTEUDO, [
+        ("faiss", "faiss_index_chemistry", "index"),
+        ("faiss", "faiss_index_chemistry", "index_chemistry"),
+    ]),
+    ("Biologia", KIND_CONTEUDO, [("faiss", "faiss_index_biology", "index")]),
+    ("Geografia", KIND_CONTEUDO, [
+        ("faiss", "faiss_index_geography", "index"),
+        ("chroma", "vectorstores/geografia", None),
+    ]),
+    ("História", KIND_CONTEUDO, [("faiss", "faiss_index_history", "index")]),
+    ("Língua Portuguesa", KIND_CONTEUDO, [("faiss", "faiss_index_portuguese", "index")]),
+    ("Redação", KIND_CONTEUDO, [("faiss", "faiss_index_redacao", "index")]),
+    ("Redação", KIND_CASO_SUCESSO, [
+        ("faiss", "faiss_index_success_redacao", "index"),
+        ("faiss", "faiss_index_cases_sucesso_redacao", "index_success_red"),
+    ]),
+    ("Analogias", KIND_ANALOGIA, [
+        ("faiss", "faiss_index_analogias", "index"),
+        ("faiss", "faiss_index_analogia", "index_analogias"),
+    ]),
+]
+
+
+def unified_key(subject: str, kind: str = KIND_CONTEUDO) -> str:
+    return f"{subject}/{kind}"
+
+
+def manifest_path(folder_path: str = UNIFIED_INDEX_DIR) -> str:
+    return os.path.join(folder_path, f"{UNIFIED_INDEX_NAME}.unified.json")
+
+
+def load_unified_manifest(folder_path: str = UNIFIED_INDEX_DIR) -> Optional[Dict[str, Any]]:
+    """Lê as faixas de ids do índice unificado (None se ele não existir)."""
+    path = manifest_path(folder_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"⚠️ Manifesto do índice unificado inválido ({path}): {e}")
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Migração
+# ---------------------------------------------------------------------------
+
+def _faiss_source_available(folder: str, index_name: str) -> bool:
+    if not os.path.exists(os.path.join(folder, f"{index_name}.faiss")):
+        return False
+    return os.path.exists(os.path.join(folder, f"{index_name}.pkl")) or has_mmap_docstore(folder, index_name)
+
+
+def _chroma_source_available(folder: str) -> bool:
+    if not os.path.exists(os.path.join(folder, "chroma.sqlite3")):
+        return False
+    if importlib.util.find_spec("chromadb") is None:
+        print(f"⚠️ chromadb não instalado; fonte '{folder}' ignorada")
+        return False
+    return True
+
+
+def _read_faiss_source(folder: str, index_name: str) -> Tuple[np.ndarray, List[Document]]:
+    """Vetores (na ordem do índice) e documentos de um índice FAISS do LangChain."""
+    import faiss
+
+    index = faiss.read_index(os.path.join(folder, f"{index_name}.faiss"))
+    if index.metric_type != faiss.METRIC_L2:
+        raise ValueError("apenas índices com distância L2 podem ser unificados")
+    try:
+        faiss.extract_index_ivf(index).make_direct_map()
+    except RuntimeError:
+        pass  # índice flat: reconstrução direta
+    vectors = index.reconstruct_n(0, index.ntotal)
+
+    if has_mmap_docstore(folder, index_name):
+        docstore = MmapDocstore(folder, index_name)
+        index_to_docstore_id = docstore.index_to_docstore_id
+    else:
+        with open(os.path.join(folder, f"{index_name}.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+    documents = [docstore.search(index_to_docstore_id[i]) for i in range(index.ntotal)]
+    return vectors, documents
+
+
+def _read_chroma_source(folder: str) -> Tuple[np.ndarray, List[Document]]:
+    """Vetores e documentos da coleção padrão de um Chroma persistido."""
+    from langchain_community.vectorstores import Chroma
+
+    data = Chroma(persist_directory=folder)._collection.get(include=["embeddings", "documents", "metadatas"])
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    documents = [
+        Document(page_content=text or "", metadata=metadata or {})
+        for text, metadata in zip(data["documents"], data["metadatas"])
+    ]
+    return vectors, documents
+
+
+def build_unified_index(
+    output_dir: str = UNIFIED_INDEX_DIR,
+    sources: Iterable[Tuple[str, str, List[Tuple[str, str, Optional[str]]]]] = UNIFIED_SOURCES,
+) -> Dict[str, Any]:
+    """
+    Monta o índice unificado a partir dos índices existentes.
+    Cada (matéria, tipo) vira uma faixa contígua de ids; o manifesto com as
+    faixas é gravado por último e marca o índice como completo.
+    """
+    import faiss
+
+    all_vectors: List[np.ndarray] = []
+    items: Dict[str, Document] = {}
+    entries: List[Dict[str, Any]] = []
+    dimension = None
+    start = 0
+
+    for subject, kind, candidates in sources:
+        for backend, folder, index_name in candidates:
+            available = (
+                _faiss_source_available(folder, index_name) if backend == "faiss"
+                else _chroma_source_available(folder)
+            )
+            if not available:
+                continue
+            try:
+                if backend == "faiss":
+                    vectors, documents = _read_faiss_source(folder, index_name)
+                else:
+                    vectors, documents = _read_chroma_source(folder)
+            except Exception as e:
+                print(f"⚠️ Falha ao ler '{folder}' ({subject}/{kind}): {e}")
+                continue
+
+            if dimension is None:
+                dimension = vectors.shape[1]
+            if vectors.shape[1] != dimension:
+                print(f"⚠️ '{folder}' tem dimensão {vectors.shape[1]} (esperado {dimension}); ignorado")
+                continue
+
+            for i, doc in enumerate(documents):
+                metadata = dict(doc.metadata or {})
+                metadata.update({"subject": subject, "kind": kind})
+                items[f"{unified_key(subject, kind)}/{i}"] = Document(
+                    page_content=doc.page_content, metadata=metadata
+                )
+            all_vectors.append(np.ascontiguousarray(vectors, dtype=np.float32))
+            entries.append({
+                "subject": subject,
+                "kind": kind,
+                "origin": os.path.join(folder, index_name or ""),
+                "start": start,
+                "end": start + len(documents),
+            })
+            print(f"  - {subject}/{kind}: {len(documents)} trechos de '{folder}'")
+            start += len(documents)
+            break
+        else:
+            print(f"  - {subject}/{kind}: nenhuma fonte disponível")
+
+    if dimension is None:
+        raise RuntimeError("Nenhum índice de origem encontrado para a migração")
+
+    os.makedirs(output_dir, exist_ok=True)
+    index = faiss.IndexFlatL2(dimension)
+    index.add(np.vstack(all_vectors))
+    faiss.write_index(index, os.path.join(output_dir, f"{UNIFIED_INDEX_NAME}.faiss"))
+
+    # Documentos gravados na ordem do índice: posição no docstore == id no FAISS
+    export_docstore(items, dict(enumerate(items)), output_dir, UNIFIED_INDEX_NAME)
+
+    manifest = {"dimension": int(dimension), "total": int(index.ntotal), "sources": entries}
+    tmp_path = manifest_path(output_dir) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path(output_dir))
+    return manifest
+
+
+# ---------------------------------------------------------------------------
+# Busca filtrada por matéria
+# ---------------------------------------------------------------------------
+
+class _SubsetInfo:
+    """Substitui o `vectorstore.index` nas estatísticas (ntotal da matéria)."""
+
+    def __init__(self, ntotal: int):
+        self.ntotal = ntotal
+
+
+class _SubsetDocuments(Mapping):
+    """Visão id -> Document restrita às faixas de uma matéria."""
+
+    def __init__(self, store: MmapDocstore, ranges: List[Tuple[int, int]]):
+        self._store = store
+        self._ranges = ranges
+
+    def _position(self, doc_id: str) -> Optional[int]:
+        position = self._store.positions.get(doc_id)
+        if position is None or not any(start <= position < end for start, end in self._ranges):
+            return None
+        return position
+
+    def __getitem__(self, doc_id: str) -> Document:
+        position = self._position(doc_id)
+        if position is None:
+            raise KeyError(doc_id)
+        return self._store.document_at(position)
+
+    def __iter__(self) -> Iterator[str]:
+        for start, end in self._ranges:
+            yield from self._store.ids[start:end]
+
+    def __len__(self) -> int:
+        return sum(end - start for start, end in self._ranges)
+
+
+class _SubsetDocstore(Docstore):
+    """Docstore de uma matéria dentro do docstore unificado."""
+
+    def __init__(self, store: MmapDocstore, ranges: List[Tuple[int, int]]):
+        self._documents = _SubsetDocuments(store, ranges)
+
+    def search(self, search: str):
+        try:
+            return self._documents[search]
+        except KeyError:
+            return f"ID {search} not found."
+
+    @property
+    def _dict(self) -> Mapping:
+        return self._documents
+
+
+class SubjectIndexView(VectorStore):
+    """
+    Vectorstore somente-leitura de uma (matéria, tipo) do índice unificado.
+    Expõe o que os professores usam do FAISS do LangChain: as_retriever,
+    similarity_search, index.ntotal e docstore.
+    """
+
+    def __init__(self, unified: "UnifiedIndex", subject: str, kind: str, ranges: List[Tuple[int, int]]):
+        import faiss
+
+        self.subject = subject
+        self.kind = kind
+        self._unified = unified
+        self._ranges = ranges
+        self.index = _SubsetInfo(sum(end - start for start, end in ranges))
+        self.docstore = _SubsetDocstore(unified.docstore, ranges)
+
+        # Seletor pré-calculado: faixa única ou bitmap com as faixas da matéria
+        if len(ranges) == 1:
+            self._selector = faiss.IDSelectorRange(ranges[0][0], ranges[0][1])
+        else:
+            mask = np.zeros(unified.index.ntotal, dtype=bool)
+            for start, end in ranges:
+                mask[start:end] = True
+            self._bitmap = np.packbits(mask, bitorder="little")
+            self._selector = faiss.IDSelectorBitmap(unified.index.ntotal, faiss.swig_ptr(self._bitmap))
+        self._params = faiss.SearchParameters(sel=self._selector)
+
+    @property
+    def embeddings(self):
+        return self._unified.embeddings
+
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError("O índice unificado é somente leitura; rode a migração novamente.")
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError("Use unified_index.py para gerar o índice unificado.")
+
+    def similarity_search_with_score_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        if self.index.ntotal == 0:
+            return []
+        vector = np.asarray([embedding], dtype=np.float32)
+        scores, ids = self._unified.index.search(vector, min(k, self.index.ntotal), params=self._params)
+        return [
+            (self._unified.docstore.document_at(int(i)), float(score))
+            for score, i in zip(scores[0], ids[0]) if i != -1
+        ]
+
+    def similarity_search_with_score(self, query: str, k: int = 4, **kwargs) -> List[Tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self.embeddings.embed_query(query), k, **kwargs)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, **kwargs)]
+
+    def similarity_search(self, query: str, k: int = 4, **kwargs) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, **kwargs)]
+
+    def _select_relevance_score_fn(self):
+        return self._euclidean_relevance_score_fn
+
+
+class UnifiedIndex:
+    """Índice unificado carregado uma vez (mmap) e compartilhado por todas as matérias."""
+
+    def __init__(self, folder_path: str, embeddings):
+        manifest = load_unified_manifest(folder_path)
+        if manifest is None:
+            raise FileNotFoundError(f"Índice unificado não encontrado em '{folder_path}'")
+
+        self.embeddings = embeddings
+        self.index = read_faiss_index(os.path.join(folder_path, f"{UNIFIED_INDEX_NAME}.faiss"))
+        self.docstore = MmapDocstore(folder_path, UNIFIED_INDEX_NAME)
+        self.ranges: Dict[str, List[Tuple[int, int]]] = {}
+        for entry in manifest["sources"]:
+            key = unified_key(entry["subject"], entry["kind"])
+            self.ranges.setdefault(key, []).append((entry["start"], entry["end"]))
+        self._views: Dict[str, SubjectIndexView] = {}
+
+    def view(self, subject: str, kind: str = KIND_CONTEUDO) -> Optional[SubjectIndexView]:
+        """Vectorstore filtrado da matéria (None se ela não estiver no índice)."""
+        key = unified_key(subject, kind)
+        if key not in self.ranges:
+            return None
+        if key not in self._views:
+            self._views[key] = SubjectIndexView(self, subject, kind, self.ranges[key])
+        return self._views[key]
+
+
+_unified_index: Optional[UnifiedIndex] = None
+_unified_lock = threading.Lock()
+
+
+def has_unified_subject(subject: str, kind: str = KIND_CONTEUDO) -> bool:
+    """Indica se o índice unificado está ativo e contém a matéria (sem carregá-lo)."""
+    if not USE_UNIFIED_INDEX:
+        return False
+    manifest = load_unified_manifest()
+    return bool(manifest) and any(
+        entry["subject"] == subject and entry["kind"] == kind for entry in manifest["sources"]
+    )
+
+
+def get_unified_index(embeddings) -> UnifiedIndex:
+    """Retorna o índice unificado do processo, carregando-o na primeira chamada."""
+    global _unified_index
+    with _unified_lock:
+        if _unified_index is None:
+            print(f"📚 Carregando índice unificado de '{UNIFIED_INDEX_DIR}'...")
+            _unified_index = UnifiedIndex(UNIFIED_INDEX_DIR, embeddings)
+        return _unified_index
+
+
+def load_subject_vectorstore(subject: str, folder_path: str, embeddings, kind: str = KIND_CONTEUDO):
+    """
+    Vectorstore de uma matéria: a visão filtrada do índice unificado quando
+    ativo, ou o índice FAISS próprio da matéria.
+    """
+    if has_unified_subject(subject, kind):
+        view = get_unified_index(embeddings).view(subject, kind)
+        if view is not None:
+            return view
+    return load_faiss_vectorstore(folder_path, embeddings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera o índice FAISS unificado a partir dos índices por matéria.")
+    parser.add_argument("--output", default=UNIFIED_INDEX_DIR)
+    args = parser.parse_args()
+
+    print("🔄 Migrando índices para o índice unificado...")
+    manifest = build_unified_index(args.output)
+    print(f"✅ {manifest['total']} trechos de {len(manifest['sources'])} fontes salvos em '{args.output}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Carregamento central dos índices FAISS de A.T.E.N.A.
+Por padrão o docstore é lido do formato mapeado em memória (mmap_docstore);
+o index.pkl só é desserializado uma vez, para a conversão inicial.
+O index.faiss também é aberto com mmap (somente leitura): os vetores ficam
+no cache de páginas do sistema, compartilhado por todos os processos.
+"""
+
+import os
+import pickle
+
+from langchain_community.vectorstores import FAISS
+
+from faiss_index_builder import apply_search_params
+from mmap_docstore import MmapDocstore, docstore_paths, export_pickle_docstore, has_mmap_docstore
+
+# "mmap" (padrão) usa o docstore mapeado; "pickle" lê o index.pkl como o FAISS.load_local
+DOCSTORE_MODE = os.getenv("DOCSTORE_MODE", "mmap")
+
+# "mmap" (padrão) mapeia o index.faiss somente leitura; "eager" copia tudo para a memória do processo
+FAISS_LOAD_MODE = os.getenv("FAISS_LOAD_MODE", "mmap")
+
+# Sobrescrevem o nprobe (IVF) e o efSearch (HNSW) gravados nos índices aproximados
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "0"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "0"))
+
+
+def faiss_io_flags(mode: str = None) -> int:
+    """Flags de leitura do FAISS para o modo de carregamento informado."""
+    import faiss
+
+    mode = mode or FAISS_LOAD_MODE
+    if mode != "mmap":
+        return 0
+    # IO_FLAG_MMAP_IFC mapeia os códigos de índices flat e as listas do IVF;
+    # versões antigas do FAISS só têm IO_FLAG_MMAP (listas do IVF)
+    mmap_flag = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+    return mmap_flag | faiss.IO_FLAG_READ_ONLY
+
+
+def read_faiss_index(index_path: str, mode: str = None):
+    """Lê um index.faiss no modo configurado, voltando à leitura completa se o mmap falhar."""
+    import faiss
+
+    index = None
+    flags = faiss_io_flags(mode)
+    if flags:
+        try:
+            index = faiss.read_index(index_path, flags)
+        except RuntimeError as e:
+            print(f"⚠️ Não foi possível mapear '{index_path}' ({e}); carregando em memória.")
+    if index is None:
+        index = faiss.read_index(index_path)
+    return apply_search_params(index, FAISS_NPROBE, FAISS_EF_SEARCH)
+
+
+def _docstore_is_stale(folder_path: str, index_name: str) -> bool:
+    """O docstore mapeado está desatualizado se o index.pkl for mais novo que ele."""
+    if not has_mmap_docstore(folder_path, index_name):
+        return True
+    pkl_path = os.path.join(folder_path, f"{index_name}.pkl")
+    if not os.path.exists(pkl_path):
+        return False
+    json_path = docstore_paths(folder_path, index_name)[2]
+    return os.path.getmtime(pkl_path) > os.path.getmtime(json_path)
+
+
+def load_faiss_vectorstore(folder_path: str, embeddings, index_name: str = "index") -> FAISS:
+    """Carrega um índice FAISS com o docstore de DOCSTORE_MODE e a leitura de FAISS_LOAD_MODE."""
+    index = read_faiss_index(os.path.join(folder_path, f"{index_name}.faiss"))
+
+    if DOCSTORE_MODE == "pickle":
+        # Mesmo formato gravado pelo FAISS.save_local do LangChain
+        with open(os.path.join(folder_path, f"{index_name}.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+    if _docstore_is_stale(folder_path, index_name):
+        print(f"🔄 Convertendo docstore de '{folder_path}' para o formato mapeado...")
+        export_pickle_docstore(folder_path, index_name)
+
+    docstore = MmapDocstore(folder_path, index_name)
+    return FAISS(embeddings, index, docstore, docstore.index_to_docstore_id)